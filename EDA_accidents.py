@@ -1,353 +1,383 @@
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Render sin pantalla: las figuras se guardan en disco
 import matplotlib.pyplot as plt
+from matplotlib import cbook
 import seaborn as sns
+from concurrent.futures import ProcessPoolExecutor
 from collections import Counter
+import argparse
+import hashlib
 import os
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+from ETL.stream_stats import CoMoments, Reservoir, RunningMoments, SpaceSaving, describe_stream
+from ETL.location_catalog import LOCATIONS_PATH, load_catalog
+from accident_cube import DAY_LABELS, AccidentCube, day_index
+
 # Configurar estilo de visualización
 plt.style.use('default')
 sns.set_palette("husl")
 
+EDA_CACHE_DIR = ".eda_cache"
+# Incrementar cuando cambie el contenido de los agregados para invalidar la caché
+EDA_CACHE_VERSION = 2
+
+HOUR_BINS = [(0, 2), (3, 5), (6, 8), (9, 11), (12, 14), (15, 17), (18, 20), (21, 23)]
+ENGAGEMENT_COLS = ['likes', 'comments_count', 'video_views']
+CORRELATION_COLS = ['severity_score', 'confidence_score', 'word_count', 'entities_found',
+                    'likes', 'comments_count', 'hour']
+
+
+def file_hash(path):
+    """SHA-256 of a file's contents, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
 class AccidentsEDA:
-    def __init__(self, csv_path):
-        """Initialize EDA with accidents dataset"""
+    CACHE_TAG = "full"
+
+    def __init__(self, csv_path, cache_dir=EDA_CACHE_DIR, use_cache=True, df=None):
+        """Initialize EDA with accidents dataset (loaded lazily, only on a cache miss)
+
+        `df` is the already loaded contents of csv_path (e.g. from an ArtifactCatalog).
+        """
         self.csv_path = csv_path
-        self.df = None
-        self.load_data()
-    
+        self.cache_dir = cache_dir
+        self.use_cache = use_cache
+        self.df = df
+        self.aggregates = None
+
     def load_data(self):
         """Load and prepare the accidents dataset"""
-        print("📊 ANÁLISIS EXPLORATORIO DE DATOS - ACCIDENTES DE TRÁFICO")
-        print("=" * 70)
-        
         try:
             self.df = pd.read_csv(self.csv_path)
             print(f"✅ Dataset cargado exitosamente: {len(self.df)} registros")
         except Exception as e:
             print(f"❌ Error cargando dataset: {e}")
             return
-    
+
+    def prepare(self):
+        """Make the input available for compute_aggregates (False if it can't be read)"""
+        if self.df is None:
+            self.load_data()
+        return self.df is not None
+
+    def cache_path(self):
+        """Cache file for the current contents of the input CSV and of the location catalog
+
+        The cube stores canonical location IDs, so a catalog change (new aliases,
+        merged IDs) must invalidate the aggregates just like a new CSV.
+        """
+        catalog = file_hash(LOCATIONS_PATH) if os.path.exists(LOCATIONS_PATH) else 'seed'
+        key = hashlib.sha256(f"{file_hash(self.csv_path)}:{catalog}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}_{self.CACHE_TAG}_v{EDA_CACHE_VERSION}.pkl")
+
+    def compute(self):
+        """Compute phase: load cached aggregates for this input, or compute and cache them"""
+        print("📊 ANÁLISIS EXPLORATORIO DE DATOS - ACCIDENTES DE TRÁFICO")
+        print("=" * 70)
+
+        cache_path = self.cache_path()
+        if self.use_cache and os.path.exists(cache_path):
+            self.aggregates = pd.read_pickle(cache_path)
+            print(f"♻️ Datos sin cambios: agregados cargados desde caché ({cache_path})")
+            return self.aggregates
+
+        if not self.prepare():
+            return None
+
+        self.aggregates = self.compute_aggregates()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Archivo temporal + os.replace: otro proceso del DAG nunca lee un pickle a medias
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        pd.to_pickle(self.aggregates, tmp_path)
+        os.replace(tmp_path, cache_path)
+        print(f"💾 Agregados guardados en caché: {cache_path}")
+        return self.aggregates
+
+    def compute_aggregates(self):
+        """Compute every table the report and the figures need from self.df"""
+        df = self.df
+        n = len(df)
+        agg = {'n_rows': n, 'n_cols': df.shape[1]}
+
+        # Información básica
+        agg['year_min'] = df['year'].min()
+        agg['year_max'] = df['year'].max()
+        agg['memory_mb'] = df.memory_usage(deep=True).sum() / 1024**2
+        null_counts = df.isnull().sum()
+        agg['dtypes'] = [(col, str(dtype), int(null_counts[col])) for col, dtype in df.dtypes.items()]
+
+        # Severidad
+        severity = df['severity_score']
+        agg['severity_stats'] = severity.describe()
+        severity_category = pd.cut(
+            severity,
+            bins=[0, 0.3, 0.7, 1.0],
+            labels=['Leve', 'Moderado', 'Grave'],
+            include_lowest=True
+        )
+        agg['severity_categories'] = severity_category.value_counts()
+        agg['platform_severity'] = df.groupby('platform')['severity_score'].agg(['mean', 'count']).round(3)
+        agg['severity_hist'] = np.histogram(severity.dropna(), bins=20)
+
+        # Ubicaciones (split vectorizado en lugar de un bucle Python)
+        has_locations = df['extracted_locations'].notna() & (df['extracted_locations'] != '')
+        agg['locations_with_data'] = int(has_locations.sum())
+        agg['entities_mean'] = df['entities_found'].mean()
+        locations = df.loc[has_locations, 'extracted_locations'].astype(str).str.split(',').explode().str.strip()
+        agg['location_counts'] = locations[locations != ''].value_counts()
+
+        # Temporal
+        hours = df['hour'].dropna().astype(int)
+        agg['hour_counts'] = np.bincount(hours, minlength=24)[:24]
+        days = day_index(df['day_of_week'])
+        agg['day_counts'] = np.bincount(days[days >= 0], minlength=7)[:7]
+        agg['weekend_count'] = int(df['is_weekend'].sum())
+        agg['cube'] = AccidentCube.from_frame(df, load_catalog())
+
+        # Engagement
+        agg['engagement'] = {col: df[col].describe() for col in ENGAGEMENT_COLS if col in df.columns}
+        agg['engagement_corr'] = {col: severity.corr(df[col]) for col in ENGAGEMENT_COLS if col in df.columns}
+
+        # Texto
+        agg['word_stats'] = df['word_count'].describe()
+        agg['word_hist'] = np.histogram(df['word_count'].dropna(), bins=15)
+        for key, idx in [('longest_post', df['word_count'].idxmax()), ('shortest_post', df['word_count'].idxmin())]:
+            post = df.loc[idx]
+            agg[key] = (post['word_count'], str(post['text']) if pd.notna(post['text']) else "Texto no disponible")
+        agg['confidence_stats'] = df['confidence_score'].describe()
+        agg['entities_counts'] = df['entities_found'].value_counts().sort_index()
+
+        # Severidad por día (estadísticas y cajas precalculadas para el boxplot)
+        day_name = days.map(dict(enumerate(DAY_LABELS)))
+        agg['day_severity_stats'] = severity.groupby(day_name).describe()[['mean', 'min', 'max']].round(3)
+        present_days = [d for d in range(7) if (days == d).any()]
+        agg['day_box_stats'] = cbook.boxplot_stats(
+            [severity[days == d].dropna().values for d in present_days],
+            labels=[DAY_LABELS[d] for d in present_days]
+        )
+
+        # Correlaciones
+        numeric_cols = [col for col in CORRELATION_COLS if col in df.columns]
+        agg['correlation_matrix'] = df[numeric_cols].corr()
+
+        # Insights
+        agg['avg_severity'] = severity.mean()
+        agg['high_severity_pct'] = (severity > 0.7).mean() * 100
+        agg['location_coverage'] = has_locations.mean() * 100
+        hour_counts = df['hour'].value_counts()
+        agg['peak_hour'] = hour_counts.idxmax()
+        agg['peak_hour_count'] = hour_counts.max()
+        agg['peak_day'] = df['day_of_week'].value_counts().idxmax()
+        agg['word_severity_corr'] = df['word_count'].corr(severity)
+        platform_counts = df['platform'].value_counts()
+        agg['most_active_platform'] = platform_counts.idxmax()
+        agg['platform_pct'] = platform_counts.max() / n * 100
+
+        return agg
+
     def basic_info(self):
         """Display basic dataset information"""
+        agg = self.aggregates
         print("\n📋 INFORMACIÓN BÁSICA DEL DATASET")
         print("-" * 50)
-        
-        print(f"📏 Dimensiones: {self.df.shape[0]} filas x {self.df.shape[1]} columnas")
-        print(f"📅 Período: {self.df['year'].min()} - {self.df['year'].max()}")
-        print(f"💾 Memoria utilizada: {self.df.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
-        
+
+        print(f"📏 Dimensiones: {agg['n_rows']} filas x {agg['n_cols']} columnas")
+        print(f"📅 Período: {agg['year_min']} - {agg['year_max']}")
+        print(f"💾 Memoria utilizada: {agg['memory_mb']:.2f} MB")
+
         print("\n📊 Tipos de datos:")
-        for col, dtype in self.df.dtypes.items():
-            null_count = self.df[col].isnull().sum()
-            null_pct = (null_count / len(self.df)) * 100
-            print(f"  {col:<25} {str(dtype):<10} | Nulos: {null_count:>3} ({null_pct:>5.1f}%)")
-    
+        for col, dtype, null_count in agg['dtypes']:
+            null_pct = (null_count / agg['n_rows']) * 100
+            print(f"  {col:<25} {dtype:<10} | Nulos: {null_count:>3} ({null_pct:>5.1f}%)")
+
     def severity_analysis(self):
         """Analyze severity scores and patterns"""
+        agg = self.aggregates
         print("\n🚨 ANÁLISIS DE SEVERIDAD")
         print("-" * 50)
-        
-        severity_stats = self.df['severity_score'].describe()
+
         print("📈 Estadísticas de severidad:")
-        for stat, value in severity_stats.items():
+        for stat, value in agg['severity_stats'].items():
             print(f"  {stat:<10}: {value:.3f}")
-        
-        # Categorizar severidad
-        self.df['severity_category'] = pd.cut(
-            self.df['severity_score'], 
-            bins=[0, 0.3, 0.7, 1.0], 
-            labels=['Leve', 'Moderado', 'Grave'],
-            include_lowest=True
-        )
-        
-        severity_counts = self.df['severity_category'].value_counts()
+
         print(f"\n🏷️ Distribución por categorías:")
-        for category, count in severity_counts.items():
-            pct = (count / len(self.df)) * 100
+        for category, count in agg['severity_categories'].items():
+            pct = (count / agg['n_rows']) * 100
             print(f"  {category:<10}: {count:>3} ({pct:>5.1f}%)")
-        
+
         # Severidad por plataforma
         print(f"\n📱 Severidad promedio por plataforma:")
-        platform_severity = self.df.groupby('platform')['severity_score'].agg(['mean', 'count']).round(3)
-        for platform, stats in platform_severity.iterrows():
+        for platform, stats in agg['platform_severity'].iterrows():
             print(f"  {platform:<12}: {stats['mean']:.3f} (n={stats['count']})")
-    
+
     def location_analysis(self):
         """Analyze location patterns"""
+        agg = self.aggregates
         print("\n📍 ANÁLISIS DE UBICACIONES")
         print("-" * 50)
-        
-        # Contar ubicaciones extraídas
-        locations_with_data = self.df[self.df['extracted_locations'].notna() & 
-                                     (self.df['extracted_locations'] != '')]
-        
-        print(f"📊 Posts con ubicaciones extraídas: {len(locations_with_data)} ({len(locations_with_data)/len(self.df)*100:.1f}%)")
-        print(f"📊 Promedio de entidades por post: {self.df['entities_found'].mean():.2f}")
-        
-        # Extraer todas las ubicaciones
-        all_locations = []
-        for locations_str in locations_with_data['extracted_locations']:
-            if pd.notna(locations_str) and locations_str:
-                locations = [loc.strip() for loc in locations_str.split(',')]
-                all_locations.extend(locations)
-        
-        location_counts = Counter(all_locations)
-        
+
+        with_data = agg['locations_with_data']
+        print(f"📊 Posts con ubicaciones extraídas: {with_data} ({with_data/agg['n_rows']*100:.1f}%)")
+        print(f"📊 Promedio de entidades por post: {agg['entities_mean']:.2f}")
+
+        location_counts = agg['location_counts']
         print(f"\n🏆 Top 15 ubicaciones más mencionadas:")
-        for i, (location, count) in enumerate(location_counts.most_common(15), 1):
+        for i, (location, count) in enumerate(location_counts.head(15).items(), 1):
             print(f"  {i:>2}. {location:<25}: {count:>3} veces")
-        
+
         return location_counts
-    
+
     def temporal_analysis(self):
         """Analyze temporal patterns"""
+        agg = self.aggregates
+        n = agg['n_rows']
         print("\n⏰ ANÁLISIS TEMPORAL")
         print("-" * 50)
-        
-        # Análisis por hora
-        print("🕐 Distribución por hora del día:")
-        # Definir los intervalos de 3 horas
-        bins = [(0, 2), (3, 5), (6, 8), (9, 11), (12, 14), (15, 17), (18, 20), (21, 23)]
 
+        # Análisis por hora (intervalos de 3 horas sobre los conteos por hora)
+        print("🕐 Distribución por hora del día:")
         total = 0
-        for start, end in bins:
-            # Contar cuántos registros caen dentro de ese rango
-            mask = (self.df['hour'] >= start) & (self.df['hour'] <= end)
-            count = mask.sum()
+        for start, end in HOUR_BINS:
+            count = int(agg['hour_counts'][start:end + 1].sum())
             total += count
-            pct = (count / len(self.df)) * 100
+            pct = (count / n) * 100
             print(f"  {start:>2}:00-{end:>2}:59: {count:>3} ({pct:>4.1f}%)")
 
-        print(f"\n✅ Total registros contabilizados: {total} ({(total/len(self.df))*100:.1f}%)")
-        
+        print(f"\n✅ Total registros contabilizados: {total} ({(total/n)*100:.1f}%)")
+
         # Análisis por día de la semana
         print("\n📅 Distribución por día de la semana:")
-        day_counts = self.df['day_of_week'].value_counts().sort_index()
-        days = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-        for day_num, day_name in enumerate(days):
-            count = day_counts.get(day_num, 0)
-            pct = (count / len(self.df)) * 100
+        for day_num, day_name in enumerate(DAY_LABELS):
+            count = int(agg['day_counts'][day_num])
+            pct = (count / n) * 100
             print(f"  {day_name:<10}: {count:>3} ({pct:>4.1f}%)")
-        
+
         # Fin de semana vs días laborables
-        weekend_pct = (self.df['is_weekend'].sum() / len(self.df)) * 100
-        print(f"\n📊 Fin de semana: {self.df['is_weekend'].sum()} ({weekend_pct:.1f}%)")
-        print(f"📊 Días laborables: {(~self.df['is_weekend']).sum()} ({100-weekend_pct:.1f}%)")
-    
+        weekend = agg['weekend_count']
+        weekend_pct = (weekend / n) * 100
+        print(f"\n📊 Fin de semana: {weekend} ({weekend_pct:.1f}%)")
+        print(f"📊 Días laborables: {n - weekend} ({100-weekend_pct:.1f}%)")
+
+        # Horas pico de días laborables en las ubicaciones con más accidentes (cortes del cubo)
+        cube = agg.get('cube')
+        if cube is not None:
+            print("\n🚦 Horas pico laborables por ubicación (6-9h / 16-19h):")
+            for location in cube.top_locations(5).index:
+                morning = cube.query(location, hours=range(6, 10), days='weekdays')
+                evening = cube.query(location, hours=range(16, 20), days='weekdays')
+                print(f"  {location:<25}: {morning['count']:>3} / {evening['count']:>3}")
+
     def engagement_analysis(self):
         """Analyze social media engagement"""
+        agg = self.aggregates
         print("\n💬 ANÁLISIS DE ENGAGEMENT")
         print("-" * 50)
-        
-        # Estadísticas de engagement
-        engagement_cols = ['likes', 'comments_count', 'video_views']
-        
-        for col in engagement_cols:
-            if col in self.df.columns:
-                stats = self.df[col].describe()
-                print(f"\n📊 {col.replace('_', ' ').title()}:")
-                print(f"  Promedio: {stats['mean']:.1f}")
-                print(f"  Mediana:  {stats['50%']:.1f}")
-                print(f"  Máximo:   {stats['max']:.0f}")
-        
+
+        for col, stats in agg['engagement'].items():
+            print(f"\n📊 {col.replace('_', ' ').title()}:")
+            print(f"  Promedio: {stats['mean']:.1f}")
+            print(f"  Mediana:  {stats['50%']:.1f}")
+            print(f"  Máximo:   {stats['max']:.0f}")
+
         # Correlación entre severidad y engagement
         print(f"\n🔗 Correlación severidad vs engagement:")
-        for col in engagement_cols:
-            if col in self.df.columns:
-                corr = self.df['severity_score'].corr(self.df[col])
-                print(f"  Severidad vs {col.replace('_', ' ')}: {corr:.3f}")
-    
+        for col, corr in agg['engagement_corr'].items():
+            print(f"  Severidad vs {col.replace('_', ' ')}: {corr:.3f}")
+
     def text_analysis(self):
         """Analyze text characteristics"""
+        agg = self.aggregates
         print("\n📝 ANÁLISIS DE TEXTO")
         print("-" * 50)
-        
-        word_stats = self.df['word_count'].describe()
+
         print("📖 Estadísticas de palabras por post:")
-        for stat, value in word_stats.items():
+        for stat, value in agg['word_stats'].items():
             print(f"  {stat:<10}: {value:.1f}")
-        
+
         # Posts más largos y más cortos
-        longest_post = self.df.loc[self.df['word_count'].idxmax()]
-        shortest_post = self.df.loc[self.df['word_count'].idxmin()]
-        
-        print(f"\n📏 Post más largo: {longest_post['word_count']} palabras")
-        longest_text = str(longest_post['text']) if pd.notna(longest_post['text']) else "Texto no disponible"
+        longest_words, longest_text = agg['longest_post']
+        shortest_words, shortest_text = agg['shortest_post']
+
+        print(f"\n📏 Post más largo: {longest_words} palabras")
         print(f"   Texto: {longest_text[:100]}...")
-        
-        print(f"\n📏 Post más corto: {shortest_post['word_count']} palabras")
-        shortest_text = str(shortest_post['text']) if pd.notna(shortest_post['text']) else "Texto no disponible"
+
+        print(f"\n📏 Post más corto: {shortest_words} palabras")
         print(f"   Texto: {shortest_text[:100]}...")
-        
+
         # Confianza en análisis
-        confidence_stats = self.df['confidence_score'].describe()
         print(f"\n🎯 Estadísticas de confianza en el análisis:")
-        for stat, value in confidence_stats.items():
+        for stat, value in agg['confidence_stats'].items():
             print(f"  {stat:<10}: {value:.3f}")
-            
+
     def outlier_analysis(self):
         """Analyze severity distribution and outliers by day of week"""
+        agg = self.aggregates
         print("\n📊 ANÁLISIS DE OUTLIERS - SEVERIDAD POR DÍA")
         print("-" * 60)
 
-        if 'day_of_week' not in self.df.columns or 'severity_score' not in self.df.columns:
-            print("⚠️ No hay columnas 'day_of_week' o 'severity_score' para el análisis.")
+        if agg['day_severity_stats'].empty:
+            print("⚠️ No hay datos de 'day_of_week' y 'severity_score' para el análisis.")
             return
 
-        # Días en orden lógico
-        day_labels = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-        self.df['day_name'] = self.df['day_of_week'].replace(dict(zip(range(7), day_labels)))
-
-        # Estadísticas por día
+        # Estadísticas por día (el boxplot se genera en la fase de render)
         print("📈 Severidad promedio por día:")
-        day_stats = self.df.groupby('day_name')['severity_score'].describe()[['mean', 'min', 'max']].round(3)
-        print(day_stats)
-
-        # 🎨 Boxplot por día
-        plt.figure(figsize=(10, 6))
-        sns.boxplot(
-            data=self.df,
-            x='day_name',
-            y='severity_score',
-            palette='coolwarm',
-            linewidth=1.2,
-            boxprops=dict(alpha=0.8),
-            medianprops=dict(color='yellow', linewidth=2)
-        )
-        plt.title("📦 Distribución de Severidad por Día de la Semana", fontsize=13, pad=12)
-        plt.xlabel("Día de la semana")
-        plt.ylabel("Score de Severidad")
-        plt.grid(axis='y', linestyle='--', alpha=0.6)
-        plt.tight_layout()
-        plt.show()
-    
-    def create_visualizations(self):
-        """Create data visualizations"""
+        print(agg['day_severity_stats'].reindex([d for d in DAY_LABELS if d in agg['day_severity_stats'].index]))
+
+    def create_visualizations(self, plots_dir="plots", dpi=300, parallel=True):
+        """Render phase: draw every figure from the cached aggregates"""
         print("\n📈 GENERANDO VISUALIZACIONES")
         print("-" * 50)
-        
-        # Crear directorio para gráficos
-        plots_dir = "plots"
-        os.makedirs(plots_dir, exist_ok=True)
-        
-        # 1. Distribución de severidad
-        plt.figure(figsize=(12, 8))
-        
-        plt.subplot(2, 3, 1)
-        self.df['severity_score'].hist(bins=20, alpha=0.7, color='skyblue', edgecolor='black')
-        plt.title('Distribución de Severidad')
-        plt.xlabel('Score de Severidad')
-        plt.ylabel('Frecuencia')
-        
-        plt.subplot(2, 3, 2)
-        severity_counts = self.df['severity_category'].value_counts()
-        plt.pie(severity_counts.values, labels=severity_counts.index, autopct='%1.1f%%', startangle=90)
-        plt.title('Severidad por Categorías')
-        
-        # 2. Análisis temporal
-        plt.subplot(2, 3, 3)
-        hour_counts = self.df['hour'].value_counts().sort_index()
-        plt.plot(hour_counts.index, hour_counts.values, marker='o', color='orange')
-        plt.title('Accidentes por Hora del Día')
-        plt.xlabel('Hora')
-        plt.ylabel('Cantidad')
-        plt.xticks(range(0, 24, 4))
-        
-        plt.subplot(2, 3, 4)
-        day_counts = self.df['day_of_week'].value_counts().sort_index()
-        days = ['L', 'M', 'X', 'J', 'V', 'S', 'D']
-        plt.bar(days, [day_counts.get(i, 0) for i in range(7)], color='lightcoral')
-        plt.title('Accidentes por Día de la Semana')
-        plt.xlabel('Día')
-        plt.ylabel('Cantidad')
-        
-        # 3. Análisis de texto
-        plt.subplot(2, 3, 5)
-        self.df['word_count'].hist(bins=15, alpha=0.7, color='lightgreen', edgecolor='black')
-        plt.title('Distribución de Palabras por Post')
-        plt.xlabel('Número de Palabras')
-        plt.ylabel('Frecuencia')
-        
-        # 4. Entidades encontradas
-        plt.subplot(2, 3, 6)
-        entities_counts = self.df['entities_found'].value_counts().sort_index()
-        plt.bar(entities_counts.index, entities_counts.values, color='mediumpurple')
-        plt.title('Entidades Encontradas por Post')
-        plt.xlabel('Número de Entidades')
-        plt.ylabel('Cantidad de Posts')
-        
-        plt.tight_layout()
-        plot_path = os.path.join(plots_dir, 'accidents_eda_overview.png')
-        plt.savefig(plot_path, dpi=300, bbox_inches='tight')
-        print(f"✅ Gráfico general guardado: {plot_path}")
-        
-        # Mapa de calor de correlaciones
-        plt.figure(figsize=(10, 8))
-        numeric_cols = ['severity_score', 'confidence_score', 'word_count', 'entities_found', 
-                       'likes', 'comments_count', 'hour']
-        numeric_cols = [col for col in numeric_cols if col in self.df.columns]
-        
-        correlation_matrix = self.df[numeric_cols].corr()
-        sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', center=0, 
-                    square=True, linewidths=0.5)
-        plt.title('Matriz de Correlación - Variables Numéricas')
-        plt.tight_layout()
-        
-        corr_path = os.path.join(plots_dir, 'accidents_correlation_matrix.png')
-        plt.savefig(corr_path, dpi=300, bbox_inches='tight')
-        print(f"✅ Matriz de correlación guardada: {corr_path}")
-        
-        plt.show()
-    
+
+        for label, path in render_figures(self.aggregates, plots_dir=plots_dir, dpi=dpi, parallel=parallel):
+            print(f"✅ {label}: {path}")
+
     def generate_insights_report(self):
         """Generate key insights report"""
+        agg = self.aggregates
         print("\n💡 INSIGHTS CLAVE")
         print("=" * 70)
-        
+
         insights = []
-        
+
         # Insight 1: Severidad general
-        avg_severity = self.df['severity_score'].mean()
-        high_severity_pct = (self.df['severity_score'] > 0.7).mean() * 100
-        insights.append(f"🎯 Severidad promedio: {avg_severity:.2f} - {high_severity_pct:.1f}% son incidentes graves")
-        
+        insights.append(f"🎯 Severidad promedio: {agg['avg_severity']:.2f} - {agg['high_severity_pct']:.1f}% son incidentes graves")
+
         # Insight 2: Cobertura de ubicaciones
-        location_coverage = (self.df['extracted_locations'].notna() & 
-                           (self.df['extracted_locations'] != '')).mean() * 100
-        insights.append(f"📍 Cobertura de ubicaciones: {location_coverage:.1f}% de posts tienen ubicaciones extraídas")
-        
+        insights.append(f"📍 Cobertura de ubicaciones: {agg['location_coverage']:.1f}% de posts tienen ubicaciones extraídas")
+
         # Insight 3: Hora pico
-        peak_hour = self.df['hour'].value_counts().idxmax()
-        peak_count = self.df['hour'].value_counts().max()
-        insights.append(f"🕐 Hora pico de reportes: {peak_hour}:00 ({peak_count} reportes)")
-        
+        insights.append(f"🕐 Hora pico de reportes: {agg['peak_hour']}:00 ({agg['peak_hour_count']} reportes)")
+
         # Insight 4: Día más activo
-        peak_day = self.df['day_of_week'].value_counts().idxmax()
+        peak_day = agg['peak_day']
         if isinstance(peak_day, str):
             peak_day_name = peak_day
         else:
-            days = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-            peak_day_name = days[peak_day] if 0 <= peak_day < len(days) else str(peak_day)
+            peak_day_name = DAY_LABELS[peak_day] if 0 <= peak_day < len(DAY_LABELS) else str(peak_day)
         insights.append(f"📅 Día con más reportes: {peak_day_name}")
-        
+
         # Insight 5: Relación palabras-severidad
-        word_severity_corr = self.df['word_count'].corr(self.df['severity_score'])
+        word_severity_corr = agg['word_severity_corr']
         if abs(word_severity_corr) > 0.1:
             direction = "positiva" if word_severity_corr > 0 else "negativa"
             insights.append(f"📝 Correlación {direction} entre longitud del texto y severidad: {word_severity_corr:.3f}")
-        
+
         # Insight 6: Plataforma más activa
-        most_active_platform = self.df['platform'].value_counts().idxmax()
-        platform_pct = (self.df['platform'] == most_active_platform).mean() * 100
-        insights.append(f"📱 Plataforma más activa: {most_active_platform} ({platform_pct:.1f}% de reportes)")
-        
+        insights.append(f"📱 Plataforma más activa: {agg['most_active_platform']} ({agg['platform_pct']:.1f}% de reportes)")
+
         for i, insight in enumerate(insights, 1):
             print(f"{i}. {insight}")
-        
+
         # Generar reporte en archivo
         report_path = "accidents_eda_report.txt"
         with open(report_path, 'w', encoding='utf-8') as f:
@@ -355,21 +385,21 @@ class AccidentsEDA:
             f.write("=" * 60 + "\n\n")
             f.write(f"Generado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
             f.write(f"Dataset: {self.csv_path}\n")
-            f.write(f"Registros analizados: {len(self.df)}\n\n")
-            
+            f.write(f"Registros analizados: {agg['n_rows']}\n\n")
+
             f.write("INSIGHTS PRINCIPALES:\n")
             f.write("-" * 30 + "\n")
             for i, insight in enumerate(insights, 1):
                 f.write(f"{i}. {insight}\n")
-        
+
         print(f"\n✅ Reporte completo guardado: {report_path}")
-    
-    def run_full_analysis(self):
-        """Run complete EDA analysis"""
-        if self.df is None:
+
+    def run_full_analysis(self, parallel=True):
+        """Run complete EDA analysis (False if the dataset could not be loaded)"""
+        if self.compute() is None:
             print("❌ No se pudo cargar el dataset")
-            return
-        
+            return False
+
         self.basic_info()
         self.severity_analysis()
         self.location_analysis()
@@ -377,26 +407,322 @@ class AccidentsEDA:
         self.engagement_analysis()
         self.text_analysis()
         self.outlier_analysis()
-        self.create_visualizations()
+        self.create_visualizations(parallel=parallel)
         self.generate_insights_report()
-        
+
         print("\n" + "=" * 70)
         print("✅ ANÁLISIS EDA COMPLETADO")
         print("=" * 70)
+        return True
+
+
+class StreamingAccidentsEDA(AccidentsEDA):
+    """Out-of-core EDA: same aggregates as AccidentsEDA, computed chunk by chunk.
+
+    Memory depends on chunksize and the sketch sizes, not on the archive size.
+    Quartiles come from a reservoir sample, top locations from a Space-Saving
+    sketch, correlations use complete rows, and the reported memory is the
+    largest chunk held at once.
+    """
+    CACHE_TAG = "stream"
+    DESCRIBE_COLS = ['severity_score', 'confidence_score', 'word_count'] + ENGAGEMENT_COLS
+
+    def __init__(self, csv_path, chunksize=50000, top_k=1000, cache_dir=EDA_CACHE_DIR, use_cache=True):
+        super().__init__(csv_path, cache_dir=cache_dir, use_cache=use_cache)
+        self.chunksize = chunksize
+        self.top_k = top_k
+
+    def prepare(self):
+        if not os.path.exists(self.csv_path):
+            print(f"❌ Error cargando dataset: {self.csv_path} no existe")
+            return False
+        print(f"🌊 Modo out-of-core: procesando en bloques de {self.chunksize} filas")
+        return True
+
+    def compute_aggregates(self):
+        """Stream the CSV once, updating constant-size accumulators per chunk"""
+        n = 0
+        columns, dtypes, null_counts = None, None, None
+        max_chunk_mb = 0.0
+        years = RunningMoments()
+        describe = {col: (RunningMoments(), Reservoir()) for col in self.DESCRIBE_COLS}
+        severity_categories = pd.Series(0, index=['Leve', 'Moderado', 'Grave'], dtype='int64')
+        severity_edges = np.linspace(0.0, 1.0, 21)
+        severity_hist = np.zeros(20, dtype=np.int64)
+        platforms = {}
+        with_locations = 0
+        entities = RunningMoments()
+        locations = SpaceSaving(self.top_k)
+        hour_counts = np.zeros(24, dtype=np.int64)
+        day_counts = np.zeros(7, dtype=np.int64)
+        raw_days = Counter()
+        weekend = 0
+        word_counts = Counter()
+        entity_counts = Counter()
+        longest, shortest = None, None
+        day_moments = [RunningMoments() for _ in range(7)]
+        day_samples = [Reservoir(size=2000) for _ in range(7)]
+        comoments = None
+        high_severity = 0
+        cube = AccidentCube(load_catalog())
+
+        for chunk in pd.read_csv(self.csv_path, chunksize=self.chunksize):
+            n += len(chunk)
+            if columns is None:
+                columns = list(chunk.columns)
+                dtypes = {col: str(dtype) for col, dtype in chunk.dtypes.items()}
+                null_counts = pd.Series(0, index=columns, dtype='int64')
+                comoments = CoMoments([col for col in dict.fromkeys(CORRELATION_COLS + ENGAGEMENT_COLS)
+                                       if col in columns])
+            max_chunk_mb = max(max_chunk_mb, chunk.memory_usage(deep=True).sum() / 1024**2)
+            null_counts += chunk.isnull().sum()
+            years.update(chunk['year'])
+
+            # Severidad
+            severity = chunk['severity_score']
+            for col, (moments, sample) in describe.items():
+                if col in chunk.columns:
+                    moments.update(chunk[col])
+                    sample.update(chunk[col])
+            categories = pd.cut(severity, bins=[0, 0.3, 0.7, 1.0],
+                                labels=['Leve', 'Moderado', 'Grave'], include_lowest=True)
+            severity_categories += categories.value_counts().reindex(severity_categories.index, fill_value=0)
+            severity_hist += np.histogram(severity.dropna(), bins=severity_edges)[0]
+            high_severity += int((severity > 0.7).sum())
+            for platform, group in chunk.groupby('platform')['severity_score']:
+                total, count = platforms.get(platform, (0.0, 0))
+                platforms[platform] = (total + group.sum(), count + group.count())
+
+            # Ubicaciones
+            has_locations = chunk['extracted_locations'].notna() & (chunk['extracted_locations'] != '')
+            with_locations += int(has_locations.sum())
+            entities.update(chunk['entities_found'])
+            names = chunk.loc[has_locations, 'extracted_locations'].astype(str).str.split(',').explode().str.strip()
+            locations.update(names[names != ''].value_counts())
+
+            # Temporal
+            hour_counts += np.bincount(chunk['hour'].dropna().astype(int), minlength=24)[:24]
+            days = day_index(chunk['day_of_week'])
+            day_counts += np.bincount(days[days >= 0], minlength=7)[:7]
+            raw_days.update(chunk['day_of_week'].value_counts().to_dict())
+            weekend += int(chunk['is_weekend'].sum())
+            for d in range(7):
+                day_moments[d].update(severity[days == d])
+                day_samples[d].update(severity[days == d])
+            cube.update(chunk)
+
+            # Texto
+            word_counts.update(chunk['word_count'].value_counts().to_dict())
+            entity_counts.update(chunk['entities_found'].value_counts().to_dict())
+            for key, idx in [('max', chunk['word_count'].idxmax()), ('min', chunk['word_count'].idxmin())]:
+                post = chunk.loc[idx]
+                candidate = (post['word_count'], str(post['text']) if pd.notna(post['text']) else "Texto no disponible")
+                if key == 'max' and (longest is None or candidate[0] > longest[0]):
+                    longest = candidate
+                if key == 'min' and (shortest is None or candidate[0] < shortest[0]):
+                    shortest = candidate
+
+            comoments.update(chunk)
+
+        correlation = comoments.correlation()
+        present_days = [d for d in range(7) if day_moments[d].count]
+        word_values = np.array(sorted(word_counts))
+        platform_count = pd.Series({p: c for p, (_, c) in platforms.items()})
 
+        agg = {'n_rows': n, 'n_cols': len(columns)}
+        agg['year_min'] = int(years.min)
+        agg['year_max'] = int(years.max)
+        agg['memory_mb'] = max_chunk_mb
+        agg['dtypes'] = [(col, dtypes[col], int(null_counts[col])) for col in columns]
 
-def run():
-    """Main function to run EDA analysis"""
+        agg['severity_stats'] = describe_stream(*describe['severity_score'])
+        agg['severity_categories'] = severity_categories.sort_values(ascending=False, kind='stable')
+        agg['platform_severity'] = pd.DataFrame(
+            {'mean': [t / c for t, c in platforms.values()], 'count': [c for _, c in platforms.values()]},
+            index=pd.Index(list(platforms), name='platform')
+        ).round(3)
+        agg['severity_hist'] = (severity_hist, severity_edges)
+
+        agg['locations_with_data'] = with_locations
+        agg['entities_mean'] = entities.mean
+        agg['location_counts'] = locations.most_common()
+
+        agg['hour_counts'] = hour_counts
+        agg['day_counts'] = day_counts
+        agg['weekend_count'] = weekend
+        agg['cube'] = cube
+
+        agg['engagement'] = {col: describe_stream(*describe[col]) for col in ENGAGEMENT_COLS if col in columns}
+        agg['engagement_corr'] = {col: correlation.loc['severity_score', col]
+                                  for col in ENGAGEMENT_COLS if col in correlation.columns}
+
+        agg['word_stats'] = describe_stream(*describe['word_count'])
+        agg['word_hist'] = np.histogram(word_values, bins=15, weights=[word_counts[v] for v in word_values])
+        agg['longest_post'] = longest
+        agg['shortest_post'] = shortest
+        agg['confidence_stats'] = describe_stream(*describe['confidence_score'])
+        agg['entities_counts'] = pd.Series(entity_counts).sort_index()
+
+        agg['day_severity_stats'] = pd.DataFrame(
+            {'mean': [day_moments[d].mean for d in present_days],
+             'min': [day_moments[d].min for d in present_days],
+             'max': [day_moments[d].max for d in present_days]},
+            index=pd.Index([DAY_LABELS[d] for d in present_days], name='day_of_week')
+        ).round(3)
+        agg['day_box_stats'] = cbook.boxplot_stats(
+            [day_samples[d].sample for d in present_days],
+            labels=[DAY_LABELS[d] for d in present_days]
+        )
+
+        correlation_cols = [col for col in CORRELATION_COLS if col in correlation.columns]
+        agg['correlation_matrix'] = correlation.loc[correlation_cols, correlation_cols]
+
+        agg['avg_severity'] = describe['severity_score'][0].mean
+        agg['high_severity_pct'] = high_severity / n * 100
+        agg['location_coverage'] = with_locations / n * 100
+        agg['peak_hour'] = int(hour_counts.argmax())
+        agg['peak_hour_count'] = int(hour_counts.max())
+        agg['peak_day'] = raw_days.most_common(1)[0][0]
+        agg['word_severity_corr'] = correlation.loc['word_count', 'severity_score']
+        agg['most_active_platform'] = platform_count.idxmax()
+        agg['platform_pct'] = platform_count.max() / n * 100
+
+        return agg
+
+
+# === FASE DE RENDER (solo dibuja a partir de los agregados) ===
+def _render_overview(agg, path, dpi):
+    plt.figure(figsize=(12, 8))
+
+    # 1. Distribución de severidad
+    plt.subplot(2, 3, 1)
+    counts, edges = agg['severity_hist']
+    plt.bar(edges[:-1], counts, width=np.diff(edges), align='edge', alpha=0.7, color='skyblue', edgecolor='black')
+    plt.title('Distribución de Severidad')
+    plt.xlabel('Score de Severidad')
+    plt.ylabel('Frecuencia')
+
+    plt.subplot(2, 3, 2)
+    severity_counts = agg['severity_categories']
+    plt.pie(severity_counts.values, labels=severity_counts.index, autopct='%1.1f%%', startangle=90)
+    plt.title('Severidad por Categorías')
+
+    # 2. Análisis temporal
+    plt.subplot(2, 3, 3)
+    hour_counts = agg['hour_counts']
+    hours = np.flatnonzero(hour_counts)
+    plt.plot(hours, hour_counts[hours], marker='o', color='orange')
+    plt.title('Accidentes por Hora del Día')
+    plt.xlabel('Hora')
+    plt.ylabel('Cantidad')
+    plt.xticks(range(0, 24, 4))
+
+    plt.subplot(2, 3, 4)
+    days = ['L', 'M', 'X', 'J', 'V', 'S', 'D']
+    plt.bar(days, agg['day_counts'], color='lightcoral')
+    plt.title('Accidentes por Día de la Semana')
+    plt.xlabel('Día')
+    plt.ylabel('Cantidad')
+
+    # 3. Análisis de texto
+    plt.subplot(2, 3, 5)
+    counts, edges = agg['word_hist']
+    plt.bar(edges[:-1], counts, width=np.diff(edges), align='edge', alpha=0.7, color='lightgreen', edgecolor='black')
+    plt.title('Distribución de Palabras por Post')
+    plt.xlabel('Número de Palabras')
+    plt.ylabel('Frecuencia')
+
+    # 4. Entidades encontradas
+    plt.subplot(2, 3, 6)
+    entities_counts = agg['entities_counts']
+    plt.bar(entities_counts.index, entities_counts.values, color='mediumpurple')
+    plt.title('Entidades Encontradas por Post')
+    plt.xlabel('Número de Entidades')
+    plt.ylabel('Cantidad de Posts')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close('all')
+
+
+def _render_correlation(agg, path, dpi):
+    # Mapa de calor de correlaciones
+    plt.figure(figsize=(10, 8))
+    sns.heatmap(agg['correlation_matrix'], annot=True, cmap='coolwarm', center=0,
+                square=True, linewidths=0.5)
+    plt.title('Matriz de Correlación - Variables Numéricas')
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close('all')
+
+
+def _render_severity_by_day(agg, path, dpi):
+    # Boxplot por día a partir de las cajas precalculadas
+    fig, ax = plt.subplots(figsize=(10, 6))
+    box_stats = agg['day_box_stats']
+    if box_stats:
+        colors = sns.color_palette('coolwarm', len(box_stats))
+        boxes = ax.bxp(box_stats, patch_artist=True,
+                       medianprops=dict(color='yellow', linewidth=2),
+                       boxprops=dict(alpha=0.8, linewidth=1.2))
+        for patch, color in zip(boxes['boxes'], colors):
+            patch.set_facecolor(color)
+    ax.set_title("📦 Distribución de Severidad por Día de la Semana", fontsize=13, pad=12)
+    ax.set_xlabel("Día de la semana")
+    ax.set_ylabel("Score de Severidad")
+    ax.grid(axis='y', linestyle='--', alpha=0.6)
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close('all')
+
+
+FIGURES = [
+    ("Gráfico general guardado", 'accidents_eda_overview.png', _render_overview),
+    ("Matriz de correlación guardada", 'accidents_correlation_matrix.png', _render_correlation),
+    ("Boxplot de severidad por día guardado", 'accidents_severity_by_day.png', _render_severity_by_day),
+]
+
+
+def render_figures(aggregates, plots_dir="plots", dpi=300, parallel=True):
+    """Render all figures headlessly (Agg), one process per figure when parallel=True"""
+    os.makedirs(plots_dir, exist_ok=True)
+    jobs = [(label, os.path.join(plots_dir, filename), renderer) for label, filename, renderer in FIGURES]
+
+    if parallel:
+        with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = [executor.submit(renderer, aggregates, path, dpi) for _, path, renderer in jobs]
+            for future in futures:
+                future.result()
+    else:
+        for _, path, renderer in jobs:
+            renderer(aggregates, path, dpi)
+
+    return [(label, path) for label, path, _ in jobs]
+
+
+def run(streaming=False, chunksize=50000, df=None):
+    """Main function to run EDA analysis (streaming=True for archives larger than memory)
+
+    `df` is the already loaded accidents.csv; it is ignored in streaming mode.
+    Returns False when the analysis could not run (pipeline_dag marks the stage failed).
+    """
     accidents_path = os.path.join("ETL", "accidents.csv")
-    
+
     if not os.path.exists(accidents_path):
         print(f"❌ Archivo no encontrado: {accidents_path}")
         print("💡 Ejecuta primero el análisis NPL para generar el archivo accidents.csv")
-        return
-    
-    eda = AccidentsEDA(accidents_path)
-    eda.run_full_analysis()
+        return False
+
+    if streaming:
+        eda = StreamingAccidentsEDA(accidents_path, chunksize=chunksize)
+    else:
+        eda = AccidentsEDA(accidents_path, df=df)
+    return eda.run_full_analysis()
 
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Análisis exploratorio de accidentes")
+    parser.add_argument("--stream", action="store_true", help="procesar el CSV por bloques (out-of-core)")
+    parser.add_argument("--chunksize", type=int, default=50000, help="filas por bloque en modo --stream")
+    args = parser.parse_args()
+    run(streaming=args.stream, chunksize=args.chunksize)
@@ -0,0 +1,201 @@
+"""
+Almacén local (SQLite) de accidentes enriquecidos, indexado por tiempo, ubicación y severidad.
+
+accidents.csv obliga a leer y filtrar el archivo completo para responder
+"accidentes en X en la última hora". Aquí cada post se guarda una vez en
+`accidents` (índices por timestamp y severidad) y una fila por ubicación
+canónica en `accident_locations` (índice location_id + timestamp), así que las
+consultas por ubicación y rango de tiempo son búsquedas en índice.
+"""
+
+import os
+import sqlite3
+from typing import Iterable, Optional
+
+import pandas as pd
+
+try:
+    from ETL.location_catalog import parse_location_ids
+except ImportError:
+    from location_catalog import parse_location_ids
+
+STORE_PATH = os.path.join(os.path.dirname(__file__), 'accidents.db')
+
+# Columnas del CSV enriquecido que se guardan (las que usan los consumidores)
+COLUMNS = ['id', 'timestamp', 'text', 'user', 'platform', 'severity_score', 'confidence_score',
+           'extracted_locations', 'location_ids', 'incident_type_predicted', 'cluster_id', 'hour', 'day_of_week']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS accidents (
+    id TEXT PRIMARY KEY,
+    ts INTEGER,
+    timestamp TEXT,
+    text TEXT,
+    user TEXT,
+    platform TEXT,
+    severity_score REAL,
+    confidence_score REAL,
+    extracted_locations TEXT,
+    location_ids TEXT,
+    incident_type_predicted TEXT,
+    cluster_id INTEGER,
+    hour INTEGER,
+    day_of_week TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_accidents_ts ON accidents(ts);
+CREATE INDEX IF NOT EXISTS idx_accidents_severity ON accidents(severity_score);
+CREATE TABLE IF NOT EXISTS accident_locations (
+    location_id INTEGER NOT NULL,
+    ts INTEGER,
+    accident_id TEXT NOT NULL REFERENCES accidents(id) ON DELETE CASCADE,
+    PRIMARY KEY (location_id, accident_id)
+);
+CREATE INDEX IF NOT EXISTS idx_locations_ts ON accident_locations(location_id, ts);
+CREATE INDEX IF NOT EXISTS idx_locations_accident ON accident_locations(accident_id);
+"""
+
+
+def _epoch_seconds(timestamps) -> pd.Series:
+    ts = pd.to_datetime(pd.Series(timestamps), errors='coerce', utc=True)
+    return pd.Series([int(t.timestamp()) if pd.notna(t) else None for t in ts], dtype=object)
+
+
+def _epoch(timestamp) -> int:
+    ts = pd.Timestamp(timestamp)
+    return int((ts if ts.tzinfo is not None else ts.tz_localize('UTC')).timestamp())
+
+
+class AccidentStore:
+    """Enriched accidents in SQLite with timestamp/location/severity indexes."""
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM accidents").fetchone()[0]
+
+    def insert_frame(self, df_enriched: pd.DataFrame, prune: bool = False) -> int:
+        """Bulk upsert of enriched rows (one transaction); returns the number of rows written.
+
+        prune=True also deletes the stored posts missing from `df_enriched`, so the
+        store mirrors a full re-run of the analyzer instead of accumulating stale rows.
+        """
+        df = df_enriched.reindex(columns=COLUMNS)
+        df = df[df['id'].notna()]
+        ts = _epoch_seconds(df['timestamp'])
+        rows = []
+        location_rows = []
+        for values, epoch in zip(df.itertuples(index=False, name=None), ts):
+            record = [None if pd.isna(v) else (v.item() if hasattr(v, 'item') else v) for v in values]
+            record[1] = None if record[1] is None else str(record[1])
+            accident_id = str(record[0])
+            record[0] = accident_id
+            rows.append([record[0], epoch] + record[1:])
+            location_rows.extend((location_id, epoch, accident_id)
+                                 for location_id in dict.fromkeys(parse_location_ids(record[8])))
+
+        placeholders = ', '.join('?' * (len(COLUMNS) + 1))
+        with self.conn:
+            # Reemplazar un post borra en cascada sus ubicaciones anteriores
+            self.conn.executemany("DELETE FROM accidents WHERE id = ?", [(r[0],) for r in rows])
+            self.conn.executemany(
+                f"INSERT INTO accidents (id, ts, {', '.join(COLUMNS[1:])}) VALUES ({placeholders})", rows)
+            self.conn.executemany("INSERT OR IGNORE INTO accident_locations (location_id, ts, accident_id) "
+                                  "VALUES (?, ?, ?)", location_rows)
+            if prune:
+                self._delete_missing(r[0] for r in rows)
+        return len(rows)
+
+    def _delete_missing(self, keep_ids: Iterable[str]) -> int:
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_ids (id TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM keep_ids")
+        self.conn.executemany("INSERT OR IGNORE INTO keep_ids (id) VALUES (?)", ((str(i),) for i in keep_ids))
+        # Sus filas de accident_locations se borran en cascada
+        deleted = self.conn.execute("DELETE FROM accidents WHERE id NOT IN (SELECT id FROM keep_ids)").rowcount
+        self.conn.execute("DELETE FROM keep_ids")
+        return deleted
+
+    def prune(self, keep_ids: Iterable[str]) -> int:
+        """Delete every stored post whose id is not in `keep_ids`; returns the number deleted."""
+        with self.conn:
+            return self._delete_missing(keep_ids)
+
+    def query(self, location_ids: Optional[Iterable[int]] = None, since=None, until=None,
+              min_severity: Optional[float] = None, with_locations: bool = False,
+              limit: Optional[int] = None) -> pd.DataFrame:
+        """Accidents matching every given filter, newest first.
+
+        location_ids: canonical IDs (any of them); since/until: timestamps
+        (inclusive); with_locations: only posts with at least one location.
+        """
+        clauses, params = [], []
+        if location_ids is not None:
+            location_ids = [int(i) for i in location_ids]
+            if not location_ids:
+                return pd.DataFrame(columns=COLUMNS)
+            time_filter = ''
+            if since is not None:
+                time_filter += ' AND l.ts >= ?'
+            if until is not None:
+                time_filter += ' AND l.ts <= ?'
+            clauses.append(f"a.id IN (SELECT l.accident_id FROM accident_locations l "
+                           f"WHERE l.location_id IN ({', '.join('?' * len(location_ids))}){time_filter})")
+            params.extend(location_ids)
+            params.extend(_epoch(t) for t in (since, until) if t is not None)
+        if since is not None:
+            clauses.append("a.ts >= ?")
+            params.append(_epoch(since))
+        if until is not None:
+            clauses.append("a.ts <= ?")
+            params.append(_epoch(until))
+        if min_severity is not None:
+            clauses.append("a.severity_score >= ?")
+            params.append(float(min_severity))
+        if with_locations:
+            clauses.append("a.id IN (SELECT accident_id FROM accident_locations)")
+
+        sql = f"SELECT {', '.join('a.' + c for c in COLUMNS)} FROM accidents a"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY a.ts DESC"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def count(self, location_ids=None, since=None, until=None) -> int:
+        """Number of accidents at any of `location_ids` in [since, until] (index-only lookup)."""
+        if location_ids is None:
+            sql, params = "SELECT COUNT(*) FROM accidents WHERE 1=1", []
+        else:
+            location_ids = [int(i) for i in location_ids]
+            if not location_ids:
+                return 0
+            sql = (f"SELECT COUNT(DISTINCT accident_id) FROM accident_locations "
+                   f"WHERE location_id IN ({', '.join('?' * len(location_ids))})")
+            params = list(location_ids)
+        if since is not None:
+            sql += " AND ts >= ?"
+            params.append(_epoch(since))
+        if until is not None:
+            sql += " AND ts <= ?"
+            params.append(_epoch(until))
+        return self.conn.execute(sql, params).fetchone()[0]
+
+
+def sync_from_csv(csv_path: str, path: str = STORE_PATH, chunksize: int = 5000, prune: bool = True) -> AccidentStore:
+    """Load an enriched CSV into the store in bulk chunks (prune: drop posts no longer in the CSV)."""
+    store = AccidentStore(path)
+    ids = []
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        store.insert_frame(chunk)
+        ids.extend(chunk['id'].dropna().astype(str))
+    if prune:
+        store.prune(ids)
+    return store
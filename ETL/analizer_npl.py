@@ -3,7 +3,6 @@ import re
 import os
 import numpy as np
 from datetime import datetime
-from collections import Counter
 from typing import List, Dict, Tuple
 
 # NLP Libraries
@@ -18,6 +17,29 @@ from nltk.stem import SnowballStemmer
 from nltk.chunk import ne_chunk
 from nltk.tag import pos_tag
 
+try:
+    from ETL.location_catalog import KNOWN_LOCATIONS, load_catalog
+    from ETL.dedup import cluster_near_duplicates, representatives, dedup_ratio
+    from ETL.feature_store import FeatureStore, content_key
+    from ETL.text_pipeline import (FusedTextProcessor, LOCATION_PATTERNS, KM_PATTERN, SEVERITY_KEYWORDS,
+                                   severity_from_counts, normalize_text)
+    from ETL.report_partials import ReportPartial
+    from ETL.incident_classifier import MODEL_PATH, load_or_bootstrap
+    from ETL.accident_store import AccidentStore
+    from ETL.ner_memo import SentenceNERMemo
+    from ETL.windowed_ner import WindowedNER
+except ImportError:
+    from location_catalog import KNOWN_LOCATIONS, load_catalog
+    from dedup import cluster_near_duplicates, representatives, dedup_ratio
+    from feature_store import FeatureStore, content_key
+    from text_pipeline import (FusedTextProcessor, LOCATION_PATTERNS, KM_PATTERN, SEVERITY_KEYWORDS,
+                               severity_from_counts, normalize_text)
+    from report_partials import ReportPartial
+    from incident_classifier import MODEL_PATH, load_or_bootstrap
+    from accident_store import AccidentStore
+    from ner_memo import SentenceNERMemo
+    from windowed_ner import WindowedNER
+
 try:
     from transformers import pipeline, AutoTokenizer, AutoModel
     import torch
@@ -27,6 +49,8 @@ except ImportError:
     BERT_AVAILABLE = False
     print("⚠️ BERT/Transformers no disponible. Usando solo scikit-learn")
 
+NER_MODEL = "mrm8488/bert-spanish-cased-finetuned-ner"
+
 # Download required NLTK data (solo para stopwords y tokenización)
 try:
     nltk.data.find('tokenizers/punkt')
@@ -43,16 +67,20 @@ class AdvancedNLPAnalyzer:
         print("🚀 Inicializando Analizador NLP Avanzado...")
         
         # Traditional location patterns (as fallback)
-        self.ubicaciones_conocidas = [
-            'george washington', 'máximo gómez', 'máximo gomez', 'winston churchill',
-            'abraham lincoln', 'john f kennedy', 'charles de gaulle', '27 de febrero',
-            'duarte', 'mella', 'sánchez', 'luperón', 'núñez de cáceres',
-            'santo domingo este', 'distrito nacional', 'san isidro',
-            'la barranquita', 'los mina', 'villa mella', 'pantoja',
-            'las américas', 'ecológica', 'charles summer', 'los próceres',
-            'juan pablo duarte', 'isabel aguiar', 'república de colombia',
-            'circunvalación', 'olímpica', 'independencia', 'san vicente de paul'
-        ]
+        self.ubicaciones_conocidas = list(KNOWN_LOCATIONS)
+        
+        # Canonical location table (accent folding, aliases, integer IDs)
+        self.location_catalog = load_catalog()
+        
+        # Persisted TF-IDF matrices, shared memory-mapped with other processes
+        self.feature_store = FeatureStore()
+        
+        # Single-pass processor used by analyze_text_comprehensive and the batch API
+        self.text_processor = FusedTextProcessor(self.ubicaciones_conocidas, self.location_catalog)
+        
+        # Incident type / severity tier classifier (loaded or bootstrapped on first use)
+        self.classifier_path = MODEL_PATH
+        self.incident_classifier = None
         
         # Initialize NLP components
         self.stemmer = SnowballStemmer('spanish')
@@ -68,7 +96,7 @@ class AdvancedNLPAnalyzer:
             try:
                 print("📦 Cargando modelo BERT...")
                 self.ner_pipeline = pipeline("ner", 
-                                           model="mrm8488/bert-spanish-cased-finetuned-ner",
+                                           model=NER_MODEL,
                                            aggregation_strategy="simple")
                 print("✅ BERT NER cargado exitosamente")
             except Exception as e:
@@ -76,6 +104,13 @@ class AdvancedNLPAnalyzer:
                 self.ner_pipeline = None
         else:
             self.ner_pipeline = None
+        
+        # Long sentences are split into overlapping token windows (BERT's 512-token limit)
+        self.windowed_ner = WindowedNER(self.ner_pipeline) if self.ner_pipeline else None
+        
+        # Sentence-level NER memo: repeated boilerplate sentences skip the model
+        self.ner_memo = (SentenceNERMemo(model=f"{NER_MODEL}|{self.windowed_ner.signature}")
+                         if self.ner_pipeline else None)
     
     def preprocess_text(self, texto: str) -> str:
         """Preprocesa el texto para análisis NLP"""
@@ -97,24 +132,34 @@ class AdvancedNLPAnalyzer:
         """Extrae entidades usando BERT NER"""
         if not self.ner_pipeline or pd.isna(texto):
             return []
+        return self.extract_entities_with_bert_batch([texto])[0]
+    
+    def extract_entities_with_bert_batch(self, textos: List[str]) -> List[List[Dict]]:
+        """BERT NER for many posts, one list of LOC/MISC entities per post.
+
+        Posts are split into sentences; sentences already in the memo are not
+        re-run and the rest go to the model in one batch, sentences over the
+        token limit as overlapping windows. 'start'/'end' are character
+        offsets into the original post.
+        """
+        if not self.ner_pipeline:
+            return [[] for _ in textos]
         
         try:
-            entities = self.ner_pipeline(texto)
-            location_entities = []
-            
-            for entity in entities:
-                if entity['entity_group'] in ['LOC', 'MISC'] and entity['score'] > 0.8:
-                    location_entities.append({
-                        'text': entity['word'],
-                        'label': entity['entity_group'],
-                        'confidence': entity['score'],
-                        'method': 'bert'
-                    })
-            
-            return location_entities
+            entities_per_post = self.ner_memo.extract_batch(textos, self.windowed_ner)
         except Exception as e:
             print(f"Error en BERT NER: {e}")
-            return []
+            return [[] for _ in textos]
+        
+        return [[{
+            'text': entity['word'],
+            'label': entity['entity_group'],
+            'confidence': entity['score'],
+            'start': entity['start'],
+            'end': entity['end'],
+            'method': 'bert'
+        } for entity in entities if entity['entity_group'] in ['LOC', 'MISC'] and entity['score'] > 0.8]
+            for entities in entities_per_post]
     
     def extract_entities_with_nltk(self, texto: str) -> List[Dict]:
         """Extrae entidades usando NLTK (deshabilitado por problemas de dependencias)"""
@@ -131,18 +176,7 @@ class AdvancedNLPAnalyzer:
         ubicaciones = []
 
         # Enhanced location patterns
-        patrones = [
-            r'(?:avenida?|av\.?)\s+([^,.\n]+?)(?=\s*[,.\n]|próximo|cerca|kilómetro|$)',
-            r'autopista\s+([^,.\n]+?)(?=\s*[,.\n]|kilómetro|rampa|$)',
-            r'calle\s+([^,.\n]+?)(?=\s*[,.\n]|esquina|$)',
-            r'puente\s+([^,.\n]+?)(?=\s*[,.\n]|rampa|$)',
-            r'circunvalación\s*([^,.\n]*?)(?=\s*[,.\n]|$)',
-            r'paso a desnivel\s+(?:de\s+)?(?:la\s+)?([^,.\n]+?)(?=\s*[,.\n]|$)',
-            r'(?:sector|zona|área)\s+([^,.\n]+?)(?=\s*[,.\n]|$)',
-            r'(?:cerca de|próximo a)\s+([^,.\n]+?)(?=\s*[,.\n]|$)',
-        ]
-
-        for patron in patrones:
+        for patron in LOCATION_PATTERNS:
             matches = re.finditer(patron, texto_lower, re.IGNORECASE)
             for match in matches:
                 ubicacion = match.group(1).strip() if match.lastindex else match.group(0).strip()
@@ -156,34 +190,38 @@ class AdvancedNLPAnalyzer:
                 ubicaciones.append(ubicacion_conocida.title())
 
         # Extract kilometers
-        km_matches = re.finditer(r'kilómetro\s+(\d+)', texto_lower)
+        km_matches = re.finditer(KM_PATTERN, texto_lower)
         for match in km_matches:
             ubicaciones.append(f"Km {match.group(1)}")
 
-        return list(set(ubicaciones))  # Remove duplicates
+        # Canonicalize (accent folding + aliases) and remove duplicates
+        ids = self.location_catalog.ids_for(ubicaciones)
+        return [self.location_catalog.name(i) for i in ids]
     
-    def extract_topics_with_lda(self, textos: List[str], n_topics: int = 5) -> Dict:
+    def extract_topics_with_lda(self, textos: List[str], n_topics: int = 5, preprocessed: bool = False) -> Dict:
         """Extrae temas usando Latent Dirichlet Allocation"""
         if not textos:
             return {}
         
         try:
-            # Preprocess texts
-            processed_texts = [self.preprocess_text(texto) for texto in textos]
+            # Preprocess texts (skipped when they come from the fused pipeline)
+            processed_texts = textos if preprocessed else [self.preprocess_text(texto) for texto in textos]
             processed_texts = [texto for texto in processed_texts if len(texto) > 10]
             
             if len(processed_texts) < 2:
                 return {}
             
-            # Vectorize
-            vectorizer = TfidfVectorizer(
-                max_features=100,
-                stop_words=list(self.stop_words),
-                ngram_range=(1, 2),
-                min_df=2
-            )
-            
-            doc_term_matrix = vectorizer.fit_transform(processed_texts)
+            # Vectorize (reusing the stored matrix when the corpus has not changed)
+            params = dict(max_features=100, ngram_range=(1, 2), min_df=2)
+            key = content_key(processed_texts, sorted(self.stop_words), sorted(params.items()))
+            cached = self.feature_store.load_sparse('lda_tfidf', key)
+            if cached is not None:
+                doc_term_matrix, feature_names = cached
+            else:
+                vectorizer = TfidfVectorizer(stop_words=list(self.stop_words), **params)
+                doc_term_matrix = vectorizer.fit_transform(processed_texts)
+                feature_names = vectorizer.get_feature_names_out()
+                self.feature_store.save_sparse('lda_tfidf', doc_term_matrix, feature_names, key=key)
             
             # LDA
             lda = LatentDirichletAllocation(
@@ -195,12 +233,11 @@ class AdvancedNLPAnalyzer:
             lda.fit(doc_term_matrix)
             
             # Extract topics
-            feature_names = vectorizer.get_feature_names_out()
             topics = {}
             
             for topic_idx, topic in enumerate(lda.components_):
                 top_words_idx = topic.argsort()[-10:][::-1]
-                top_words = [feature_names[i] for i in top_words_idx]
+                top_words = [str(feature_names[i]) for i in top_words_idx]
                 topics[f"Topic_{topic_idx}"] = top_words
             
             return topics
@@ -214,55 +251,37 @@ class AdvancedNLPAnalyzer:
         if pd.isna(texto):
             return {'severity': 0.0, 'confidence': 0.0}
         
-        # Severity indicators
-        severity_keywords = {
-            'high': ['muertos', 'fallecidos', 'heridos graves', 'hospitalizado', 'crítico', 'fatal'],
-            'medium': ['heridos', 'lesionados', 'ambulancia', 'emergencia', 'atascado'],
-            'low': ['lento', 'congestion', 'demora', 'tráfico pesado', 'fila']
-        }
-        
         texto_lower = texto.lower()
         severity_scores = {'high': 0, 'medium': 0, 'low': 0}
         
-        for level, keywords in severity_keywords.items():
+        for level, keywords in SEVERITY_KEYWORDS.items():
             for keyword in keywords:
                 if keyword in texto_lower:
                     severity_scores[level] += 1
         
         # Calculate final severity (0-1 scale)
-        total_high = severity_scores['high'] * 3
-        total_medium = severity_scores['medium'] * 2
-        total_low = severity_scores['low'] * 1
-        
-        total_score = total_high + total_medium + total_low
-        
-        if total_score == 0:
-            return {'severity': 0.3, 'confidence': 0.1}  # Default low severity
-        
-        severity = min((total_high * 0.8 + total_medium * 0.5 + total_low * 0.2) / max(total_score, 1), 1.0)
-        confidence = min(total_score / 10, 1.0)
-        
-        return {'severity': severity, 'confidence': confidence}
+        return severity_from_counts(severity_scores['high'], severity_scores['medium'], severity_scores['low'])
     
-    def analyze_text_comprehensive(self, texto: str) -> Dict:
-        """Análisis comprensivo del texto usando múltiples técnicas NLP"""
+    def analyze_text_comprehensive(self, texto: str, fused: Dict = None) -> Dict:
+        """Análisis comprensivo del texto usando múltiples técnicas NLP
+
+        `fused` is this text's output of the fused processor when it was already
+        computed in batch (analyze_texts_batch).
+        """
         if pd.isna(texto):
             return {}
         
-        result = {
-            'original_text': texto,
-            'processed_text': self.preprocess_text(texto),
-            'locations_regex': self.extract_locations_regex(texto),
-            'entities_nltk': self.extract_entities_with_nltk(texto),
-            'severity': self.classify_incident_severity(texto),
-            'word_count': len(texto.split()),
-            'char_count': len(texto)
-        }
+        # Normalization, regex/gazetteer locations, severity and counts in one pass
+        result = dict(fused) if fused is not None else self.text_processor.process(texto)
+        result['entities_nltk'] = self.extract_entities_with_nltk(texto)
         
-        # Add BERT analysis if available
-        if BERT_AVAILABLE:
+        # Add BERT analysis if available (enrich_batch precomputes it for the whole batch)
+        if BERT_AVAILABLE and 'entities_bert' not in result:
             result['entities_bert'] = self.extract_entities_with_bert(texto)
         
+        if not result['entities_nltk'] and not result.get('entities_bert'):
+            return result  # location_ids/all_locations already set by the fused processor
+        
         # Combine all location extractions
         all_locations = set()
         
@@ -282,59 +301,124 @@ class AdvancedNLPAnalyzer:
                 if entity.get('label') == 'LOC':
                     all_locations.add(entity.get('text', ''))
         
-        # Remove empty strings
-        all_locations = {loc for loc in all_locations if loc and loc.strip()}
+        # Canonicalize, removing empty strings and duplicates
+        location_ids = self.location_catalog.ids_for(sorted(all_locations))
         
-        result['all_locations'] = list(all_locations)
+        result['location_ids'] = location_ids
+        result['all_locations'] = [self.location_catalog.name(i) for i in location_ids]
         
         return result
     
-    def analyze_dataset(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Analiza todo el dataset usando técnicas NLP avanzadas"""
-        print(f"🔍 Analizando {len(df)} textos con NLP avanzado...")
-        
-        df_enriched = df.copy()
-        
-        # Initialize new columns
-        df_enriched['extracted_locations'] = ''
-        df_enriched['severity_score'] = 0.0
-        df_enriched['confidence_score'] = 0.0
-        df_enriched['word_count'] = 0
-        df_enriched['entities_found'] = 0
-        df_enriched['incident_type_predicted'] = ''
-        
-        # Analyze each text
-        all_analyses = []
-        for idx, row in df.iterrows():
+    def analyze_texts_batch(self, textos: List[str]) -> List[Dict]:
+        """Batch version of analyze_text_comprehensive (vectorized fused pass, then NER per text)."""
+        fused = self.text_processor.process_batch(textos)
+        return [self.analyze_text_comprehensive(texto, f) if f else {} for texto, f in zip(textos, fused)]
+    
+    def enrich_batch(self, textos: List[str], normalized: List[Tuple[str, str]] = None) -> Dict[str, np.ndarray]:
+        """Enrichment columns for a batch of texts, as typed arrays of len(textos).
+
+        'locations' and 'location_ids' are object arrays of lists; scores are
+        float64 and counts int64. 'incident_type_predicted' (choque, obra, ...)
+        and 'severity_tier_predicted' (low/medium/high) come from the hashing +
+        SGD classifier in incident_classifier.py. `normalized` is normalize_text()
+        of each text when the caller already computed it.
+        """
+        n = len(textos)
+        locations = np.empty(n, dtype=object)
+        location_ids = np.empty(n, dtype=object)
+        processed = np.empty(n, dtype=object)
+        severity = np.zeros(n, dtype=np.float64)
+        confidence = np.zeros(n, dtype=np.float64)
+        word_count = np.zeros(n, dtype=np.int64)
+        
+        fused = self.text_processor.process_batch(textos, normalized)
+        if self.ner_pipeline:
+            for f, entities in zip(fused, self.extract_entities_with_bert_batch(textos)):
+                if f:
+                    f['entities_bert'] = entities
+            memo = self.ner_memo.stats()
+            print(f"🧠 Memo NER por oración: {memo['hit_rate']:.1%} aciertos "
+                  f"({memo['hits']} de {memo['hits'] + memo['misses']} oraciones, {memo['entries']} en memo)")
+            self.ner_memo.save()
+        for i, texto in enumerate(textos):
+            locations[i], location_ids[i], processed[i] = [], [], ''
             try:
-                analysis = self.analyze_text_comprehensive(row['text'])
-                all_analyses.append(analysis)
-                
-                # Update dataframe with safe defaults
-                locations = analysis.get('all_locations', [])
-                severity = analysis.get('severity', {'severity': 0.0, 'confidence': 0.0})
-                
-                df_enriched.at[idx, 'extracted_locations'] = ', '.join(locations)
-                df_enriched.at[idx, 'severity_score'] = severity.get('severity', 0.0)
-                df_enriched.at[idx, 'confidence_score'] = severity.get('confidence', 0.0)
-                df_enriched.at[idx, 'word_count'] = analysis.get('word_count', 0)
-                df_enriched.at[idx, 'entities_found'] = len(locations)
-                
+                analysis = self.analyze_text_comprehensive(texto, fused[i] or None)
+                scores = analysis.get('severity', {'severity': 0.0, 'confidence': 0.0})
+                locations[i] = analysis.get('all_locations', [])
+                location_ids[i] = analysis.get('location_ids', [])
+                processed[i] = analysis.get('processed_text', '')
+                severity[i] = scores.get('severity', 0.0)
+                confidence[i] = scores.get('confidence', 0.0)
+                word_count[i] = analysis.get('word_count', 0)
             except Exception as e:
-                print(f"Error procesando texto en fila {idx}: {e}")
-                # Set default values for failed analysis
-                df_enriched.at[idx, 'extracted_locations'] = ''
-                df_enriched.at[idx, 'severity_score'] = 0.0
-                df_enriched.at[idx, 'confidence_score'] = 0.0
-                df_enriched.at[idx, 'word_count'] = 0
-                df_enriched.at[idx, 'entities_found'] = 0
+                print(f"Error procesando texto {i}: {e}")
             
-            if idx % 50 == 0:
-                print(f"✅ Procesados {idx + 1}/{len(df)} textos...")
+            if i % 50 == 0:
+                print(f"✅ Procesados {i + 1}/{n} textos únicos...")
+        
+        if self.incident_classifier is None:
+            self.incident_classifier = load_or_bootstrap(textos, severity, self.classifier_path)
+        incident_type, severity_tier = self.incident_classifier.predict(textos)
+        return {
+            'locations': locations,
+            'location_ids': location_ids,
+            'processed_text': processed,
+            'severity_score': severity,
+            'confidence_score': confidence,
+            'word_count': word_count,
+            'entities_found': np.fromiter((len(l) for l in locations), dtype=np.int64, count=n),
+            'incident_type_predicted': incident_type,
+            'severity_tier_predicted': severity_tier,
+        }
+    
+    def analyze_dataset(self, df: pd.DataFrame, deduplicate: bool = True) -> pd.DataFrame:
+        """Analiza todo el dataset usando técnicas NLP avanzadas
+
+        Con deduplicate=True los casi duplicados (MinHash/LSH) se agrupan en
+        'cluster_id' y sólo se analiza un representante por grupo.
+        """
+        print(f"🔍 Analizando {len(df)} textos con NLP avanzado...")
+        
+        df_enriched = df.copy()
         
-        # Topic modeling on the entire corpus
+        # Una sola normalización por post: la usan el MinHash y el procesador fusionado
+        textos = df['text'].tolist()
+        normalized = [normalize_text(t) if not pd.isna(t) else None for t in textos]
+
+        # Agrupar republicaciones del mismo incidente antes del análisis costoso
+        if deduplicate:
+            cluster_ids = cluster_near_duplicates([n[1] if n else '' for n in normalized])
+        else:
+            cluster_ids = np.arange(len(df), dtype=np.int32)
+        df_enriched['cluster_id'] = cluster_ids
+        rep_positions = representatives(cluster_ids)
+        print(f"🧬 {len(rep_positions)} grupos únicos ({dedup_ratio(cluster_ids):.1%} casi duplicados)")
+        
+        # Analyze one representative per cluster and propagate to its members
+        columns = self.enrich_batch([textos[p] for p in rep_positions], [normalized[p] for p in rep_positions])
+        rep_number = np.zeros(int(cluster_ids.max()) + 1 if len(cluster_ids) else 0, dtype=np.int64)
+        rep_number[cluster_ids[rep_positions]] = np.arange(len(rep_positions))
+        row_rep = rep_number[cluster_ids]
+        # Clave estable del incidente entre corridas (cluster_id se reinicia en cada una)
+        rep_ids = df['id'].to_numpy()[rep_positions] if 'id' in df.columns else rep_positions
+        df_enriched['incident_id'] = rep_ids.astype(str)[row_rep]
+        
+        # One assignment for all new columns (listas -> texto separado por comas, como en el CSV)
+        df_enriched = df_enriched.assign(
+            extracted_locations=[', '.join(locs) for locs in columns['locations'][row_rep]],
+            location_ids=[', '.join(map(str, ids)) for ids in columns['location_ids'][row_rep]],
+            severity_score=columns['severity_score'][row_rep],
+            confidence_score=columns['confidence_score'][row_rep],
+            word_count=columns['word_count'][row_rep],
+            entities_found=columns['entities_found'][row_rep],
+            incident_type_predicted=columns['incident_type_predicted'][row_rep],
+            severity_tier_predicted=columns['severity_tier_predicted'][row_rep],
+        )
+        
+        # Topic modeling on the corpus (one text per cluster so reposts don't skew topics)
         print("📊 Extrayendo temas principales...")
-        topics = self.extract_topics_with_lda(df['text'].tolist())
+        topics = self.extract_topics_with_lda(list(columns['processed_text']), preprocessed=True)
         
         # Print topic analysis
         if topics:
@@ -344,48 +428,17 @@ class AdvancedNLPAnalyzer:
         
         return df_enriched
     
-    def generate_report(self, df_enriched: pd.DataFrame) -> Dict:
-        """Genera un reporte comprensivo del análisis"""
+    def generate_report(self, df_enriched: pd.DataFrame = None, partial: ReportPartial = None) -> Dict:
+        """Genera un reporte comprensivo del análisis
+
+        The report comes from mergeable partial aggregates (ETL/report_partials.py);
+        pass `partial` to report on chunks/shards already aggregated elsewhere.
+        """
         print("\n📋 Generando reporte de análisis...")
         
-        # Location analysis
-        all_locations = []
-        for locations_str in df_enriched['extracted_locations'].dropna():
-            if locations_str:
-                all_locations.extend(locations_str.split(', '))
-        
-        location_counts = Counter(all_locations)
-        
-        # Severity analysis
-        avg_severity = df_enriched['severity_score'].mean()
-        high_severity = len(df_enriched[df_enriched['severity_score'] > 0.7])
-        medium_severity = len(df_enriched[(df_enriched['severity_score'] > 0.3) & (df_enriched['severity_score'] <= 0.7)])
-        low_severity = len(df_enriched[df_enriched['severity_score'] <= 0.3])
-        
-        # Entity analysis
-        avg_entities = df_enriched['entities_found'].mean()
-        total_entities = df_enriched['entities_found'].sum()
-        
-        report = {
-            'total_posts': len(df_enriched),
-            'total_entities_found': total_entities,
-            'avg_entities_per_post': avg_entities,
-            'top_locations': dict(location_counts.most_common(10)),
-            'severity_analysis': {
-                'average_severity': avg_severity,
-                'high_severity_incidents': high_severity,
-                'medium_severity_incidents': medium_severity,
-                'low_severity_incidents': low_severity
-            },
-            'word_statistics': {
-                'avg_words_per_post': df_enriched['word_count'].mean(),
-                'total_words': df_enriched['word_count'].sum(),
-                'min_words': df_enriched['word_count'].min(),
-                'max_words': df_enriched['word_count'].max()
-            }
-        }
-        
-        return report
+        if partial is None:
+            partial = ReportPartial().update(df_enriched)
+        return partial.report()
 
 
 def main():
@@ -431,6 +484,7 @@ def main():
     print("\n📊 REPORTE FINAL:")
     print("-" * 40)
     print(f"  Posts analizados: {reporte['total_posts']}")
+    print(f"  Incidentes únicos: {reporte['unique_incidents']} (duplicados: {reporte['dedup_ratio']:.1%})")
     print(f"  Entidades encontradas: {reporte['total_entities_found']}")
     print(f"  Promedio entidades por post: {reporte['avg_entities_per_post']:.2f}")
     print(f"  Severidad promedio: {reporte['severity_analysis']['average_severity']:.2f}")
@@ -449,6 +503,17 @@ def main():
     df_enriquecido.to_csv(output_path, index=False)
     print(f"\n✓ Dataset enriquecido guardado en: {output_path}")
 
+    # Indexed copy for location/time-range queries (recomendation_by_accidente);
+    # prune=True: los posts que ya no están en el CSV salen también del almacén
+    store = AccidentStore()
+    store.insert_frame(df_enriquecido, prune=True)
+    print(f"✓ Almacén de accidentes actualizado: {len(store)} posts en {store.path}")
+    store.close()
+
+    # Save canonical location table shared with the other modules
+    analizador.location_catalog.save()
+    print(f"✓ Catálogo de ubicaciones guardado: {len(analizador.location_catalog)} ubicaciones canónicas")
+
     print("\n" + "=" * 80)
     print("✅ ANÁLISIS NLP AVANZADO COMPLETADO")
     print("=" * 80)
@@ -0,0 +1,369 @@
+"""
+Extracción concurrente de varias cuentas objetivo.
+
+Un pool acotado de workers asyncio reparte las cuentas; las llamadas bloqueantes
+del loader se ejecutan en hilos (asyncio.to_thread). Cada host tiene su propio
+limitador de tasa (token bucket) y los errores de throttling/conexión se
+reintentan con backoff exponencial con jitter. El perfil de cada cuenta se
+resuelve como mucho una vez (ProfileCache con TTL, persistida entre ejecuciones)
+y cada cuenta escribe su checkpoint (cursor + filas ya
+descargadas), así que una ejecución interrumpida se reanuda donde quedó.
+
+Uso:
+    python async_extractor.py cuenta1 cuenta2 --workers 4
+    python async_extractor.py cuenta1 cuenta2 --fake      # loader local simulado
+
+Con --fake la salida y los checkpoints van por defecto a un directorio temporal
+(FAKE_DIR), para no mezclar posts simulados con instagram_posts.csv.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, List
+
+import pandas as pd
+
+try:
+    from ETL.extract_instagram_posts import (LIMIT, OUTPUT_FILE, USERNAME, crear_loader,
+                                             cargar_existentes, guardar_posts, instaloader,
+                                             post_a_registro)
+    from ETL.profile_cache import ProfileCache
+except ImportError:
+    from extract_instagram_posts import (LIMIT, OUTPUT_FILE, USERNAME, crear_loader,
+                                         cargar_existentes, guardar_posts, instaloader,
+                                         post_a_registro)
+    from profile_cache import ProfileCache
+
+CHECKPOINT_DIR = os.path.join(os.path.dirname(__file__), '.checkpoints')
+FAKE_DIR = os.path.join(tempfile.gettempdir(), 'npltrafico_fake_extract')
+
+
+class ThrottledError(Exception):
+    """The host asked us to slow down (HTTP 429 or equivalent)."""
+
+
+# =============================
+# 🔌 LOADERS
+# =============================
+class InstaloaderBackend:
+    """Blocking Instaloader access behind the interface used by the async extractor.
+
+    fetch_profile(target) -> {'followers', 'is_verified'}
+    fetch_page(target, cursor, page_size, owner) -> (rows, next_cursor or None)
+    The cursor is Instaloader's frozen NodeIterator, so it can be stored in a checkpoint.
+    """
+
+    host = "instagram.com"
+
+    def __init__(self, loader):
+        self.loader = loader
+        self._profiles = {}
+        self._lock = threading.Lock()  # el contexto de Instaloader no es thread-safe
+
+    def _call(self, fn):
+        with self._lock:
+            try:
+                return fn()
+            except instaloader.exceptions.TooManyRequestsException as e:
+                raise ThrottledError(str(e)) from e
+            except instaloader.exceptions.QueryReturnedNotFoundException:
+                raise  # subclase de ConnectionException, pero reintentar un 404 no sirve
+            except instaloader.exceptions.ConnectionException as e:
+                raise ConnectionError(str(e)) from e  # caídas de red/5xx: reintentables en _call
+
+    def _profile(self, target):
+        if target not in self._profiles:
+            self._profiles[target] = instaloader.Profile.from_username(self.loader.context, target)
+        return self._profiles[target]
+
+    def fetch_profile(self, target):
+        def fetch():
+            profile = self._profile(target)
+            return {"followers": profile.followers, "is_verified": profile.is_verified}
+        return self._call(fetch)
+
+    def fetch_page(self, target, cursor, page_size, owner):
+        def fetch():
+            posts = self._profile(target).get_posts()
+            if cursor:
+                posts.thaw(instaloader.FrozenNodeIterator(**cursor))
+            rows = [post_a_registro(post, owner) for post in islice(posts, page_size)]
+            next_cursor = posts.freeze()._asdict() if len(rows) == page_size else None
+            return rows, next_cursor
+        return self._call(fetch)
+
+
+class FakeLoader:
+    """Local stand-in for Instagram: simulated latency, periodic throttling and call counters."""
+
+    host = "fake.local"
+
+    def __init__(self, posts_per_target=40, latency=0.02, throttle_every=5, seed=42):
+        self.posts_per_target = posts_per_target
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.calls = 0
+        self.profile_calls = 0
+        self.throttled = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _request(self):
+        with self._lock:
+            self.calls += 1
+            throttle = self.throttle_every and self.calls % self.throttle_every == 0
+            if throttle:
+                self.throttled += 1
+        time.sleep(self.latency * (0.5 + self._rng.random()))
+        if throttle:
+            raise ThrottledError("429 Too Many Requests (simulado)")
+
+    def fetch_profile(self, target):
+        self._request()
+        with self._lock:
+            self.profile_calls += 1
+        return {"followers": 1000 + len(target) * 37, "is_verified": len(target) % 2 == 0}
+
+    def fetch_page(self, target, cursor, page_size, owner):
+        self._request()
+        start = cursor["offset"] if cursor else 0
+        end = min(start + page_size, self.posts_per_target)
+        base = datetime(2025, 1, 1)
+        rows = []
+        for i in range(start, end):
+            date = base + timedelta(hours=7 * i + len(target))
+            rows.append({
+                "id": f"{target}-{i:05d}",
+                "text": f"Accidente registrado en la avenida {i % 7} ({target})",
+                "timestamp": date,
+                "user": target,
+                "platform": "instagram",
+                "likes": i * 3,
+                "comments_count": i % 11,
+                "video_views": 0,
+                "is_video": False,
+                "image_url": "",
+                "post_url": f"https://instagram.com/p/{target}-{i:05d}",
+                "account_followers": owner["followers"],
+                "account_verified": owner["is_verified"],
+                "year": date.year,
+                "month": date.month,
+                "day": date.day,
+                "hour": date.hour,
+                "day_of_week": date.strftime("%A"),
+                "is_weekend": date.weekday() >= 5,
+                "hashtags": "",
+                "mentions": "",
+            })
+        return rows, ({"offset": end} if end < self.posts_per_target else None)
+
+
+# =============================
+# ⏱️ LÍMITE DE TASA Y REINTENTOS
+# =============================
+class RateLimiter:
+    """Async token bucket: at most `rate` requests per second with bursts up to `burst`."""
+
+    def __init__(self, rate=1.0, burst=2):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Checkpoint:
+    """Per-target progress file: cursor, rows fetched so far and whether the target is done."""
+
+    def __init__(self, checkpoint_dir, target):
+        self.path = os.path.join(checkpoint_dir, f"{target}.json")
+        self.target = target
+        self.cursor = None
+        self.rows: List[Dict] = []
+        self.done = False
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.cursor, self.rows, self.done = state["cursor"], state["rows"], state["done"]
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"target": self.target, "cursor": self.cursor, "rows": self.rows,
+                       "done": self.done}, f, default=str, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+# =============================
+# 🚀 EXTRACTOR CONCURRENTE
+# =============================
+class AsyncExtractor:
+    """Fetch several target accounts concurrently with a bounded worker pool."""
+
+    def __init__(self, backend, targets, limit=LIMIT, workers=4, page_size=12,
+                 rate=1.0, burst=2, max_retries=5, backoff_base=1.0, backoff_max=60.0,
+                 checkpoint_dir=CHECKPOINT_DIR, existing_ids=(), profile_cache=None):
+        self.backend = backend
+        self.targets = list(dict.fromkeys(targets))
+        self.limit = limit
+        self.workers = workers
+        self.page_size = page_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.checkpoint_dir = checkpoint_dir
+        self.existing_ids = set(existing_ids)
+        self.profile_cache = profile_cache if profile_cache is not None else ProfileCache()
+        self.rate = rate
+        self.burst = burst
+        self.limiters: Dict[str, RateLimiter] = {}
+        self.stats = {"requests": 0, "retries": 0, "failed_targets": []}
+
+    def _limiter(self, host):
+        if host not in self.limiters:
+            self.limiters[host] = RateLimiter(self.rate, self.burst)
+        return self.limiters[host]
+
+    async def _call(self, fn, *args):
+        """Rate-limited blocking call in a thread, retried with exponential backoff and jitter."""
+        limiter = self._limiter(getattr(self.backend, "host", "default"))
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire()
+            self.stats["requests"] += 1
+            try:
+                return await asyncio.to_thread(fn, *args)
+            except (ThrottledError, ConnectionError, TimeoutError) as e:
+                if attempt == self.max_retries:
+                    raise
+                self.stats["retries"] += 1
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                delay *= 0.5 + random.random() / 2
+                print(f"⏳ {e} - reintento {attempt + 1}/{self.max_retries} en {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _owner(self, target):
+        """Owner profile, resolved at most once per account instead of once per post."""
+        owner = self.profile_cache.get(target)
+        if owner is None:
+            owner = await self._call(self.backend.fetch_profile, target)
+            self.profile_cache.put(target, owner)
+        return owner
+
+    async def _extract_target(self, target):
+        checkpoint = Checkpoint(self.checkpoint_dir, target)
+        if checkpoint.done:
+            print(f"🧩 '{target}' ya completado ({len(checkpoint.rows)} posts en checkpoint)")
+            return checkpoint.rows
+        owner = await self._owner(target)
+        while len(checkpoint.rows) < self.limit:
+            page_size = min(self.page_size, self.limit - len(checkpoint.rows))
+            rows, cursor = await self._call(self.backend.fetch_page, target, checkpoint.cursor,
+                                            page_size, owner)
+            checkpoint.rows.extend(r for r in rows if r["id"] not in self.existing_ids)
+            checkpoint.cursor = cursor
+            checkpoint.save()
+            if cursor is None:
+                break
+        checkpoint.done = True
+        checkpoint.save()
+        print(f"✅ '{target}': {len(checkpoint.rows)} posts nuevos")
+        return checkpoint.rows
+
+    async def _worker(self, queue, results):
+        while True:
+            try:
+                target = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                results[target] = await self._extract_target(target)
+            except Exception as e:
+                # El checkpoint conserva lo descargado; la próxima ejecución continúa desde ahí
+                print(f"❌ Error extrayendo '{target}': {e}")
+                self.stats["failed_targets"].append(target)
+
+    async def run(self) -> pd.DataFrame:
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        queue = asyncio.Queue()
+        for target in self.targets:
+            queue.put_nowait(target)
+        results: Dict[str, List[Dict]] = {}
+        n_workers = min(self.workers, len(self.targets)) or 1
+        await asyncio.gather(*(self._worker(queue, results) for _ in range(n_workers)))
+        self.profile_cache.save()
+        rows = [row for target in self.targets for row in results.get(target, [])]
+        return pd.DataFrame(rows)
+
+
+def extraer(backend, targets, output_file=OUTPUT_FILE, **kwargs) -> pd.DataFrame:
+    """Run the concurrent extraction and merge the new posts into the output CSV."""
+    df_existing, existing_ids = cargar_existentes(output_file)
+    extractor = AsyncExtractor(backend, targets, existing_ids=existing_ids, **kwargs)
+    inicio = time.perf_counter()
+    df_new = asyncio.run(extractor.run())
+    print(f"\n⏱️ {len(targets)} cuentas en {time.perf_counter() - inicio:.2f}s: "
+          f"{extractor.stats['requests']} peticiones, {extractor.stats['retries']} reintentos")
+    cache = extractor.profile_cache.stats()
+    print(f"👤 Caché de perfiles: {cache['hits']} aciertos, {cache['misses']} fallos, "
+          f"{cache['requests_saved']} peticiones ahorradas")
+    guardar_posts(df_new.to_dict("records"), df_existing, output_file)
+
+    # Los checkpoints sólo hacen falta para reanudar cuentas que no terminaron
+    for target in extractor.targets:
+        if target not in extractor.stats["failed_targets"]:
+            path = os.path.join(extractor.checkpoint_dir, f"{target}.json")
+            if os.path.exists(path):
+                os.remove(path)
+    return df_new
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extracción concurrente de cuentas de Instagram")
+    parser.add_argument("targets", nargs="+", help="Cuentas objetivo")
+    parser.add_argument("--limit", type=int, default=LIMIT, help="Máximo de posts por cuenta")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=1.0, help="Peticiones por segundo por host")
+    parser.add_argument("--output", help=f"CSV de salida (por defecto {OUTPUT_FILE}; con --fake, en {FAKE_DIR})")
+    parser.add_argument("--checkpoints", help=f"Directorio de checkpoints (por defecto {CHECKPOINT_DIR})")
+    parser.add_argument("--fake", action="store_true", help="Usar el loader local simulado")
+    args = parser.parse_args()
+
+    profile_cache = None
+    if args.fake:
+        backend = FakeLoader()
+        profile_cache = ProfileCache(path=None)  # no mezclar perfiles simulados con los reales
+        os.makedirs(FAKE_DIR, exist_ok=True)
+        args.output = args.output or os.path.join(FAKE_DIR, 'instagram_posts.csv')
+        args.checkpoints = args.checkpoints or os.path.join(FAKE_DIR, '.checkpoints')
+    else:
+        try:
+            backend = InstaloaderBackend(crear_loader(USERNAME))
+        except Exception as e:
+            print(f"❌ Error al cargar la sesión manual: {e}")
+            return
+    extraer(backend, args.targets, output_file=args.output or OUTPUT_FILE, limit=args.limit,
+            workers=args.workers, rate=args.rate, checkpoint_dir=args.checkpoints or CHECKPOINT_DIR,
+            profile_cache=profile_cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Detección de publicaciones casi duplicadas con MinHash + LSH.
+
+Las cuentas de tráfico republican el mismo incidente con pequeños cambios de
+redacción. Cada texto se convierte en una firma MinHash de sus shingles de
+palabras; el LSH por bandas sólo compara textos que comparten alguna banda,
+así que el agrupamiento es sub-cuadrático en vez de comparar todos contra todos.
+"""
+
+import zlib
+from typing import Iterable, List, Set
+
+import numpy as np
+
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingles(texto: str, k: int = 3) -> Set[str]:
+    """Word k-shingles of an already preprocessed text (the whole text if shorter)."""
+    words = texto.split()
+    if len(words) <= k:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+class MinHasher:
+    """MinHash signatures with `num_perm` universal hash functions (a*x + b mod p)."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 42):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        # a < 2^31 y x < 2^32: a*x + b no desborda uint64
+        self.a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, items: Iterable[str]) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in items), dtype=np.uint64)
+        if len(hashes) == 0:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        permuted = ((np.outer(hashes, self.a) + self.b) % _PRIME) & _MAX_HASH
+        return permuted.min(axis=0)
+
+
+def estimated_jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    return float(np.mean(sig_a == sig_b))
+
+
+class _DisjointSet:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # El representante es siempre el primer texto del grupo
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def cluster_near_duplicates(textos: List[str], threshold: float = 0.8, k: int = 3,
+                            num_perm: int = 128, bands: int = 16, seed: int = 42) -> np.ndarray:
+    """Cluster id per text; near-duplicates (estimated Jaccard >= threshold) share an id.
+
+    Cluster ids are consecutive integers in order of first appearance, so the
+    first text of each cluster is its representative.
+    """
+    hasher = MinHasher(num_perm, seed)
+    rows = num_perm // bands
+    signatures = np.array([hasher.signature(shingles(t, k)) for t in textos], dtype=np.uint64)
+    signatures = signatures.reshape(len(textos), num_perm)
+    groups = _DisjointSet(len(textos))
+
+    for band in range(bands):
+        buckets = {}
+        for i, key in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+            buckets.setdefault(key.tobytes(), []).append(i)
+        for members in buckets.values():
+            # Comparar cada candidato sólo con un miembro por grupo ya formado en el bucket
+            heads = []
+            for member in members:
+                for head in heads:
+                    if groups.find(head) != groups.find(member) and \
+                            estimated_jaccard(signatures[head], signatures[member]) >= threshold:
+                        groups.union(head, member)
+                if all(groups.find(head) != groups.find(member) for head in heads):
+                    heads.append(member)
+
+    roots = [groups.find(i) for i in range(len(textos))]
+    ids = {}
+    return np.array([ids.setdefault(r, len(ids)) for r in roots], dtype=np.int32)
+
+
+def representatives(cluster_ids: np.ndarray) -> np.ndarray:
+    """Row position of the first member of each cluster, indexed by cluster id."""
+    _, first = np.unique(cluster_ids, return_index=True)
+    return first
+
+
+def dedup_ratio(cluster_ids: np.ndarray) -> float:
+    """Fraction of rows that are near-duplicates of an earlier row."""
+    if len(cluster_ids) == 0:
+        return 0.0
+    return 1.0 - len(np.unique(cluster_ids)) / len(cluster_ids)
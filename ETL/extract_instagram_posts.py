@@ -7,6 +7,7 @@ Este script descarga publicaciones de una cuenta pública o privada (si tienes a
 usando Instaloader y las guarda en formato CSV con metadatos útiles.
 
 Ahora soporta reanudar descargas sin duplicar publicaciones.
+Para varias cuentas a la vez, ver async_extractor.py.
 
 Requisitos:
     - Python 3.12+
@@ -17,13 +18,22 @@ Importante:
     Usa cookies manuales para evitar errores 401 Unauthorized.
 """
 
-import instaloader
 from itertools import islice
 from datetime import datetime
 import csv
 import os
 import pandas as pd
 
+try:
+    import instaloader
+except ImportError:
+    instaloader = None
+
+try:
+    from ETL.profile_cache import ProfileCache
+except ImportError:
+    from profile_cache import ProfileCache
+
 # =============================
 # 🔧 CONFIGURACIÓN
 # =============================
@@ -45,95 +55,138 @@ cookies = {
     "ig_did": "<ig_did_value>"
 }
 
+
 # =============================
 # 🚀 INICIALIZAR INSTALOADER
 # =============================
-L = instaloader.Instaloader()
-
-try:
-    L.load_session(USERNAME, cookies)
-    print(f"✅ Sesión manual cargada correctamente para '{USERNAME}'")
+def crear_loader(username=USERNAME, session_cookies=None):
+    """Instaloader instance with the manual cookie session loaded."""
+    L = instaloader.Instaloader()
+    L.load_session(username, session_cookies or cookies)
+    print(f"✅ Sesión manual cargada correctamente para '{username}'")
     print(f"👤 Usuario autenticado: {L.test_login()}")
-except Exception as e:
-    print(f"❌ Error al cargar la sesión manual: {e}")
-    exit()
+    return L
+
 
 # =============================
 # 📂 CARGAR POSTS EXISTENTES (si hay)
 # =============================
-existing_shortcodes = set()
-if os.path.exists(OUTPUT_FILE):
-    df_existing = pd.read_csv(OUTPUT_FILE)
-    existing_shortcodes = set(df_existing["id"].tolist())
-    print(f"🧩 Se encontraron {len(existing_shortcodes)} publicaciones ya guardadas.")
-else:
-    df_existing = pd.DataFrame()
+def cargar_existentes(output_file=OUTPUT_FILE):
+    """Return (existing DataFrame, set of saved shortcodes)."""
+    if os.path.exists(output_file):
+        df_existing = pd.read_csv(output_file)
+        existing_shortcodes = set(df_existing["id"].tolist())
+        print(f"🧩 Se encontraron {len(existing_shortcodes)} publicaciones ya guardadas.")
+        return df_existing, existing_shortcodes
+    return pd.DataFrame(), set()
+
+
+def perfil_del_autor(post, cache):
+    """Owner followers/is_verified through the profile cache (one request per account, not per post)."""
+    return cache.lookup(post.owner_username, lambda: {
+        "followers": post.owner_profile.followers,
+        "is_verified": post.owner_profile.is_verified,
+    })
+
+
+def post_a_registro(post, owner):
+    """CSV row for one post; `owner` holds the account's followers/is_verified."""
+    return {
+        "id": post.shortcode,
+        "text": post.caption or "",
+        "timestamp": post.date_utc,
+        "user": post.owner_username,
+        "platform": "instagram",
+        "likes": post.likes,
+        "comments_count": post.comments,
+        "video_views": post.video_view_count if post.is_video else 0,
+        "is_video": post.is_video,
+        "image_url": post.url,
+        "post_url": f"https://instagram.com/p/{post.shortcode}",
+        "account_followers": owner["followers"],
+        "account_verified": owner["is_verified"],
+        "year": post.date_utc.year,
+        "month": post.date_utc.month,
+        "day": post.date_utc.day,
+        "hour": post.date_utc.hour,
+        "day_of_week": post.date_utc.strftime("%A"),
+        "is_weekend": post.date_utc.weekday() >= 5,
+        "hashtags": ", ".join(post.caption_hashtags or []),
+        "mentions": ", ".join(post.caption_mentions or []),
+    }
+
 
 # =============================
-# 📥 DESCARGAR PUBLICACIONES NUEVAS
+# 💾 GUARDAR RESULTADOS
 # =============================
-try:
-    profile = instaloader.Profile.from_username(L.context, TARGET)
-    print(f"\n📸 Descargando nuevas publicaciones de '{TARGET}' (hasta {LIMIT} máximo)...\n")
-
-    new_posts = []
-
-    for post in islice(profile.get_posts(), LIMIT):
-        if post.shortcode in existing_shortcodes:
-            print(f"⏩ Post duplicado, saltando: {post.shortcode}")
-            continue
-
-        data = {
-            "id": post.shortcode,
-            "text": post.caption or "",
-            "timestamp": post.date_utc,
-            "user": post.owner_username,
-            "platform": "instagram",
-            "likes": post.likes,
-            "comments_count": post.comments,
-            "video_views": post.video_view_count if post.is_video else 0,
-            "is_video": post.is_video,
-            "image_url": post.url,
-            "post_url": f"https://instagram.com/p/{post.shortcode}",
-            "account_followers": post.owner_profile.followers,
-            "account_verified": post.owner_profile.is_verified,
-            "year": post.date_utc.year,
-            "month": post.date_utc.month,
-            "day": post.date_utc.day,
-            "hour": post.date_utc.hour,
-            "day_of_week": post.date_utc.strftime("%A"),
-            "is_weekend": post.date_utc.weekday() >= 5,
-            "hashtags": ", ".join(post.caption_hashtags or []),
-            "mentions": ", ".join(post.caption_mentions or []),
-        }
-
-        new_posts.append(data)
-        print(f"✅ Nuevo post guardado: {data['post_url']}")
+def guardar_posts(new_posts, df_existing, output_file=OUTPUT_FILE):
+    """Append new rows to the CSV (skipping ids already saved) and return the combined frame."""
+    if not new_posts:
+        print("⚠️ No se encontraron publicaciones nuevas para agregar.")
+        return df_existing
 
-    # =============================
-    # 💾 GUARDAR RESULTADOS
-    # =============================
-    if new_posts:
-        df_new = pd.DataFrame(new_posts)
-
-        if not df_existing.empty:
-            df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-        else:
-            df_combined = df_new
-
-        df_combined.to_csv(OUTPUT_FILE, index=False, encoding="utf-8")
-        print(f"\n💾 Datos actualizados correctamente en '{OUTPUT_FILE}'")
-        print(f"📊 Total acumulado: {len(df_combined)} publicaciones")
-        print(f"🆕 Nuevas publicaciones agregadas: {len(df_new)}")
+    df_new = pd.DataFrame(new_posts)
+
+    if not df_existing.empty:
+        df_combined = pd.concat([df_existing, df_new], ignore_index=True)
     else:
-        print("⚠️ No se encontraron publicaciones nuevas para agregar.")
+        df_combined = df_new
+    df_combined = df_combined.drop_duplicates("id", keep="first")
+
+    df_combined.to_csv(output_file, index=False, encoding="utf-8")
+    print(f"\n💾 Datos actualizados correctamente en '{output_file}'")
+    print(f"📊 Total acumulado: {len(df_combined)} publicaciones")
+    print(f"🆕 Nuevas publicaciones agregadas: {len(df_combined) - len(df_existing)}")
+    return df_combined
+
 
 # =============================
-# ❌ MANEJO DE ERRORES
+# 📥 DESCARGAR PUBLICACIONES NUEVAS
 # =============================
-except instaloader.exceptions.ConnectionException as e:
-    print(f"❌ Error de conexión o autenticación: {e}")
-except instaloader.exceptions.ProfileNotExistsException:
-    print(f"❌ El perfil '{TARGET}' no existe o no es accesible.")
-except Exception as e:
-    print(f"⚠️ Error inesperado: {e}")
+def main():
+    """Sequential extraction of one TARGET account; returns False if it failed (for pipeline_dag)."""
+    try:
+        L = crear_loader()
+    except Exception as e:
+        print(f"❌ Error al cargar la sesión manual: {e}")
+        return False
+
+    df_existing, existing_shortcodes = cargar_existentes()
+    profile_cache = ProfileCache()
+
+    try:
+        profile = instaloader.Profile.from_username(L.context, TARGET)
+        print(f"\n📸 Descargando nuevas publicaciones de '{TARGET}' (hasta {LIMIT} máximo)...\n")
+
+        new_posts = []
+
+        for post in islice(profile.get_posts(), LIMIT):
+            if post.shortcode in existing_shortcodes:
+                print(f"⏩ Post duplicado, saltando: {post.shortcode}")
+                continue
+
+            data = post_a_registro(post, perfil_del_autor(post, profile_cache))
+            new_posts.append(data)
+            print(f"✅ Nuevo post guardado: {data['post_url']}")
+
+        guardar_posts(new_posts, df_existing)
+        profile_cache.save()
+        stats = profile_cache.stats()
+        print(f"👤 Caché de perfiles: {stats['hits']} aciertos, {stats['misses']} fallos, "
+              f"{stats['requests_saved']} peticiones ahorradas")
+        return True
+
+    # =============================
+    # ❌ MANEJO DE ERRORES
+    # =============================
+    except instaloader.exceptions.ConnectionException as e:
+        print(f"❌ Error de conexión o autenticación: {e}")
+    except instaloader.exceptions.ProfileNotExistsException:
+        print(f"❌ El perfil '{TARGET}' no existe o no es accesible.")
+    except Exception as e:
+        print(f"⚠️ Error inesperado: {e}")
+    return False
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Almacén local de features (matrices TF-IDF, vocabularios y embeddings).
+
+Cada feature se guarda como un directorio con un .npy por arreglo
+(data/indices/indptr para CSR, values para matrices densas, vocab para el
+vocabulario) más un meta.json con la forma y la clave de contenido. Los .npy se
+abren con mmap_mode='c' (copy-on-write): varios procesos (recomendadores, LDA,
+workers) leen la misma copia desde el page cache, sin recalcular ni copiar, y un
+consumidor que escriba en el arreglo (p. ej. sklearn) sólo copia las páginas que
+toca. Se usan .npy sueltos y no .npz porque un .npz (zip) no se puede mapear en memoria.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+FEATURES_DIR = os.path.join(os.path.dirname(__file__), '.features')
+
+
+def content_key(*parts) -> str:
+    """Stable hash of the inputs a feature was computed from (arrays, strings, params)."""
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(str(part.dtype).encode())
+            digest.update(np.ascontiguousarray(part).tobytes())
+        elif isinstance(part, (list, tuple)):
+            digest.update(content_key(*part).encode())
+        else:
+            digest.update(repr(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class FeatureStore:
+    """Named, content-keyed features persisted as memory-mapped .npy files."""
+
+    def __init__(self, root: str = FEATURES_DIR):
+        self.root = root
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _meta(self, name: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self._path(name), 'meta.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def has(self, name: str, key: Optional[str] = None) -> bool:
+        meta = self._meta(name)
+        return meta is not None and (key is None or meta.get('key') == key)
+
+    def _write(self, name: str, arrays: dict, meta: dict):
+        """Write all files into a temp dir and swap it in, so readers never see half a feature."""
+        os.makedirs(self.root, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=f'.{name}-', dir=self.root)
+        for array_name, array in arrays.items():
+            np.save(os.path.join(tmp, f'{array_name}.npy'), array)
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        target = self._path(name)
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        os.replace(tmp, target)
+
+    def _load(self, name: str, array_name: str) -> np.ndarray:
+        return np.load(os.path.join(self._path(name), f'{array_name}.npy'), mmap_mode='c')
+
+    def save_sparse(self, name: str, matrix, vocabulary: Optional[Iterable[str]] = None,
+                    key: Optional[str] = None):
+        matrix = csr_matrix(matrix)
+        arrays = {'data': matrix.data, 'indices': matrix.indices, 'indptr': matrix.indptr}
+        if vocabulary is not None:
+            arrays['vocab'] = np.asarray(list(vocabulary), dtype=np.str_)
+        self._write(name, arrays, {'kind': 'csr', 'shape': list(matrix.shape), 'key': key})
+
+    def load_sparse(self, name: str, key: Optional[str] = None) -> Optional[Tuple[csr_matrix, Optional[np.ndarray]]]:
+        """(CSR matrix over memory-mapped arrays, vocabulary or None), or None if missing/stale."""
+        if not self.has(name, key):
+            return None
+        meta = self._meta(name)
+        matrix = csr_matrix(
+            (self._load(name, 'data'), self._load(name, 'indices'), self._load(name, 'indptr')),
+            shape=tuple(meta['shape']), copy=False,
+        )
+        vocab_path = os.path.join(self._path(name), 'vocab.npy')
+        vocabulary = np.load(vocab_path, mmap_mode='r') if os.path.exists(vocab_path) else None
+        return matrix, vocabulary
+
+    def save_dense(self, name: str, values: np.ndarray, key: Optional[str] = None):
+        values = np.asarray(values)
+        self._write(name, {'values': values}, {'kind': 'dense', 'shape': list(values.shape), 'key': key})
+
+    def load_dense(self, name: str, key: Optional[str] = None) -> Optional[np.ndarray]:
+        """Memory-mapped (copy-on-write) array, or None if missing/stale."""
+        if not self.has(name, key):
+            return None
+        return self._load(name, 'values')
@@ -2,6 +2,11 @@ import pandas as pd
 import random
 import os
 
+try:
+    from ETL.location_catalog import load_catalog, parse_location_ids, split_locations
+except ImportError:
+    from location_catalog import load_catalog, parse_location_ids, split_locations
+
 # ==========================================================
 # CONFIG
 # ==========================================================
@@ -35,14 +40,18 @@ POI_INTEREST_MAPPING = {
 POI_TYPES = list(POI_INTEREST_MAPPING.keys())
 
 def extract_clean_locations(value):
-    """Extract multiple locations separated by comma or semicolon."""
+    """Extract multiple locations separated by comma, semicolon or pipe."""
     if pd.isna(value):
         return []
-    value = str(value)
-    for sep in [",", ";", "|"]:
-        if sep in value:
-            return [v.strip() for v in value.split(sep) if v.strip()]
-    return [value.strip()]
+    return split_locations(str(value))
+
+def extract_location_ids(accidents, catalog):
+    """Canonical location IDs per accident, from 'location_ids' or by canonicalizing names."""
+    if "location_ids" in accidents.columns:
+        return accidents["location_ids"].apply(parse_location_ids)
+    return accidents["extracted_locations"].apply(
+        lambda locs: catalog.ids_for(extract_clean_locations(locs))
+    )
 
 def run():
     """Main function to generate synthetic data."""
@@ -56,19 +65,16 @@ def run():
         raise FileNotFoundError("❌ File 'accidents.csv' not found in ETL directory.")
 
     accidents = pd.read_csv(accidents_path)
+    catalog = load_catalog()
 
-    # Gather all location mentions
-    all_locations = []
-    accidents["extracted_locations"].dropna().apply(
-        lambda locs: all_locations.extend(extract_clean_locations(locs))
-    )
-
-    popular_routes = pd.Series(all_locations).value_counts().head(10).index.tolist()
+    # Gather all location mentions as canonical IDs
+    all_location_ids = [i for ids in extract_location_ids(accidents, catalog) for i in ids]
 
-    # Use the most popular accident locations as residential and work zones
-    all_accident_locations = pd.Series(all_locations).value_counts()
-    ZONES_RESIDENTIAL = all_accident_locations.head(15).index.tolist()
-    ZONES_WORK = all_accident_locations.head(12).index.tolist()
+    # Use the most popular accident locations as residential and work zones (canonical names)
+    all_accident_locations = pd.Series(all_location_ids, dtype="int64").value_counts()
+    popular_routes = [catalog.name(i) for i in all_accident_locations.head(10).index]
+    ZONES_RESIDENTIAL = [catalog.name(i) for i in all_accident_locations.head(15).index]
+    ZONES_WORK = [catalog.name(i) for i in all_accident_locations.head(12).index]
 
     print("\n📍 Principales rutas encontradas en accidents.csv:")
     for i, route in enumerate(popular_routes, 1):
@@ -0,0 +1,155 @@
+"""
+Clasificador entrenable de tipo de incidente y nivel de severidad.
+
+Los textos se vectorizan con HashingVectorizer (sin vocabulario: no hay que
+ajustarlo ni guardarlo y sirve para texto nuevo) y dos SGDClassifier lineales
+aprenden por mini-lotes con partial_fit, así que el modelo se puede seguir
+entrenando con datos en streaming. Inferir es un producto disperso por post.
+
+Sin datos etiquetados, el modelo arranca (bootstrap) de las etiquetas de las
+reglas actuales: palabras clave para el tipo y el severity_score heurístico para
+el nivel.
+"""
+
+import argparse
+import os
+import pickle
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '.models', 'incident_classifier.pkl')
+
+# Tipo de incidente por palabras clave; gana la primera regla que coincida (de lo específico a lo genérico)
+INCIDENT_TYPE_KEYWORDS = [
+    ('volcadura', ['volcadura', 'volcó', 'volcado', 'vuelco']),
+    ('atropello', ['atropell', 'peatón', 'peaton']),
+    ('incendio', ['incendi', 'fuego', 'llamas']),
+    ('obra', ['obra', 'trabajos', 'repar', 'asfalt', 'construc', 'cierre', 'cerrad', 'desvío']),
+    ('inundacion', ['inund', 'anegad', 'lluvia']),
+    ('congestion', ['congesti', 'tapón', 'taponamiento', 'tráfico pesado', 'lento', 'fila']),
+    ('choque', ['choque', 'chocó', 'colisi', 'impact', 'estrell', 'accidente']),
+]
+INCIDENT_TYPES = [label for label, _ in INCIDENT_TYPE_KEYWORDS] + ['otro']
+SEVERITY_TIERS = ['low', 'medium', 'high']  # mismos valores y cortes que enrich_batch
+
+
+def keyword_incident_type(texto) -> str:
+    if not isinstance(texto, str):
+        return 'otro'
+    lower = texto.lower()
+    for label, keywords in INCIDENT_TYPE_KEYWORDS:
+        if any(k in lower for k in keywords):
+            return label
+    return 'otro'
+
+
+def severity_tier(severity_scores) -> np.ndarray:
+    severity = np.asarray(severity_scores, dtype=np.float64)
+    return np.where(severity > 0.7, 'high', np.where(severity > 0.3, 'medium', 'low')).astype(object)
+
+
+class IncidentClassifier:
+    """Hashing features + two SGD linear models (incident type, severity tier) trained with partial_fit."""
+
+    def __init__(self, n_features: int = 2 ** 16, ngram_range=(1, 2), alpha: float = 1e-5, seed: int = 42):
+        self.vectorizer = HashingVectorizer(n_features=n_features, ngram_range=ngram_range,
+                                            alternate_sign=False, norm='l2')
+        self.type_model = SGDClassifier(loss='log_loss', alpha=alpha, random_state=seed)
+        self.severity_model = SGDClassifier(loss='log_loss', alpha=alpha, random_state=seed)
+        self.samples_seen = 0
+
+    def _features(self, textos):
+        return self.vectorizer.transform(['' if not isinstance(t, str) else t for t in textos])
+
+    def partial_fit(self, textos, incident_types, severity_tiers):
+        """Update both models with one mini-batch."""
+        X = self._features(textos)
+        self.type_model.partial_fit(X, list(incident_types), classes=INCIDENT_TYPES)
+        self.severity_model.partial_fit(X, list(severity_tiers), classes=SEVERITY_TIERS)
+        self.samples_seen += X.shape[0]
+        return self
+
+    def bootstrap(self, textos: List[str], severity_scores, batch_size: int = 256, epochs: int = 5, seed: int = 42):
+        """Train from the rule-based labels (keywords for type, heuristic score for tier)."""
+        textos = list(textos)
+        types = np.array([keyword_incident_type(t) for t in textos], dtype=object)
+        tiers = severity_tier(severity_scores)
+        rng = np.random.default_rng(seed)
+        for _ in range(epochs):
+            order = rng.permutation(len(textos))
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                self.partial_fit([textos[i] for i in batch], types[batch], tiers[batch])
+        return self
+
+    def predict(self, textos) -> Tuple[np.ndarray, np.ndarray]:
+        """(incident types, severity tiers): one sparse dot product per post and model."""
+        X = self._features(textos)
+        return self.type_model.predict(X).astype(object), self.severity_model.predict(X).astype(object)
+
+    def save(self, path: str = MODEL_PATH):
+        # Se guarda el estado y no la instancia: así el pickle no depende de cómo se importó el
+        # módulo (ETL.incident_classifier, incident_classifier o __main__ desde la CLI)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(self.__dict__, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH) -> Optional['IncidentClassifier']:
+        if not os.path.exists(path):
+            return None
+        classifier = cls.__new__(cls)
+        with open(path, 'rb') as f:
+            classifier.__dict__.update(pickle.load(f))
+        return classifier
+
+
+def load_or_bootstrap(textos, severity_scores, path: str = MODEL_PATH) -> IncidentClassifier:
+    """Saved classifier, or one bootstrapped from the rule labels of `textos` (and saved)."""
+    classifier = IncidentClassifier.load(path) if path else None
+    if classifier is None:
+        print("🏷️ Entrenando clasificador de incidentes desde las etiquetas por reglas...")
+        classifier = IncidentClassifier().bootstrap(textos, severity_scores)
+        if path:
+            classifier.save(path)
+    return classifier
+
+
+def train_stream(chunks: Iterable[pd.DataFrame], classifier: Optional[IncidentClassifier] = None,
+                 text_column: str = 'text') -> IncidentClassifier:
+    """Continue training on enriched chunks (e.g. pd.read_csv(..., chunksize=...)).
+
+    Uses the 'incident_type' column as label when present, otherwise the keyword
+    rules, and 'severity_score' for the tier.
+    """
+    classifier = classifier or IncidentClassifier()
+    for chunk in chunks:
+        textos = chunk[text_column].tolist()
+        types = (chunk['incident_type'] if 'incident_type' in chunk.columns
+                 else pd.Series([keyword_incident_type(t) for t in textos])).tolist()
+        classifier.partial_fit(textos, types, severity_tier(chunk['severity_score'].fillna(0.0)))
+    return classifier
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrena el clasificador de incidentes por mini-lotes")
+    parser.add_argument("csv", nargs="?", default=os.path.join(os.path.dirname(__file__), 'accidents.csv'),
+                        help="CSV enriquecido (text, severity_score y opcionalmente incident_type)")
+    parser.add_argument("--chunksize", type=int, default=1000)
+    parser.add_argument("--fresh", action="store_true", help="empezar de cero en lugar de continuar el modelo guardado")
+    args = parser.parse_args()
+
+    classifier = None if args.fresh else IncidentClassifier.load()
+    classifier = train_stream(pd.read_csv(args.csv, chunksize=args.chunksize), classifier)
+    classifier.save()
+    print(f"✅ Clasificador guardado en {MODEL_PATH} ({classifier.samples_seen} muestras vistas)")
+
+
+if __name__ == "__main__":
+    main()
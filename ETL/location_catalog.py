@@ -0,0 +1,182 @@
+"""
+Catálogo canónico de ubicaciones compartido por el ETL, los recomendadores y el EDA.
+
+Cada ubicación recibe un ID entero estable. Las variantes de escritura
+("Máximo Gómez" / "Maximo Gomez", "Avenida Duarte" / "Duarte", "Kilómetro 15" / "Km 15")
+se pliegan a la misma clave, de modo que los cruces aguas abajo son búsquedas exactas por ID.
+"""
+
+import os
+import re
+import unicodedata
+from typing import Iterable, List
+
+import pandas as pd
+
+LOCATIONS_PATH = os.path.join(os.path.dirname(__file__), 'locations.csv')
+
+# Ubicaciones conocidas de Santo Domingo (semilla del catálogo y gazetteer del analizador)
+KNOWN_LOCATIONS = [
+    'george washington', 'máximo gómez', 'máximo gomez', 'winston churchill',
+    'abraham lincoln', 'john f kennedy', 'charles de gaulle', '27 de febrero',
+    'duarte', 'mella', 'sánchez', 'luperón', 'núñez de cáceres',
+    'santo domingo este', 'distrito nacional', 'san isidro',
+    'la barranquita', 'los mina', 'villa mella', 'pantoja',
+    'las américas', 'ecológica', 'charles summer', 'los próceres',
+    'juan pablo duarte', 'isabel aguiar', 'república de colombia',
+    'circunvalación', 'olímpica', 'independencia', 'san vicente de paul'
+]
+
+# Alias (ya plegados) -> clave canónica (ya plegada)
+ALIASES = {
+    'john f': 'john f kennedy',
+    'jfk': 'john f kennedy',
+    'kennedy': 'john f kennedy',
+    'churchill': 'winston churchill',
+    'lincoln': 'abraham lincoln',
+    'charles sumner': 'charles summer',
+    '27 febrero': '27 de febrero',
+    'nunez': 'nunez de caceres',
+    'circunvalacion santo domingo': 'circunvalacion',
+}
+
+_ROAD_PREFIX = re.compile(
+    r'^(?:(?:la|el)\s+)?(?:avenida|av|autopista|calle|carretera|puente|'
+    r'paso a desnivel(?:\s+de)?(?:\s+la)?)\s+'
+)
+_KM = re.compile(r'^(?:km|kilometro)\s*(\d+)$')
+_KM_MARKER = re.compile(r'^(.*?)\s*\bkm (\d+)\b')
+
+
+def fold_text(texto: str) -> str:
+    """Lowercase, strip accents and punctuation, and collapse whitespace."""
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    texto = re.sub(r'[^\w\s]', ' ', texto)
+    return re.sub(r'\s+', ' ', texto).strip()
+
+
+def location_key(raw: str) -> str:
+    """Canonical lookup key for a raw location string."""
+    key = fold_text(raw)
+    key = _ROAD_PREFIX.sub('', key)
+    km = _KM.match(key)
+    if km:
+        return f"km {int(km.group(1))}"
+    return ALIASES.get(key, key)
+
+
+def km_marker(name):
+    """(road, km) for a location named like 'Duarte Km 13' or 'Km 15' (road ''), else None."""
+    match = _KM_MARKER.match(fold_text(name).replace('kilometro', 'km'))
+    if not match:
+        return None
+    return match.group(1).strip(), int(match.group(2))
+
+
+class LocationCatalog:
+    """Canonical location table: folded key -> integer ID -> display name."""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.aliases: List[set] = []
+        self._ids = {}
+
+    @classmethod
+    def with_known_locations(cls) -> 'LocationCatalog':
+        catalog = cls()
+        for ubicacion in KNOWN_LOCATIONS:
+            catalog.canonical_id(ubicacion.title())
+        return catalog
+
+    def canonical_id(self, raw: str, create: bool = True) -> int:
+        """ID for a raw location (-1 if empty, or unknown and create=False)."""
+        if not isinstance(raw, str) or not raw.strip():
+            return -1
+        key = location_key(raw)
+        if not key:
+            return -1
+        location_id = self._ids.get(key)
+        if location_id is None:
+            if not create:
+                return -1
+            location_id = len(self.names)
+            self._ids[key] = location_id
+            self.names.append(self._display_name(raw, key))
+            self.aliases.append(set())
+        self.aliases[location_id].add(raw.strip())
+        return location_id
+
+    def canonicalize(self, raw: str) -> str:
+        """Canonical display name for a raw location ('' if empty)."""
+        location_id = self.canonical_id(raw)
+        return self.names[location_id] if location_id >= 0 else ''
+
+    def ids_for(self, raws: Iterable[str], create: bool = True) -> List[int]:
+        """Unique canonical IDs for several raw locations, in first-seen order."""
+        ids = []
+        for raw in raws:
+            location_id = self.canonical_id(raw, create=create)
+            if location_id >= 0 and location_id not in ids:
+                ids.append(location_id)
+        return ids
+
+    def name(self, location_id: int) -> str:
+        return self.names[location_id]
+
+    def _display_name(self, raw: str, key: str) -> str:
+        if key.startswith('km '):
+            return f"Km {key[3:]}"
+        # Conservar la forma con acentos del texto original, sin el prefijo de vía
+        original = re.sub(r'\s+', ' ', raw.strip())
+        sin_prefijo = _ROAD_PREFIX.sub('', original.lower())
+        if fold_text(sin_prefijo) == key:
+            return sin_prefijo.title()
+        return key.title()
+
+    def save(self, path: str = LOCATIONS_PATH):
+        pd.DataFrame({
+            'location_id': range(len(self.names)),
+            'name': self.names,
+            'aliases': ['|'.join(sorted(a)) for a in self.aliases],
+        }).to_csv(path, index=False, encoding='utf-8')
+
+    @classmethod
+    def load(cls, path: str = LOCATIONS_PATH) -> 'LocationCatalog':
+        catalog = cls()
+        df = pd.read_csv(path, keep_default_na=False).sort_values('location_id')
+        for location_id, name, aliases in zip(df['location_id'], df['name'], df['aliases']):
+            if location_id != len(catalog.names):
+                raise ValueError(f"IDs de ubicación no contiguos en {path}: {location_id}")
+            catalog._ids[location_key(name)] = location_id
+            catalog.names.append(name)
+            catalog.aliases.append(set(a for a in aliases.split('|') if a))
+            for alias in catalog.aliases[-1]:
+                catalog._ids.setdefault(location_key(alias), location_id)
+        return catalog
+
+    def __len__(self):
+        return len(self.names)
+
+
+def load_catalog(path: str = LOCATIONS_PATH) -> LocationCatalog:
+    """Load the persisted catalog, or start one seeded with the known locations."""
+    if os.path.exists(path):
+        return LocationCatalog.load(path)
+    return LocationCatalog.with_known_locations()
+
+
+def split_locations(value) -> List[str]:
+    """Split an 'extracted_locations' cell on comma, semicolon or pipe."""
+    if not isinstance(value, str):
+        return []
+    return [v.strip() for v in re.split(r'[,;|]', value) if v.strip()]
+
+
+def parse_location_ids(value) -> List[int]:
+    """Parse the 'location_ids' column written by the analyzer ('3, 7' -> [3, 7])."""
+    if isinstance(value, (int, float)) and value == value:
+        return [int(value)]  # pandas lee una columna de IDs sueltos como numérica
+    if not isinstance(value, str) or not value.strip():
+        return []
+    return [int(float(v)) for v in value.split(',') if v.strip()]
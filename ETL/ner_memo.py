@@ -0,0 +1,157 @@
+"""
+Memo persistente de NER por oración.
+
+Muchos captions repiten oraciones enteras (despedidas de la cuenta, patrocinios,
+bloques de hashtags) y BERT las volvía a procesar en cada post. Cada post se
+divide en oraciones con sent_tokenize; las entidades de cada oración se guardan
+en un LRU acotado, con clave el texto normalizado de la oración, y sólo las
+oraciones nuevas van al modelo, todas juntas en un lote. Los offsets de las
+entidades se guardan relativos a la oración y se trasladan al post original.
+
+El memo se guarda en JSON junto al nombre del modelo: si cambia el modelo, las
+entradas anteriores se descartan.
+"""
+
+import json
+import os
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from nltk.tokenize import sent_tokenize
+
+NER_MEMO_PATH = os.path.join(os.path.dirname(__file__), '.ner_memo.json')
+
+
+def normalize_sentence(sentence: str) -> Tuple[str, List[int]]:
+    """(normalized text, original offset of each normalized character).
+
+    Whitespace runs collapse to one space and the ends are stripped; case is
+    kept because the NER model is cased.
+    """
+    chars, offsets = [], []
+    pending_space = False
+    for offset, char in enumerate(sentence):
+        if char.isspace():
+            pending_space = bool(chars)
+            continue
+        if pending_space:
+            chars.append(' ')
+            offsets.append(offset - 1)
+            pending_space = False
+        chars.append(char)
+        offsets.append(offset)
+    return ''.join(chars), offsets
+
+
+def split_sentences(texto: str, language: str = 'spanish') -> List[Tuple[int, str]]:
+    """(start offset in `texto`, sentence) for each sentence of the post."""
+    spans = []
+    cursor = 0
+    for sentence in sent_tokenize(texto, language=language):
+        start = texto.find(sentence, cursor)
+        if start < 0:  # sent_tokenize no altera el texto, pero por si acaso
+            start = cursor
+        spans.append((start, sentence))
+        cursor = start + len(sentence)
+    return spans
+
+
+class SentenceNERMemo:
+    """Bounded LRU of normalized sentence -> raw NER entities, persisted as JSON."""
+
+    def __init__(self, path: str = NER_MEMO_PATH, model: str = '', max_entries: int = 50000):
+        self.path = path
+        self.model = model
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[str, List[Dict]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('model') == model:
+                    self.entries = OrderedDict(data.get('entries', {}))
+                    self._evict()
+            except (OSError, ValueError, AttributeError):
+                print(f"⚠️ Memo NER ilegible, se ignora: {path}")
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        entities = self.entries.get(key)
+        if entities is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entities
+
+    def put(self, key: str, entities: List[Dict]):
+        self.entries[key] = entities
+        self.entries.move_to_end(key)
+        self._evict()
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def extract_batch(self, textos: List[str], ner: Callable, batch_size: int = 32) -> List[List[Dict]]:
+        """NER entities per post, with start/end offsets into the original post.
+
+        Sentences already in the memo are not sent to `ner`; the misses of all
+        posts (each distinct sentence once) go in a single batched call.
+        """
+        posts = []
+        resolved: Dict[str, Optional[List[Dict]]] = {}  # oraciones de este lote (a salvo de la expulsión LRU)
+        for texto in textos:
+            sentences = []
+            for start, sentence in split_sentences(texto) if isinstance(texto, str) else []:
+                key, offsets = normalize_sentence(sentence)
+                if not key:
+                    continue
+                if key in resolved:
+                    self.hits += 1  # repetida dentro del lote: se procesa una sola vez
+                else:
+                    resolved[key] = self.get(key)
+                sentences.append((start, key, offsets))
+            posts.append(sentences)
+
+        misses = [key for key, entities in resolved.items() if entities is None]
+        if misses:
+            for key, entities in zip(misses, ner(misses, batch_size=batch_size)):
+                resolved[key] = [{'entity_group': e['entity_group'], 'word': e['word'],
+                                  'score': float(e['score']), 'start': e['start'], 'end': e['end']}
+                                 for e in entities]
+                self.put(key, resolved[key])
+
+        extracted = []
+        for sentences in posts:
+            entities = []
+            for start, key, offsets in sentences:
+                for e in resolved[key]:
+                    entities.append(dict(e, start=start + offsets[e['start']],
+                                         end=start + offsets[e['end'] - 1] + 1))
+            extracted.append(entities)
+        return extracted
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'model': self.model, 'entries': self.entries}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,78 @@
+"""
+Caché persistente de metadatos de perfiles (seguidores, verificado) por cuenta.
+
+Cada entrada expira tras `ttl_seconds`; el archivo JSON se conserva entre
+ejecuciones, así que una cuenta ya consultada no vuelve a pedirse hasta que expira.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+PROFILE_CACHE_PATH = os.path.join(os.path.dirname(__file__), '.profile_cache.json')
+
+
+class ProfileCache:
+    """Owner -> profile metadata with TTL expiry, persisted as JSON."""
+
+    def __init__(self, path: str = PROFILE_CACHE_PATH, ttl_seconds: float = 24 * 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.entries: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                print(f"⚠️ Caché de perfiles ilegible, se ignora: {path}")
+
+    def get(self, owner: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self.entries.get(owner)
+            if entry is not None and time.time() - entry['fetched_at'] > self.ttl_seconds:
+                del self.entries[owner]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry['profile']
+
+    def put(self, owner: str, profile: Dict):
+        with self._lock:
+            self.entries[owner] = {'profile': profile, 'fetched_at': time.time()}
+
+    def lookup(self, owner: str, fetch: Callable[[], Dict]) -> Dict:
+        """Cached profile, calling fetch() only on a miss or after expiry."""
+        profile = self.get(owner)
+        if profile is None:
+            profile = fetch()
+            self.put(owner, profile)
+        return profile
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp, self.path)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'requests_saved': self.hits,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
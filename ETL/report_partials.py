@@ -0,0 +1,132 @@
+"""
+Agregados parciales y combinables para el reporte del analizador NLP.
+
+Cada bloque (chunk, shard o lote incremental) del dataset enriquecido produce un
+ReportPartial; los parciales se combinan con merge() en cualquier orden, así que
+el reporte final sale de ellos sin volver a recorrer todo el DataFrame.
+
+Un incidente se identifica por el id del post representativo de su grupo
+('incident_id'), no por 'cluster_id': éste vuelve a empezar en 0 en cada corrida
+del analizador y mezclaría incidentes de lotes distintos.
+"""
+
+from collections import Counter
+from functools import reduce
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+try:
+    from ETL.stream_stats import RunningMoments
+except ImportError:
+    from stream_stats import RunningMoments
+
+# Límites de los niveles de severidad: baja <= 0.3 < media <= 0.7 < alta
+SEVERITY_EDGES = (0.3, 0.7)
+
+
+class ReportPartial:
+    """Mergeable aggregates behind AdvancedNLPAnalyzer.generate_report."""
+
+    def __init__(self):
+        self.posts = 0
+        self.locations = Counter()  # una vez por incidente (grupo de casi duplicados)
+        self.clusters = {}  # incident_id -> ubicaciones, para no contar dos veces un grupo repartido
+        self.unclustered = 0  # incidentes sin grupo (cada fila cuenta como uno)
+        self.unclustered_locations = Counter()
+        self.severity = RunningMoments()
+        self.severity_hist = np.zeros(3, dtype=np.int64)  # baja, media, alta
+        self.entities = RunningMoments()
+        self.words = RunningMoments()
+
+    def _add_incident(self, incident_id, locations):
+        if incident_id is None:
+            self.unclustered += 1
+            self.unclustered_locations.update(locations)
+        elif incident_id in self.clusters:
+            return
+        else:
+            self.clusters[incident_id] = locations
+        self.locations.update(locations)
+
+    @staticmethod
+    def _incident_ids(df_enriched: pd.DataFrame) -> np.ndarray:
+        """Incident key per row (by position): the representative post id, or None if unknown."""
+        if 'incident_id' in df_enriched.columns:
+            ids = df_enriched['incident_id']
+        elif 'cluster_id' in df_enriched.columns and 'id' in df_enriched.columns:
+            # CSV anterior a 'incident_id': primer post del grupo en este bloque
+            ids = df_enriched.groupby('cluster_id')['id'].transform('first')
+        else:
+            return np.full(len(df_enriched), None, dtype=object)
+        known = ids.notna().to_numpy()
+        return np.where(known, ids.astype(str).to_numpy(), None)
+
+    def update(self, df_enriched: pd.DataFrame):
+        """Add one chunk of the enriched dataset."""
+        self.posts += len(df_enriched)
+        # Por posición, no por etiqueta: el índice puede repetirse (p. ej. pd.concat de bloques)
+        incident_ids = self._incident_ids(df_enriched)
+        locations_col = df_enriched['extracted_locations'].to_numpy(dtype=object)
+        for incident_id, locations_str in zip(incident_ids, locations_col):
+            locations = tuple(locations_str.split(', ')) if isinstance(locations_str, str) and locations_str else ()
+            self._add_incident(incident_id, locations)
+
+        severity = df_enriched['severity_score'].to_numpy(dtype=np.float64)
+        self.severity.update(severity)
+        severity = severity[~np.isnan(severity)]
+        self.severity_hist += np.bincount(np.searchsorted(SEVERITY_EDGES, severity, side='left'), minlength=3)
+        self.entities.update(df_enriched['entities_found'].to_numpy(dtype=np.float64))
+        self.words.update(df_enriched['word_count'].to_numpy(dtype=np.float64))
+        return self
+
+    def merge(self, other: 'ReportPartial'):
+        self.posts += other.posts
+        for incident_id, locations in other.clusters.items():
+            self._add_incident(incident_id, locations)
+        self.unclustered += other.unclustered
+        self.unclustered_locations.update(other.unclustered_locations)
+        self.locations.update(other.unclustered_locations)
+        self.severity.merge(other.severity)
+        self.severity_hist += other.severity_hist
+        self.entities.merge(other.entities)
+        self.words.merge(other.words)
+        return self
+
+    @property
+    def unique_incidents(self) -> int:
+        return len(self.clusters) + self.unclustered
+
+    def report(self) -> Dict:
+        """Final report, same keys and values as the full-scan generate_report."""
+        low, medium, high = (int(n) for n in self.severity_hist)
+        return {
+            'total_posts': self.posts,
+            'unique_incidents': self.unique_incidents,
+            'dedup_ratio': 1.0 - self.unique_incidents / self.posts if self.posts else 0.0,
+            'total_entities_found': int(self.entities.total),
+            'avg_entities_per_post': self.entities.mean,
+            'top_locations': dict(self.locations.most_common(10)),
+            'severity_analysis': {
+                'average_severity': self.severity.mean,
+                'high_severity_incidents': high,
+                'medium_severity_incidents': medium,
+                'low_severity_incidents': low
+            },
+            'word_statistics': {
+                'avg_words_per_post': self.words.mean,
+                'total_words': int(self.words.total),
+                'min_words': int(self.words.min) if self.words.count else np.nan,
+                'max_words': int(self.words.max) if self.words.count else np.nan
+            }
+        }
+
+
+def merge_partials(partials: Iterable[ReportPartial]) -> ReportPartial:
+    return reduce(lambda acc, p: acc.merge(p), partials, ReportPartial())
+
+
+def partial_from_chunks(chunks: Iterable[pd.DataFrame]) -> ReportPartial:
+    """One partial from an iterable of chunks (e.g. pd.read_csv(..., chunksize=...))."""
+    return merge_partials(ReportPartial().update(chunk) for chunk in chunks)
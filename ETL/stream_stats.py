@@ -0,0 +1,167 @@
+"""
+Estadísticas en streaming con memoria constante.
+
+Todas las clases se actualizan por bloques (chunks) y se pueden combinar con
+merge(), así que sirven tanto para lecturas out-of-core como para procesos en paralelo.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class RunningMoments:
+    """Count, sum, sum of squares, min and max of a numeric stream."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.total += values.sum()
+        self.total_sq += np.square(values).sum()
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        return self
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    @property
+    def std(self):
+        """Sample standard deviation (ddof=1), like pandas."""
+        if self.count < 2:
+            return np.nan
+        var = (self.total_sq - self.total ** 2 / self.count) / (self.count - 1)
+        return float(np.sqrt(max(var, 0.0)))
+
+
+class CoMoments:
+    """Streaming covariance/correlation matrix (Chan et al. pairwise merge)."""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        d = len(self.columns)
+        self.count = 0
+        self.mean = np.zeros(d)
+        self.comoment = np.zeros((d, d))
+
+    def update(self, frame):
+        values = frame[self.columns].to_numpy(dtype=np.float64)
+        values = values[~np.isnan(values).any(axis=1)]  # filas completas
+        if len(values) == 0:
+            return self
+        other = CoMoments(self.columns)
+        other.count = len(values)
+        other.mean = values.mean(axis=0)
+        centered = values - other.mean
+        other.comoment = centered.T @ centered
+        return self.merge(other)
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.comoment = (self.comoment + other.comoment
+                         + np.outer(delta, delta) * self.count * other.count / n)
+        self.mean = self.mean + delta * other.count / n
+        self.count = n
+        return self
+
+    def correlation(self):
+        std = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = self.comoment / np.outer(std, std)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+class SpaceSaving:
+    """Space-Saving heavy hitters: top items of a stream using at most `capacity` counters."""
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+
+    def update(self, counts):
+        """Add pre-aggregated (item -> count) pairs, e.g. a chunk's value_counts()."""
+        for item, count in counts.items():
+            if item in self.counts:
+                self.counts[item] += count
+            elif len(self.counts) < self.capacity:
+                self.counts[item] = count
+                self.errors[item] = 0
+            else:
+                # Reemplazar el contador mínimo; su valor pasa a ser el error máximo del nuevo item
+                victim = min(self.counts, key=self.counts.get)
+                floor = self.counts.pop(victim)
+                self.errors.pop(victim)
+                self.counts[item] = floor + count
+                self.errors[item] = floor
+        return self
+
+    def merge(self, other):
+        return self.update(other.counts)
+
+    def most_common(self, n=None):
+        return pd.Series(self.counts, dtype='int64').sort_values(ascending=False, kind='stable').head(n)
+
+
+class Reservoir:
+    """Fixed-size uniform sample of a stream (algorithm R), used for approximate quantiles."""
+
+    def __init__(self, size=10000, seed=42):
+        self.size = size
+        self.seen = 0
+        self.sample = np.empty(0)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        free = self.size - len(self.sample)
+        if free > 0:
+            self.sample = np.concatenate([self.sample, values[:free]])
+            self.seen += min(free, len(values))
+            values = values[free:]
+        if len(values):
+            positions = self.seen + np.arange(len(values))
+            slots = (self._rng.random(len(values)) * (positions + 1)).astype(np.int64)
+            keep = slots < self.size
+            self.sample[slots[keep]] = values[keep]
+            self.seen += len(values)
+        return self
+
+    def quantile(self, q):
+        return float(np.quantile(self.sample, q)) if len(self.sample) else np.nan
+
+
+def describe_stream(moments, reservoir):
+    """pandas.describe()-style Series from streaming moments and a reservoir sample."""
+    return pd.Series({
+        'count': float(moments.count),
+        'mean': moments.mean,
+        'std': moments.std,
+        'min': moments.min if moments.count else np.nan,
+        '25%': reservoir.quantile(0.25),
+        '50%': reservoir.quantile(0.50),
+        '75%': reservoir.quantile(0.75),
+        'max': moments.max if moments.count else np.nan,
+    })
@@ -0,0 +1,165 @@
+"""
+Procesador de texto fusionado: una sola normalización por documento.
+
+analyze_text_comprehensive pasaba el mismo texto por preprocess_text,
+extract_locations_regex (patrones y gazetteer), classify_incident_severity y un
+split() aparte, bajando a minúsculas y recorriendo el texto en cada paso. Aquí el
+texto se pasa a minúsculas una vez y de esa versión salen ubicaciones, palabras
+clave de severidad, conteos y tokens para LDA. process_batch hace lo mismo para
+muchos documentos y puntúa la severidad de todos con operaciones de numpy.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Patrones de ubicación (el grupo 1 es el nombre de la vía/zona)
+LOCATION_PATTERNS = [
+    r'(?:avenida?|av\.?)\s+([^,.\n]+?)(?=\s*[,.\n]|próximo|cerca|kilómetro|$)',
+    r'autopista\s+([^,.\n]+?)(?=\s*[,.\n]|kilómetro|rampa|$)',
+    r'calle\s+([^,.\n]+?)(?=\s*[,.\n]|esquina|$)',
+    r'puente\s+([^,.\n]+?)(?=\s*[,.\n]|rampa|$)',
+    r'circunvalación\s*([^,.\n]*?)(?=\s*[,.\n]|$)',
+    r'paso a desnivel\s+(?:de\s+)?(?:la\s+)?([^,.\n]+?)(?=\s*[,.\n]|$)',
+    r'(?:sector|zona|área)\s+([^,.\n]+?)(?=\s*[,.\n]|$)',
+    r'(?:cerca de|próximo a)\s+([^,.\n]+?)(?=\s*[,.\n]|$)',
+]
+KM_PATTERN = r'kilómetro\s+(\d+)'
+
+# Indicadores de severidad por nivel y su peso
+SEVERITY_KEYWORDS = {
+    'high': ['muertos', 'fallecidos', 'heridos graves', 'hospitalizado', 'crítico', 'fatal'],
+    'medium': ['heridos', 'lesionados', 'ambulancia', 'emergencia', 'atascado'],
+    'low': ['lento', 'congestion', 'demora', 'tráfico pesado', 'fila']
+}
+SEVERITY_WEIGHTS = {'high': 3, 'medium': 2, 'low': 1}
+
+_COMPILED_PATTERNS = [re.compile(p, re.IGNORECASE) for p in LOCATION_PATTERNS]
+_KM = re.compile(KM_PATTERN)
+_NON_WORD = re.compile(r'[^\w\s\-\.]')
+_SPACES = re.compile(r'\s+')
+
+
+_ALL_KEYWORDS = [k for keywords in SEVERITY_KEYWORDS.values() for k in keywords]
+_LEVEL_MATRIX = np.array([[level == l for l in SEVERITY_KEYWORDS] for level, keywords in SEVERITY_KEYWORDS.items()
+                          for _ in keywords], dtype=np.int64)  # palabra clave -> nivel
+
+
+def normalize_text(texto: str) -> Tuple[str, str]:
+    """(lowercase text, preprocessed text): the single normalization pass every feature is derived from.
+
+    The preprocessed text is what preprocess_text returns (lowercase, symbols
+    to spaces, whitespace collapsed); near-duplicate detection shingles it too.
+    """
+    lower = str(texto).lower()
+    return lower, _SPACES.sub(' ', _NON_WORD.sub(' ', lower)).strip()
+
+
+def severity_arrays(counts: np.ndarray):
+    """Vectorized severity_from_counts over an (n_docs, 3) array of high/medium/low hits."""
+    weighted = counts * np.array([SEVERITY_WEIGHTS[level] for level in SEVERITY_KEYWORDS])
+    total_score = weighted.sum(axis=1)
+    raw = weighted @ np.array([0.8, 0.5, 0.2]) / np.maximum(total_score, 1)
+    severity = np.where(total_score == 0, 0.3, np.minimum(raw, 1.0))
+    confidence = np.where(total_score == 0, 0.1, np.minimum(total_score / 10, 1.0))
+    return severity, confidence
+
+
+def severity_from_counts(high: int, medium: int, low: int) -> Dict[str, float]:
+    """Severity/confidence from the number of keyword hits per level."""
+    total_high = high * SEVERITY_WEIGHTS['high']
+    total_medium = medium * SEVERITY_WEIGHTS['medium']
+    total_low = low * SEVERITY_WEIGHTS['low']
+    total_score = total_high + total_medium + total_low
+
+    if total_score == 0:
+        return {'severity': 0.3, 'confidence': 0.1}  # Default low severity
+
+    severity = min((total_high * 0.8 + total_medium * 0.5 + total_low * 0.2) / max(total_score, 1), 1.0)
+    confidence = min(total_score / 10, 1.0)
+    return {'severity': severity, 'confidence': confidence}
+
+
+class FusedTextProcessor:
+    """Derive every per-document feature from one lowercase pass over the text."""
+
+    def __init__(self, known_locations: List[str], catalog):
+        self.known_locations = list(known_locations)
+        self.catalog = catalog
+        self._ids = {}  # raw location -> canonical ID (los IDs del catálogo son estables)
+
+    def _canonical_ids(self, raws: List[str]) -> List[int]:
+        ids = []
+        for raw in raws:
+            location_id = self._ids.get(raw)
+            if location_id is None:
+                location_id = self.catalog.canonical_id(raw)
+                self._ids[raw] = location_id
+            if location_id >= 0 and location_id not in ids:
+                ids.append(location_id)
+        return ids
+
+    def _raw_locations(self, lower: str) -> List[str]:
+        raws = []
+        for patron in _COMPILED_PATTERNS:
+            for match in patron.finditer(lower):
+                ubicacion = match.group(1).strip() if match.lastindex else match.group(0).strip()
+                ubicacion = _SPACES.sub(' ', ubicacion)
+                if len(ubicacion) > 2:
+                    raws.append(ubicacion.title())
+        raws.extend(u.title() for u in self.known_locations if u in lower)
+        raws.extend(f"Km {m.group(1)}" for m in _KM.finditer(lower))
+        return raws
+
+    @staticmethod
+    def _severity(lower: str) -> Dict[str, float]:
+        hits = {level: sum(1 for k in keywords if k in lower) for level, keywords in SEVERITY_KEYWORDS.items()}
+        return severity_from_counts(hits['high'], hits['medium'], hits['low'])
+
+    def _result(self, texto: str, lower: str, processed: str, raws: List[str], severity: Dict) -> Dict:
+        regex_ids = self._canonical_ids(raws)
+        # Mismo orden que ids_for(sorted(nombres)): por nombre canónico
+        location_ids = sorted(regex_ids, key=self.catalog.name)
+        return {
+            'original_text': texto,
+            'processed_text': processed,
+            'tokens': processed.split(),
+            'locations_regex': [self.catalog.name(i) for i in regex_ids],
+            'severity': severity,
+            'word_count': len(lower.split()),
+            'char_count': len(texto),
+            'location_ids': location_ids,
+            'all_locations': [self.catalog.name(i) for i in location_ids],
+        }
+
+    def process(self, texto: str) -> Dict:
+        if pd.isna(texto):
+            return {}
+        lower, processed = normalize_text(texto)
+        return self._result(texto, lower, processed, self._raw_locations(lower), self._severity(lower))
+
+    def process_batch(self, textos, normalized: Optional[List[Tuple[str, str]]] = None) -> List[Dict]:
+        """Batch version of process(): same results and order, severity scored for all documents at once.
+
+        `normalized` holds normalize_text() of each text when the caller already
+        ran it (e.g. for deduplication), so the texts are not normalized twice.
+        """
+        textos = list(textos)
+        valid = [i for i, t in enumerate(textos) if not pd.isna(t)]
+        if normalized is None:
+            normalized = [normalize_text(t) if not pd.isna(t) else None for t in textos]
+        lowers = [normalized[i][0] for i in valid]
+
+        # Matriz documentos x palabras clave y conteos por nivel con un solo producto
+        hits = np.array([[k in lower for k in _ALL_KEYWORDS] for lower in lowers], dtype=np.int64)
+        counts = hits.reshape(len(lowers), len(_ALL_KEYWORDS)) @ _LEVEL_MATRIX
+        severity, confidence = severity_arrays(counts)
+
+        results = [{} for _ in textos]
+        for j, i in enumerate(valid):
+            lower, processed = normalized[i]
+            scores = {'severity': float(severity[j]), 'confidence': float(confidence[j])}
+            results[i] = self._result(textos[i], lower, processed, self._raw_locations(lower), scores)
+        return results
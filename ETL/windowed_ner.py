@@ -0,0 +1,91 @@
+"""
+NER por ventanas deslizantes para textos que superan el límite de BERT (512 tokens).
+
+Un texto largo se parte en ventanas de `max_tokens` tokens que se solapan
+`stride` tokens; las ventanas de todos los textos van juntas al modelo,
+ordenadas por longitud para que cada lote rellene (padding) lo mínimo. Las
+entidades de cada ventana se trasladan a offsets del texto completo y, donde
+dos ventanas se solapan, gana la entidad de mayor confianza.
+
+WindowedNER se llama igual que el pipeline de transformers (lista de textos ->
+lista de entidades por texto), así que SentenceNERMemo lo usa sin cambios.
+"""
+
+import re
+from typing import Dict, List, Sequence, Tuple
+
+_WORD = re.compile(r'\S+')
+
+
+def token_windows(offsets: Sequence[Tuple[int, int]], max_tokens: int, stride: int) -> List[Tuple[int, int]]:
+    """Character spans of overlapping windows over a text's token offsets."""
+    n = len(offsets)
+    if n <= max_tokens:
+        return [(0, None)]
+    step = max(1, max_tokens - stride)
+    windows = []
+    for start in range(0, n, step):
+        end = min(start + max_tokens, n)
+        windows.append((offsets[start][0], offsets[end - 1][1]))
+        if end == n:
+            break
+    return windows
+
+
+def merge_entities(entities: List[Dict]) -> List[Dict]:
+    """Drop overlapping duplicates from neighbouring windows, keeping the most confident span."""
+    merged: List[Dict] = []
+    for entity in sorted(entities, key=lambda e: (e['start'], -e['score'])):
+        if merged and entity['start'] < merged[-1]['end']:
+            if entity['score'] > merged[-1]['score']:
+                merged[-1] = entity
+            continue
+        merged.append(entity)
+    return merged
+
+
+class WindowedNER:
+    """Wrap a transformers NER pipeline so texts longer than the model limit are windowed."""
+
+    def __init__(self, ner_pipeline, max_tokens: int = None, stride: int = 128):
+        self.ner_pipeline = ner_pipeline
+        self.tokenizer = getattr(ner_pipeline, 'tokenizer', None)
+        if max_tokens is None:
+            model_max = getattr(self.tokenizer, 'model_max_length', 512)
+            max_tokens = min(model_max, 512) - 2  # [CLS] y [SEP]
+        self.max_tokens = max_tokens
+        self.stride = min(stride, max_tokens // 2)
+        self.windows_run = 0
+        self.long_texts = 0
+
+    @property
+    def signature(self) -> str:
+        return f"w{self.max_tokens}s{self.stride}"
+
+    def _token_offsets(self, textos: List[str]) -> List[List[Tuple[int, int]]]:
+        if self.tokenizer is not None and getattr(self.tokenizer, 'is_fast', False):
+            encoded = self.tokenizer(textos, add_special_tokens=False, return_offsets_mapping=True)
+            return encoded['offset_mapping']
+        # Sin tokenizador rápido: palabras como aproximación (los subtokens sólo pueden ser más)
+        return [[m.span() for m in _WORD.finditer(t)] for t in textos]
+
+    def __call__(self, textos: List[str], batch_size: int = 32) -> List[List[Dict]]:
+        windows = []  # (text index, char offset, window text)
+        for i, (texto, offsets) in enumerate(zip(textos, self._token_offsets(textos))):
+            spans = token_windows(offsets, self.max_tokens, self.stride)
+            if len(spans) > 1:
+                self.long_texts += 1
+            for start, end in spans:
+                windows.append((i, start, texto[start:end]))
+        self.windows_run += len(windows)
+
+        # Ventanas de longitud parecida en el mismo lote: menos padding
+        order = sorted(range(len(windows)), key=lambda w: len(windows[w][2]))
+        outputs = self.ner_pipeline([windows[w][2] for w in order], batch_size=batch_size) if order else []
+
+        entities: List[List[Dict]] = [[] for _ in textos]
+        for w, window_entities in zip(order, outputs):
+            i, offset, _ = windows[w]
+            for e in window_entities:
+                entities[i].append(dict(e, start=e['start'] + offset, end=e['end'] + offset))
+        return [merge_entities(e) if len(e) > 1 else e for e in entities]
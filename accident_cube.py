@@ -0,0 +1,206 @@
+"""
+Cubo de agregados ubicación × hora × día de la semana × nivel de severidad.
+
+Los conteos y las sumas de severidad viven en arreglos NumPy densos, indexados
+por el ID canónico de la ubicación (ETL/location_catalog.py), la hora (0-23), el
+día (0 = lunes) y el nivel (Leve/Moderado/Grave). El cubo se actualiza por
+bloques de posts enriquecidos, así que cualquier corte ("accidentes en Duarte,
+días laborables de 6 a 9") se responde sumando un sub-arreglo, sin volver a
+recorrer el DataFrame.
+
+Un post con varias ubicaciones cuenta una vez en cada una; `totals` guarda el
+mismo cubo sin la dimensión de ubicación para contar cada post una sola vez.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from ETL.location_catalog import parse_location_ids
+
+DAY_LABELS = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+TIER_LABELS = ['Leve', 'Moderado', 'Grave']
+TIER_EDGES = (0.3, 0.7)  # Leve <= 0.3 < Moderado <= 0.7 < Grave, como en el EDA
+WEEKDAYS = range(0, 5)
+WEEKEND = range(5, 7)
+_DAY_GROUPS = {'weekdays': WEEKDAYS, 'laborables': WEEKDAYS, 'weekend': WEEKEND, 'fin de semana': WEEKEND}
+
+_DAY_NAMES = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6,
+    'lunes': 0, 'martes': 1, 'miércoles': 2, 'jueves': 3, 'viernes': 4, 'sábado': 5, 'domingo': 6,
+}
+
+
+def day_index(day_of_week):
+    """Map a day_of_week column (0-6 or English/Spanish names) to integers 0-6 (-1 if unknown)."""
+    if pd.api.types.is_numeric_dtype(day_of_week):
+        return day_of_week.fillna(-1).astype(int)
+    return day_of_week.astype(str).str.lower().map(_DAY_NAMES).fillna(-1).astype(int)
+
+
+def severity_tier(severity) -> np.ndarray:
+    """0/1/2 tier per severity score (-1 for NaN)."""
+    severity = np.asarray(severity, dtype=np.float64)
+    tiers = np.searchsorted(TIER_EDGES, severity, side='left')
+    return np.where(np.isnan(severity), -1, tiers)
+
+
+def _selector(value, size, names=None):
+    """Index for one dimension: None (all), an int, a name, a range or an iterable of them."""
+    if value is None:
+        return slice(None)
+    if isinstance(value, str) and value.lower() in _DAY_GROUPS and names is DAY_LABELS:
+        value = _DAY_GROUPS[value.lower()]
+    if isinstance(value, range) and value.step == 1:
+        return slice(value.start, value.stop)  # vista, sin copiar
+    if isinstance(value, (int, np.integer, str)):
+        value = [value]
+    positions = []
+    for v in value:
+        if isinstance(v, str):
+            key = v.lower()
+            v = next((i for i, n in enumerate(names or []) if n.lower() == key), _DAY_NAMES.get(key))
+            if v is None:
+                raise KeyError(f"Valor desconocido: {key}")
+        positions.append(int(v))
+    return np.asarray(positions, dtype=np.int64)
+
+
+class AccidentCube:
+    """Dense counts/severity sums over location × hour × weekday × severity tier."""
+
+    def __init__(self, catalog, n_locations: Optional[int] = None):
+        self.catalog = catalog
+        n_locations = len(catalog) if n_locations is None else n_locations
+        self.counts = np.zeros((n_locations, 24, 7, 3), dtype=np.int32)
+        self.severity_sum = np.zeros((n_locations, 24, 7, 3), dtype=np.float64)
+        self.totals = np.zeros((24, 7, 3), dtype=np.int32)
+        self.totals_severity = np.zeros((24, 7, 3), dtype=np.float64)
+        self.posts = 0
+
+    @property
+    def dimensions(self) -> Dict[str, list]:
+        return {
+            'location': [self.catalog.name(i) for i in range(self.counts.shape[0])],
+            'hour': list(range(24)),
+            'day_of_week': list(DAY_LABELS),
+            'severity_tier': list(TIER_LABELS),
+        }
+
+    def _grow(self, n_locations):
+        extra = n_locations - self.counts.shape[0]
+        if extra > 0:
+            self.counts = np.concatenate([self.counts, np.zeros((extra, 24, 7, 3), dtype=np.int32)])
+            self.severity_sum = np.concatenate([self.severity_sum, np.zeros((extra, 24, 7, 3))])
+
+    def update(self, df_enriched: pd.DataFrame):
+        """Add a chunk of enriched posts (hour, day_of_week, severity_score, location_ids)."""
+        self.posts += len(df_enriched)
+        hours = pd.to_numeric(df_enriched['hour'], errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+        days = day_index(df_enriched['day_of_week']).to_numpy(dtype=np.int64)
+        severity = df_enriched['severity_score'].to_numpy(dtype=np.float64)
+        tiers = severity_tier(severity)
+        valid = (hours >= 0) & (hours < 24) & (days >= 0) & (tiers >= 0)
+
+        np.add.at(self.totals, (hours[valid], days[valid], tiers[valid]), 1)
+        np.add.at(self.totals_severity, (hours[valid], days[valid], tiers[valid]), severity[valid])
+
+        if 'location_ids' not in df_enriched.columns:
+            return self
+        ids = [parse_location_ids(v) for v in df_enriched['location_ids']]
+        rows = np.repeat(np.arange(len(ids)), [len(l) for l in ids])
+        locations = np.fromiter((i for l in ids for i in l), dtype=np.int64, count=len(rows))
+        keep = valid[rows] & (locations >= 0)
+        rows, locations = rows[keep], locations[keep]
+        if len(locations):
+            self._grow(int(locations.max()) + 1)
+        index = (locations, hours[rows], days[rows], tiers[rows])
+        np.add.at(self.counts, index, 1)
+        np.add.at(self.severity_sum, index, severity[rows])
+        return self
+
+    @classmethod
+    def from_frame(cls, df_enriched: pd.DataFrame, catalog) -> 'AccidentCube':
+        return cls(catalog).update(df_enriched)
+
+    def merge(self, other: 'AccidentCube'):
+        self._grow(other.counts.shape[0])
+        n = other.counts.shape[0]
+        self.counts[:n] += other.counts
+        self.severity_sum[:n] += other.severity_sum
+        self.totals += other.totals
+        self.totals_severity += other.totals_severity
+        self.posts += other.posts
+        return self
+
+    def _location_ids(self, location):
+        if location is None:
+            return None
+        if isinstance(location, range) and location.step == 1:
+            return slice(location.start, min(location.stop, self.counts.shape[0]))
+        names = [location] if isinstance(location, (str, int, np.integer)) else list(location)
+        ids = [n if isinstance(n, (int, np.integer)) else self.catalog.canonical_id(n, create=False) for n in names]
+        return np.asarray([i for i in ids if 0 <= i < self.counts.shape[0]], dtype=np.int64)
+
+    def slice(self, location=None, hours=None, days=None, tiers=None):
+        """(counts, severity sums) sub-arrays for the selection.
+
+        location: name(s) or ID(s), None = all posts (each counted once);
+        hours: ints or a range; days: 0-6, day names, WEEKDAYS/WEEKEND or 'weekdays'/'weekend';
+        tiers: 0-2 or 'Leve'/'Moderado'/'Grave'.
+        """
+        selectors = [_selector(hours, 24), _selector(days, 7, DAY_LABELS), _selector(tiers, 3, TIER_LABELS)]
+        ids = self._location_ids(location)
+        if ids is None:
+            arrays = [self.totals, self.totals_severity]
+        else:
+            arrays = [self.counts, self.severity_sum]
+            selectors.insert(0, ids)
+        # Un eje a la vez: los rangos son vistas y las listas un take() sobre lo ya recortado
+        for axis, selector in enumerate(selectors):
+            if isinstance(selector, slice):
+                arrays = [a[(slice(None),) * axis + (selector,)] for a in arrays]
+            else:
+                arrays = [np.take(a, selector, axis=axis) for a in arrays]
+        return arrays[0], arrays[1]
+
+    def query(self, location=None, hours=None, days=None, tiers=None) -> Dict:
+        """Count and mean severity of the accidents in a slice."""
+        counts, severity = self.slice(location, hours, days, tiers)
+        count = int(counts.sum())
+        return {
+            'count': count,
+            'severity_sum': float(severity.sum()),
+            'mean_severity': float(severity.sum() / count) if count else 0.0,
+        }
+
+    def by(self, dimension: str, location=None, hours=None, days=None, tiers=None) -> pd.Series:
+        """Counts of a slice broken down along one dimension ('location', 'hour', 'day_of_week', 'severity_tier')."""
+        if dimension == 'location' and location is None:
+            location = range(self.counts.shape[0])
+        counts, _ = self.slice(location, hours, days, tiers)
+        axes = ['hour', 'day_of_week', 'severity_tier']
+        if location is not None:
+            axes.insert(0, 'location')
+        keep = axes.index(dimension)
+        values = counts.sum(axis=tuple(i for i in range(counts.ndim) if i != keep))
+        return pd.Series(values, index=self._labels(dimension, location, hours, days, tiers), name='count')
+
+    def _labels(self, dimension, location, hours, days, tiers):
+        if dimension == 'location':
+            ids = np.arange(self.counts.shape[0])[self._location_ids(location)]
+            return [self.catalog.name(int(i)) for i in ids]
+        if dimension == 'hour':
+            return np.arange(24)[_selector(hours, 24)].tolist()
+        if dimension == 'day_of_week':
+            return np.array(DAY_LABELS, dtype=object)[_selector(days, 7, DAY_LABELS)].tolist()
+        return np.array(TIER_LABELS, dtype=object)[_selector(tiers, 3, TIER_LABELS)].tolist()
+
+    def top_locations(self, n=10, hours=None, days=None, tiers=None) -> pd.Series:
+        """Locations with the most accidents in the slice."""
+        counts, _ = self.slice(range(self.counts.shape[0]), hours, days, tiers)
+        totals = counts.reshape(len(counts), -1).sum(axis=1)
+        top = np.argsort(-totals, kind='stable')[:n]
+        top = top[totals[top] > 0]
+        return pd.Series(totals[top], index=[self.catalog.name(int(i)) for i in top], name='count')
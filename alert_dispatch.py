@@ -0,0 +1,272 @@
+"""
+Envío asíncrono de alertas a un destino de notificaciones (sink).
+
+Los productores encolan alertas en una cola acotada; si se llena, `submit`
+espera (backpressure) en lugar de acumular memoria. Un agrupador saca lotes de
+hasta `batch_size` alertas (o lo que haya tras `max_delay` segundos) y los envía
+con a lo sumo `max_in_flight` llamadas simultáneas al sink; mientras no haya
+hueco, el agrupador no saca más de la cola. Los fallos transitorios se
+reintentan con backoff exponencial con jitter y los lotes que agotan los
+reintentos quedan en `dead_letter`.
+
+Uso:
+    python alert_dispatch.py                     # alertas del recomendador a ETL/alerts_outbox.jsonl
+    python alert_dispatch.py --batch-size 20 --in-flight 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List
+
+from metrics import LatencyHistogram
+
+OUTBOX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ETL', 'alerts_outbox.jsonl')
+
+_STOP = object()
+
+
+class SinkError(Exception):
+    """Transient delivery failure: the batch can be retried."""
+
+
+# =============================
+# 📮 SINKS
+# =============================
+class FileSink:
+    """Local stand-in: appends each alert as a JSON line."""
+
+    def __init__(self, path=OUTBOX_PATH):
+        self.path = path
+        self.batches = 0
+
+    def _write(self, batch):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for alert in batch:
+                f.write(json.dumps(alert, ensure_ascii=False, default=str) + '\n')
+
+    async def send(self, batch: List[Dict]):
+        await asyncio.to_thread(self._write, batch)
+        self.batches += 1
+
+
+class QueueSink:
+    """In-memory stand-in for tests: simulated latency, periodic failures, delivered batches in a queue."""
+
+    def __init__(self, latency=0.01, fail_every=0, seed=42):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.delivered: asyncio.Queue = asyncio.Queue()
+        self.calls = 0
+        self.failures = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self._rng = random.Random(seed)
+
+    async def send(self, batch: List[Dict]):
+        self.calls += 1
+        self.concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        try:
+            await asyncio.sleep(self.latency * (0.5 + self._rng.random()))
+            if self.fail_every and self.calls % self.fail_every == 0:
+                self.failures += 1
+                raise SinkError("503 Service Unavailable (simulado)")
+            self.delivered.put_nowait(list(batch))
+        finally:
+            self.concurrent -= 1
+
+
+class WebhookSink:
+    """POST each batch as a JSON array to an HTTP endpoint (5xx, 429 and network errors are retried)."""
+
+    def __init__(self, url, timeout=10.0, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = {'Content-Type': 'application/json; charset=utf-8', **(headers or {})}
+
+    def _post(self, batch):
+        body = json.dumps(batch, ensure_ascii=False, default=str).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, headers=self.headers, method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 429 or e.code >= 500:
+                raise SinkError(f"HTTP {e.code}") from e
+            raise
+        except urllib.error.URLError as e:
+            raise SinkError(str(e.reason)) from e
+
+    async def send(self, batch: List[Dict]):
+        await asyncio.to_thread(self._post, batch)
+
+
+# =============================
+# 🚀 DESPACHADOR
+# =============================
+class AlertDispatcher:
+    """Batching alert dispatcher with a bounded queue, bounded in-flight sends and jittered retries."""
+
+    def __init__(self, sink, batch_size=50, max_delay=0.25, max_in_flight=4, queue_size=1000,
+                 max_retries=5, backoff_base=0.2, backoff_max=10.0):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.delivery_latency = LatencyHistogram()  # desde submit hasta la entrega confirmada
+        self.sink_latency = LatencyHistogram()  # por llamada al sink
+        self.dead_letter: List[Dict] = []
+        self.stats = {'submitted': 0, 'delivered': 0, 'failed': 0, 'batches': 0, 'retries': 0,
+                      'producer_waits': 0, 'max_queue_depth': 0, 'max_in_flight': 0}
+        self.queue = None
+        self._in_flight = 0
+        self._slots = None
+        self._tasks = set()
+        self._batcher = None
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._batcher = asyncio.create_task(self._batch_loop())
+        return self
+
+    async def submit(self, alert: Dict):
+        """Enqueue one alert; waits while the queue is full (backpressure)."""
+        if self.queue.full():
+            self.stats['producer_waits'] += 1
+        await self.queue.put((time.perf_counter(), alert))
+        self.stats['submitted'] += 1
+        self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self.queue.qsize())
+
+    async def close(self):
+        """Flush everything queued, wait for the in-flight sends and stop."""
+        await self.queue.put(_STOP)
+        await self._batcher
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            # Sin hueco para otro envío el agrupador espera y la cola se llena: backpressure al productor
+            await self._slots.acquire()
+            task = asyncio.create_task(self._deliver(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, batch):
+        self._in_flight += 1
+        self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self._in_flight)
+        alerts = [alert for _, alert in batch]
+        try:
+            for attempt in range(self.max_retries + 1):
+                inicio = time.perf_counter()
+                try:
+                    await self.sink.send(alerts)
+                except (SinkError, ConnectionError, TimeoutError) as e:
+                    self.sink_latency.observe(time.perf_counter() - inicio)
+                    if attempt == self.max_retries:
+                        self._discard(alerts, attempt + 1, e)
+                        return
+                    self.stats['retries'] += 1
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                    await asyncio.sleep(delay * (0.5 + random.random() / 2))
+                    continue
+                except Exception as e:  # error permanente (p. ej. HTTP 400): no se reintenta
+                    self._discard(alerts, attempt + 1, e)
+                    return
+                fin = time.perf_counter()
+                self.sink_latency.observe(fin - inicio)
+                for enqueued, _ in batch:
+                    self.delivery_latency.observe(fin - enqueued)
+                self.stats['delivered'] += len(alerts)
+                self.stats['batches'] += 1
+                return
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    def _discard(self, alerts, attempts, error):
+        print(f"❌ Lote de {len(alerts)} alertas descartado tras {attempts} intento(s): {error}")
+        self.stats['failed'] += len(alerts)
+        self.dead_letter.extend(alerts)
+
+    def metrics(self) -> Dict:
+        """Queue depth, in-flight sends, counters and latency histograms (JSON-serializable)."""
+        return {
+            'queue_depth': self.queue.qsize() if self.queue is not None else 0,
+            'in_flight': self._in_flight,
+            **self.stats,
+            'delivery_latency': self.delivery_latency.snapshot(),
+            'sink_latency': self.sink_latency.snapshot(),
+        }
+
+
+async def dispatch_async(alerts, sink, **kwargs) -> AlertDispatcher:
+    async with AlertDispatcher(sink, **kwargs) as dispatcher:
+        for alert in alerts:
+            await dispatcher.submit(alert)
+    return dispatcher
+
+
+def dispatch_alerts(alerts, sink, **kwargs) -> Dict:
+    """Deliver a list of alerts from synchronous code; returns the dispatcher metrics."""
+    dispatcher = asyncio.run(dispatch_async(alerts, sink, **kwargs))
+    return dispatcher.metrics()
+
+
+def main():
+    from recomendation_by_accidente import run as run_accident_recommendations
+
+    parser = argparse.ArgumentParser(description="Envía las alertas del recomendador por accidentes a un sink")
+    parser.add_argument("--output", default=OUTBOX_PATH, help="archivo JSONL de salida (sink local)")
+    parser.add_argument("--webhook", help="URL a la que enviar los lotes (en lugar del archivo)")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--in-flight", type=int, default=4, help="envíos simultáneos al sink")
+    args = parser.parse_args()
+
+    sink = WebhookSink(args.webhook) if args.webhook else FileSink(args.output)
+    run_accident_recommendations(sink=sink, dispatch_options={'batch_size': args.batch_size,
+                                                              'max_in_flight': args.in_flight})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Catálogo de artefactos en memoria para una sesión del menú (run_pipeline.py).
+
+Cada dataset (users, accidents, points_of_interest) se lee y se parsea una sola
+vez; las siguientes peticiones reciben el mismo DataFrame mientras el archivo no
+cambie. La entrada se invalida cuando cambian el mtime o el tamaño del CSV, p. ej.
+porque el análisis NPL o el generador de datos lo reescribieron.
+
+Los DataFrames devueltos se comparten entre consumidores: son de sólo lectura.
+"""
+
+import ast
+import os
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+DATASETS = {
+    'users': ('users.csv', ['interests', 'frequent_routes']),
+    'accidents': ('accidents.csv', []),
+    'points': ('points_of_interest.csv', ['related_interests', 'nearby_routes']),
+}
+
+
+def _literal_list(x):
+    try:
+        return ast.literal_eval(x)
+    except (ValueError, SyntaxError, TypeError):
+        return []
+
+
+def parse_list_column(series: pd.Series) -> pd.Series:
+    """literal_eval each distinct value once (list columns repeat a lot, e.g. routes)."""
+    parsed = {value: _literal_list(value) for value in series.dropna().unique()}
+    return series.map(lambda v: parsed[v] if isinstance(v, str) else [])
+
+
+def load_dataset(path: str, list_columns=()) -> pd.DataFrame:
+    """Read a CSV and parse its stringified list columns."""
+    df = pd.read_csv(path)
+    for column in list_columns:
+        if column in df.columns:
+            df[column] = parse_list_column(df[column])
+    return df
+
+
+def load_datasets(data_dir: str = "ETL") -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """(users, accidents, points) read straight from disk, without caching."""
+    return tuple(load_dataset(os.path.join(data_dir, DATASETS[name][0]), DATASETS[name][1])
+                 for name in ('users', 'accidents', 'points'))
+
+
+class ArtifactCatalog:
+    """Session cache of parsed datasets, invalidated by file mtime/size."""
+
+    def __init__(self, data_dir: str = "ETL"):
+        self.data_dir = data_dir
+        self._entries: Dict[str, Tuple[Tuple[int, int], pd.DataFrame]] = {}
+        self.hits = 0
+        self.loads = 0
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.data_dir, DATASETS[name][0])
+
+    def get(self, name: str) -> pd.DataFrame:
+        """Parsed dataset `name`, re-read only if its file changed since the last load."""
+        path = self.path(name)
+        stat = os.stat(path)  # FileNotFoundError si la etapa que lo genera no se ha ejecutado
+        version = (stat.st_mtime_ns, stat.st_size)
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+        df = load_dataset(path, DATASETS[name][1])
+        self._entries[name] = (version, df)
+        self.loads += 1
+        return df
+
+    def datasets(self) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """(users, accidents, points), the tuple recomendation.cargar_datos returns."""
+        return self.get('users'), self.get('accidents'), self.get('points')
+
+    def invalidate(self, name: Optional[str] = None):
+        if name is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(name, None)
+
+    def stats(self) -> Dict:
+        return {'entries': len(self._entries), 'hits': self.hits, 'loads': self.loads}
@@ -0,0 +1,193 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from compact_model import CompactModel
+from ETL.feature_store import FeatureStore
+from ETL.location_catalog import load_catalog, parse_location_ids
+from recomendation import cargar_datos, cargar_indice_semantico, rankear_pois
+
+
+def _latencies(fn, items, repeat=3):
+    """Per-call latencies in ms (best of `repeat` passes over items)."""
+    best = None
+    for _ in range(repeat):
+        tiempos = []
+        for item in items:
+            inicio = time.perf_counter()
+            fn(item)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        tiempos = np.array(tiempos)
+        if best is None or tiempos.sum() < best.sum():
+            best = tiempos
+    return best
+
+
+def _summary(latencies_ms):
+    return {
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'avg_ms': float(latencies_ms.mean()),
+    }
+
+
+def benchmark_scoring(model, index=None, k=3):
+    """Latency and memory of TF-IDF scoring vs. embedding scoring (if an index is given)."""
+    users = list(range(model.n_users))
+    resultados = {}
+
+    poi_matrix = model.poi_matrix
+    tfidf = _summary(_latencies(lambda u: rankear_pois(model, u, k), users))
+    inicio = time.perf_counter()
+    model.user_matrix() @ poi_matrix.T
+    tfidf['batch_ms'] = (time.perf_counter() - inicio) * 1000
+    tfidf['bytes'] = int(poi_matrix.data.nbytes + poi_matrix.indices.nbytes
+                         + poi_matrix.indptr.nbytes + model.idf.nbytes)
+    resultados['tfidf'] = tfidf
+
+    if index is not None:
+        embedding = _summary(_latencies(lambda u: rankear_pois(model, u, k, index=index), users))
+        inicio = time.perf_counter()
+        index.scores_batch(users)
+        embedding['batch_ms'] = (time.perf_counter() - inicio) * 1000
+        embedding['bytes'] = int(index.nbytes)
+        embedding['scoring_bytes'] = int(index._poi_scoring.nbytes)
+        resultados['embedding'] = embedding
+
+    return resultados
+
+
+def _analisis_por_pasos(analizador, texto):
+    """The pre-fusion analyze_text_comprehensive: every step re-lowercases and re-scans the text."""
+    analizador.preprocess_text(texto)
+    ubicaciones = analizador.extract_locations_regex(texto)
+    analizador.classify_incident_severity(texto)
+    len(texto.split())
+    analizador.location_catalog.ids_for(sorted(set(ubicaciones)))
+
+
+def benchmark_text_pipeline(analizador, textos, repeat=3):
+    """Per-post CPU time (µs) of the step-by-step analysis vs. the fused processor (single and batch)."""
+    textos = [t for t in textos if isinstance(t, str)]
+    procesador = analizador.text_processor
+    procesador.process_batch(textos)  # calentar catálogo y memo de IDs en ambos caminos
+
+    def mejor(fn):
+        tiempos = []
+        for _ in range(repeat):
+            inicio = time.process_time()
+            fn()
+            tiempos.append(time.process_time() - inicio)
+        return min(tiempos) / len(textos) * 1e6
+
+    return {
+        'por_pasos_us': mejor(lambda: [_analisis_por_pasos(analizador, t) for t in textos]),
+        'fusionado_us': mejor(lambda: [procesador.process(t) for t in textos]),
+        'lote_us': mejor(lambda: procesador.process_batch(textos)),
+    }
+
+
+def run_text_benchmark():
+    """Microbenchmark of the fused text pipeline on the Instagram posts."""
+    from ETL.analizer_npl import AdvancedNLPAnalyzer
+
+    print("\n" + "=" * 80)
+    print("⏱️ MICROBENCHMARK DEL PIPELINE DE TEXTO")
+    print("=" * 80)
+
+    textos = pd.read_csv(os.path.join("ETL", "instagram_posts.csv"))["text"].tolist()
+    resultados = benchmark_text_pipeline(AdvancedNLPAnalyzer(), textos)
+    base = resultados['por_pasos_us']
+    print(f"📝 {len(textos)} posts (CPU por post, mejor de 3)\n")
+    for nombre, clave in [("Por pasos", 'por_pasos_us'), ("Fusionado", 'fusionado_us'), ("Lote", 'lote_us')]:
+        print(f"{nombre:<12}{resultados[clave]:>10.1f} µs   x{base / resultados[clave]:.2f}")
+
+
+def _csv_scan(csv_path, location_id, since=None, until=None):
+    """What consumers did before the store: read the CSV and filter it."""
+    accidents = pd.read_csv(csv_path)
+    mask = accidents["location_ids"].apply(lambda v: location_id in parse_location_ids(v))
+    if since is not None:
+        timestamps = pd.to_datetime(accidents["timestamp"], errors="coerce")
+        mask &= (timestamps >= since) & (timestamps <= until)
+    return accidents[mask]
+
+
+def benchmark_accident_store(store, csv_path, location_ids, window=pd.Timedelta(days=7)):
+    """Latency of point (location) and range (location + time window) queries: SQLite store vs CSV scan."""
+    ultimo = pd.to_datetime(pd.read_csv(csv_path)["timestamp"]).max()
+    since, until = ultimo - window, ultimo
+    return {
+        'csv_punto': _summary(_latencies(lambda i: _csv_scan(csv_path, i), location_ids, repeat=1)),
+        'store_punto': _summary(_latencies(lambda i: store.query([i]), location_ids)),
+        'csv_rango': _summary(_latencies(lambda i: _csv_scan(csv_path, i, since, until), location_ids, repeat=1)),
+        'store_rango': _summary(_latencies(lambda i: store.query([i], since=since, until=until), location_ids)),
+        'store_conteo': _summary(_latencies(lambda i: store.count([i], since=since, until=until), location_ids)),
+    }
+
+
+def run_store_benchmark():
+    """Point and range query latency of ETL/accidents.db vs. scanning accidents.csv."""
+    from ETL.accident_store import STORE_PATH, AccidentStore, sync_from_csv
+
+    print("\n" + "=" * 80)
+    print("⏱️ BENCHMARK DEL ALMACÉN DE ACCIDENTES: SQLite vs CSV")
+    print("=" * 80)
+
+    csv_path = os.path.join("ETL", "accidents.csv")
+    store = AccidentStore() if os.path.exists(STORE_PATH) else sync_from_csv(csv_path)
+    top = store.conn.execute("SELECT location_id FROM accident_locations GROUP BY location_id "
+                             "ORDER BY COUNT(*) DESC LIMIT 20").fetchall()
+    resultados = benchmark_accident_store(store, csv_path, [i for (i,) in top])
+    print(f"🗂️ {len(store)} posts, {len(top)} ubicaciones consultadas (rango: últimos 7 días)\n")
+    print(f"{'Consulta':<14}{'p50 (ms)':>10}{'p95 (ms)':>10}{'media (ms)':>12}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<14}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['avg_ms']:>12.3f}")
+    store.close()
+
+
+def run():
+    """Main function to benchmark the recommendation scoring modes."""
+    print("\n" + "=" * 80)
+    print("⏱️ BENCHMARK DE PUNTUACIÓN: TF-IDF vs EMBEDDINGS")
+    print("=" * 80)
+
+    users, accidents, points = cargar_datos()
+    store = FeatureStore()
+    model = CompactModel(users, points, load_catalog(), store)
+    index = cargar_indice_semantico(model, store)
+
+    resultados = benchmark_scoring(model, index)
+    print(f"👥 {model.n_users} usuarios x 🏪 {model.n_pois} POIs\n")
+    print(f"{'Modo':<12}{'p50 (ms)':>10}{'p95 (ms)':>10}{'media (ms)':>12}{'lote (ms)':>11}{'memoria':>12}")
+    for modo, r in resultados.items():
+        print(f"{modo:<12}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['avg_ms']:>12.3f}"
+              f"{r['batch_ms']:>11.2f}{r['bytes'] / 1024:>10.1f}KB")
+    if 'embedding' in resultados:
+        print(f"\n💾 Embeddings en disco (float16): {resultados['embedding']['bytes'] / 1024:.1f}KB; "
+              f"matriz de puntuación float32: {resultados['embedding']['scoring_bytes'] / 1024:.1f}KB")
+
+    print("\n" + "=" * 80)
+    print("✅ BENCHMARK COMPLETADO")
+    print("=" * 80)
+
+
+def main():
+    """Alias for run() function."""
+    run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de recomendaciones y del pipeline de texto")
+    parser.add_argument("--text", action="store_true", help="Microbenchmark del pipeline de texto fusionado")
+    parser.add_argument("--store", action="store_true", help="Consultas del almacén SQLite frente al CSV")
+    args = parser.parse_args()
+    if args.text:
+        run_text_benchmark()
+    elif args.store:
+        run_store_benchmark()
+    else:
+        run()
@@ -0,0 +1,296 @@
+import re
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfTransformer
+from sklearn.preprocessing import normalize
+
+from ETL.feature_store import content_key
+from ETL.location_catalog import LocationCatalog
+
+
+class Vocabulary:
+    """Interned string table: every distinct string gets a stable integer code."""
+
+    def __init__(self, items=()):
+        self.strings = []
+        self.index = {}
+        for item in items:
+            self.intern(item)
+
+    def intern(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = len(self.strings)
+            self.index[value] = code
+            self.strings.append(value)
+        return code
+
+    def get(self, value, default=-1):
+        return self.index.get(value, default)
+
+    def encode(self, values):
+        return np.fromiter((self.intern(v) for v in values), dtype=np.int32)
+
+    def decode(self, codes):
+        return [self.strings[c] for c in codes]
+
+    def __getitem__(self, code):
+        return self.strings[code]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class CSRList:
+    """List-of-lists column stored as CSR arrays (indptr, indices) over a vocabulary."""
+
+    def __init__(self, indptr, indices):
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_lists(cls, lists, vocab):
+        return cls.from_codes(
+            [vocab.intern(v) for v in values if isinstance(v, str)] if isinstance(values, list) else []
+            for values in lists
+        )
+
+    @classmethod
+    def from_codes(cls, code_lists):
+        indptr = [0]
+        indices = []
+        for codes in code_lists:
+            indices.extend(codes)
+            indptr.append(len(indices))
+        return cls(np.asarray(indptr, dtype=np.int32), np.asarray(indices, dtype=np.int32))
+
+    def row(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def rows_with_any(self, mask):
+        """Boolean array: which rows contain at least one code where mask is True."""
+        hits = np.concatenate(([0], np.cumsum(mask[self.indices], dtype=np.int64)))
+        return (hits[self.indptr[1:]] - hits[self.indptr[:-1]]) > 0
+
+    def to_sparse(self, n_cols):
+        """Row x vocabulary count matrix."""
+        data = np.ones(len(self.indices), dtype=np.float64)
+        return csr_matrix((data, self.indices, self.indptr), shape=(len(self), n_cols))
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+
+MINUTES_PER_DAY = 24 * 60
+LOCAL_TZ = 'America/Santo_Domingo'  # horarios de los POIs en hora local
+_CLOCK = re.compile(r'^\d{1,2}:\d{2}$')
+_SCHEDULE = re.compile(r'^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*$')
+
+
+def parse_schedules(schedules):
+    """(open, close) minute-of-day int32 arrays from 'H:MM-H:MM' strings.
+
+    close is always after open: overnight ranges ('22:00-2:00', or an end past
+    24:00 such as '20:00-26:00') close on the next day, so close > 1440.
+    Unparseable schedules count as always open (0, 1440).
+    """
+    parts = pd.Series(list(schedules), dtype=object).astype(str).str.extract(_SCHEDULE).astype(float)
+    opens = (parts[0] * 60 + parts[1]).to_numpy()
+    closes = (parts[2] * 60 + parts[3]).to_numpy()
+    valid = ~(np.isnan(opens) | np.isnan(closes))
+    opens = np.where(valid, opens, 0) % MINUTES_PER_DAY
+    closes = np.where(valid, closes, MINUTES_PER_DAY)
+    closes = np.where(closes <= opens, closes + MINUTES_PER_DAY, closes)
+    return opens.astype(np.int32), closes.astype(np.int32)
+
+
+def minute_of_day(when=None):
+    """Local minute of the day (0-1439) in LOCAL_TZ for a timestamp, an 'HH:MM' string or a minute count.
+
+    Naive timestamps are UTC (as in the posts), so they are converted before
+    reading the clock; 'HH:MM' and minute counts are already local. Default: now.
+    """
+    if isinstance(when, (int, np.integer)):
+        return int(when) % MINUTES_PER_DAY
+    if isinstance(when, str) and _CLOCK.match(when.strip()):
+        hours, minutes = when.strip().split(':')
+        return (int(hours) * 60 + int(minutes)) % MINUTES_PER_DAY
+    ts = pd.Timestamp.now(tz='UTC') if when is None else pd.Timestamp(when)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    ts = ts.tz_convert(LOCAL_TZ)
+    return ts.hour * 60 + ts.minute
+
+
+def _encode_bytes(values):
+    """Store unique labels (ids, names) as UTF-8 fixed-width bytes instead of Python strings."""
+    return np.array([str(v).encode("utf-8") for v in values], dtype=np.bytes_)
+
+
+class CompactModel:
+    """Integer-coded users and POIs shared by the recommendation modules.
+
+    Zones, routes, interests, POI types and offers are interned once; categorical
+    columns hold int32 codes and list columns are CSR arrays, so joins between
+    users and POIs become integer comparisons. Location codes are the canonical
+    IDs of the shared LocationCatalog, so accidents join on the same integers.
+    With a FeatureStore the POI TF-IDF matrix is read memory-mapped instead of refitted.
+    """
+
+    def __init__(self, users, points, catalog=None, store=None):
+        # Zonas y rutas usan el catálogo canónico: el código de cada ubicación es su ID
+        self.catalog = catalog if catalog is not None else LocationCatalog()
+        self.interests = Vocabulary()
+        self.poi_types = Vocabulary()
+        self.offers = Vocabulary()
+
+        # === USUARIOS ===
+        self.user_ids = _encode_bytes(users["user_id"])
+        self.user_names = _encode_bytes(users["name"])
+        self.residential_zone = self._encode_locations(users["residential_zone"])
+        self.work_zone = self._encode_locations(users["work_zone"])
+        self.user_interests = CSRList.from_lists(list(users["interests"]), self.interests)
+        self.user_routes = self._encode_location_lists(users["frequent_routes"])
+        self.user_index = {uid: i for i, uid in enumerate(users["user_id"])}
+
+        # === PUNTOS DE INTERÉS ===
+        self.poi_ids = _encode_bytes(points["poi_id"])
+        self.poi_names = _encode_bytes(points["name"])
+        self.poi_type = self.poi_types.encode(points["type"])
+        self.poi_zone = self._encode_locations(points["zone"])
+        self.poi_interests = CSRList.from_lists(list(points["related_interests"]), self.interests)
+        self.poi_routes = self._encode_location_lists(points["nearby_routes"])
+        self.poi_schedule = _encode_bytes(points["schedule"])
+        self.poi_open, self.poi_close = parse_schedules(points["schedule"])
+        # Los POIs abiertos sólo cambian en estas horas: la máscara se calcula una vez por tramo
+        self.schedule_breaks = np.unique(np.concatenate([self.poi_open, self.poi_close % MINUTES_PER_DAY]))
+        self._open_masks = {}
+        self.poi_offer = self.offers.encode(points["current_offer"])
+
+        self._build_poi_index(store)
+
+    def _encode_locations(self, values):
+        return np.fromiter((self.catalog.canonical_id(v) for v in values), dtype=np.int32)
+
+    def _encode_location_lists(self, lists):
+        return CSRList.from_codes(
+            self.catalog.ids_for(values) if isinstance(values, list) else [] for values in lists
+        )
+
+    def location_name(self, code):
+        return self.catalog.name(code) if code >= 0 else ''
+
+    def location_names(self, codes):
+        return [self.catalog.name(c) for c in codes if c >= 0]
+
+    def _build_poi_index(self, store=None):
+        """TF-IDF over interest codes plus the POI type code, fitted once (or loaded from the store)."""
+        key = content_key(self.poi_interests.indptr, self.poi_interests.indices, self.poi_type,
+                          self.interests.strings, self.poi_types.strings)
+        if store is not None:
+            cached = store.load_sparse("poi_tfidf", key)
+            idf = store.load_dense("poi_idf", key)
+            if cached is not None and idf is not None:
+                self.poi_matrix, self.idf = cached[0], idf
+                return
+
+        n_interests = len(self.interests)
+        terms = self.poi_interests.to_sparse(n_interests + len(self.poi_types)).tolil()
+        for i, type_code in enumerate(self.poi_type):
+            terms[i, n_interests + type_code] += 1
+        tfidf = TfidfTransformer()
+        self.poi_matrix = tfidf.fit_transform(terms.tocsr())
+        self.idf = tfidf.idf_
+        if store is not None:
+            store.save_sparse("poi_tfidf", self.poi_matrix,
+                              self.interests.strings + self.poi_types.strings, key=key)
+            store.save_dense("poi_idf", self.idf, key=key)
+
+    def user_vector(self, user_idx):
+        """TF-IDF vector for a user's interests in the POI term space (same as TfidfTransformer)."""
+        codes = self.user_interests.row(user_idx)
+        counts = csr_matrix((self.idf[codes], codes, [0, len(codes)]), shape=(1, self.poi_matrix.shape[1]))
+        return normalize(counts)
+
+    def user_matrix(self):
+        """TF-IDF vectors of every user at once (users x POI terms)."""
+        counts = self.user_interests.to_sparse(self.poi_matrix.shape[1])
+        return normalize(counts.multiply(self.idf).tocsr())
+
+    def location_mask(self, codes):
+        codes = np.asarray(codes, dtype=np.int32)
+        mask = np.zeros(len(self.catalog), dtype=bool)
+        mask[codes[(codes >= 0) & (codes < len(mask))]] = True
+        return mask
+
+    def interest_mask(self, codes):
+        mask = np.zeros(len(self.interests), dtype=bool)
+        mask[np.asarray(codes, dtype=np.int32)] = True
+        return mask
+
+    def schedule_phase(self, when=None):
+        """Stretch of the day between two opening/closing times; the open set is constant within it."""
+        return int(np.searchsorted(self.schedule_breaks, minute_of_day(when), side='right'))
+
+    def open_mask(self, when=None):
+        """Boolean mask of the POIs open at `when` (see minute_of_day), one comparison over all POIs."""
+        minute = minute_of_day(when)
+        phase = self.schedule_phase(minute)
+        mask = self._open_masks.get(phase)
+        if mask is None:
+            # Un horario nocturno también cubre la madrugada: minuto + 1440 antes del cierre
+            mask = (((self.poi_open <= minute) & (minute < self.poi_close))
+                    | (minute + MINUTES_PER_DAY < self.poi_close))
+            mask.setflags(write=False)
+            self._open_masks[phase] = mask
+        return mask
+
+    def user(self, idx):
+        """Decoded view of one user, for messages."""
+        return {
+            'user_id': self.user_ids[idx].decode("utf-8"),
+            'name': self.user_names[idx].decode("utf-8"),
+            'residential_zone': self.location_name(self.residential_zone[idx]),
+            'work_zone': self.location_name(self.work_zone[idx]),
+            'interests': self.interests.decode(self.user_interests.row(idx)),
+            'frequent_routes': self.location_names(self.user_routes.row(idx)),
+        }
+
+    def poi(self, idx):
+        """Decoded view of one POI, for messages."""
+        return {
+            'poi_id': self.poi_ids[idx].decode("utf-8"),
+            'name': self.poi_names[idx].decode("utf-8"),
+            'type': self.poi_types[self.poi_type[idx]],
+            'zone': self.location_name(self.poi_zone[idx]),
+            'related_interests': self.interests.decode(self.poi_interests.row(idx)),
+            'nearby_routes': self.location_names(self.poi_routes.row(idx)),
+            'schedule': self.poi_schedule[idx].decode("utf-8"),
+            'current_offer': self.offers[self.poi_offer[idx]],
+        }
+
+    @property
+    def n_users(self):
+        return len(self.user_ids)
+
+    @property
+    def n_pois(self):
+        return len(self.poi_ids)
+
+    def user_nbytes(self):
+        """Bytes held by the user arrays (vocabularies excluded, they are shared)."""
+        return (self.user_ids.nbytes + self.user_names.nbytes + self.residential_zone.nbytes
+                + self.work_zone.nbytes + self.user_interests.nbytes + self.user_routes.nbytes)
+
+    def poi_nbytes(self):
+        """Bytes held by the POI arrays (vocabularies excluded, they are shared)."""
+        return (self.poi_ids.nbytes + self.poi_names.nbytes + self.poi_type.nbytes
+                + self.poi_zone.nbytes + self.poi_interests.nbytes + self.poi_routes.nbytes
+                + self.poi_schedule.nbytes + self.poi_open.nbytes + self.poi_close.nbytes
+                + self.poi_offer.nbytes)
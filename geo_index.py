@@ -0,0 +1,181 @@
+"""
+Coordenadas offline de ubicaciones y POIs, y búsquedas por proximidad.
+
+El gazetteer (ETL/gazetteer.csv) da latitud/longitud a las ubicaciones
+canónicas; los "Km N" de una vía se interpolan entre sus marcadores conocidos
+y fuera de ese tramo no se ubican. Con las coordenadas, un KD-tree responde
+"qué ubicaciones o POIs hay a menos de X km" sin recorrer todos los puntos.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from ETL.location_catalog import km_marker, location_key
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ETL', 'gazetteer.csv')
+DEFAULT_KM_ROAD = 'duarte'  # "Km 14" sin vía: los reportes suelen referirse a la Autopista Duarte
+EARTH_RADIUS_KM = 6371.0
+_REFERENCE_LAT = np.radians(18.48)  # Santo Domingo
+
+
+def project_km(coords):
+    """Equirectangular projection of (lat, lon) degrees to planar km around Santo Domingo.
+
+    At city scale the error is well under 1%, so Euclidean distances on the
+    projected points are distances in km.
+    """
+    coords = np.radians(np.atleast_2d(np.asarray(coords, dtype=np.float64)))
+    return np.column_stack([coords[:, 1] * np.cos(_REFERENCE_LAT), coords[:, 0]]) * EARTH_RADIUS_KM
+
+
+class Gazetteer:
+    """Offline coordinates for canonical locations and Km markers (ETL/gazetteer.csv).
+
+    Names go through the catalog's location_key, so aliases and accent variants
+    resolve to the same point. Rows named like 'Duarte Km 9' are anchors along a
+    road; any 'Km N' on that road is interpolated between them (None outside
+    the first and last anchor). Compound
+    locations ('A & B', 'A con B') resolve to the midpoint of their parts and
+    descriptive ones ('Duarte Próximo Al Humazo') to their leading known name.
+    """
+
+    def __init__(self, points=None, anchors=None):
+        self.points = dict(points or {})  # clave -> (lat, lon)
+        self.anchors = dict(anchors or {})  # vía -> (km, lat, lon) ordenados por km
+        self._prefixes = sorted(self.points, key=len, reverse=True)
+
+    @classmethod
+    def load(cls, path=GAZETTEER_PATH):
+        df = pd.read_csv(path)
+        points, anchors = {}, {}
+        for name, lat, lon in zip(df['name'], df['lat'], df['lon']):
+            marker = km_marker(name)
+            if marker and marker[0]:
+                anchors.setdefault(location_key(marker[0]), []).append((marker[1], lat, lon))
+            else:
+                points[location_key(name)] = (float(lat), float(lon))
+        anchors = {road: np.array(sorted(rows), dtype=np.float64) for road, rows in anchors.items()}
+        return cls(points, anchors)
+
+    def locate(self, raw):
+        """(lat, lon) for a raw or canonical location name, or None if it cannot be placed."""
+        if not isinstance(raw, str) or not raw.strip():
+            return None
+        key = location_key(raw)
+        if key in self.points:
+            return self.points[key]
+
+        marker = km_marker(raw)
+        if marker:
+            road = location_key(marker[0]) if marker[0] else DEFAULT_KM_ROAD
+            anchors = self.anchors.get(road)
+            if anchors is not None:
+                # np.interp satura en los extremos: un Km fuera del tramo conocido no se ubica
+                if not anchors[0, 0] <= marker[1] <= anchors[-1, 0]:
+                    return None
+                return (float(np.interp(marker[1], anchors[:, 0], anchors[:, 1])),
+                        float(np.interp(marker[1], anchors[:, 0], anchors[:, 2])))
+            return self.points.get(road)
+
+        for separator in (' & ', ' con ', ' esquina '):
+            if separator in raw.lower():
+                parts = [self.locate(p) for p in raw.lower().split(separator)]
+                parts = [p for p in parts if p is not None]
+                return tuple(np.mean(parts, axis=0).tolist()) if parts else None
+
+        for prefix in self._prefixes:
+            if key.startswith(prefix + ' '):
+                return self.points[prefix]
+        return None
+
+    def coords_for_catalog(self, catalog):
+        """(len(catalog), 2) lat/lon array indexed by location ID; NaN where unknown."""
+        coords = np.full((len(catalog), 2), np.nan)
+        for location_id, name in enumerate(catalog.names):
+            point = self.locate(name)
+            if point is None:
+                point = next(filter(None, (self.locate(a) for a in sorted(catalog.aliases[location_id]))), None)
+            if point is not None:
+                coords[location_id] = point
+        return coords
+
+
+class ProximityIndex:
+    """KD-tree over lat/lon points: radius and nearest queries in O(log n) per point.
+
+    Rows with NaN coordinates are left out; results are indices into the
+    original array.
+    """
+
+    def __init__(self, coords):
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.size = len(coords)
+        self.indexed = np.flatnonzero(~np.isnan(coords).any(axis=1))
+        self.tree = cKDTree(project_km(coords[self.indexed])) if len(self.indexed) else None
+
+    def within(self, points, radius_km):
+        """Sorted indices of every point within `radius_km` of any of `points` (lat, lon)."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        points = points[~np.isnan(points).any(axis=1)]
+        if self.tree is None or not len(points):
+            return np.empty(0, dtype=np.int64)
+        hits = self.tree.query_ball_point(project_km(points), r=radius_km)
+        found = np.unique(np.fromiter((i for h in hits for i in h), dtype=np.int64))
+        return self.indexed[found]
+
+    def nearest(self, point, k=1):
+        """(indices, distances in km) of the k points closest to `point`."""
+        if self.tree is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        k = min(k, len(self.indexed))
+        distances, found = self.tree.query(project_km(point)[0], k=k)
+        return self.indexed[np.atleast_1d(found)], np.atleast_1d(distances)
+
+
+class GeoIndex:
+    """Locations and POIs of a CompactModel placed on the gazetteer, with proximity queries.
+
+    A POI sits at its zone; if the zone is unknown, at the centroid of its
+    nearby routes.
+    """
+
+    def __init__(self, model, gazetteer=None):
+        self.model = model
+        self.gazetteer = gazetteer if gazetteer is not None else Gazetteer.load()
+        self.location_coords = self.gazetteer.coords_for_catalog(model.catalog)
+        self.locations = ProximityIndex(self.location_coords)
+
+        self.poi_coords = np.full((model.n_pois, 2), np.nan)
+        for poi_idx in range(model.n_pois):
+            zone = model.poi_zone[poi_idx]
+            routes = self.coords(model.poi_routes.row(poi_idx))
+            if zone >= 0 and not np.isnan(self.location_coords[zone]).any():
+                self.poi_coords[poi_idx] = self.location_coords[zone]
+            elif len(routes):
+                self.poi_coords[poi_idx] = routes.mean(axis=0)
+        self.pois = ProximityIndex(self.poi_coords)
+
+    def coords(self, location_ids):
+        """Coordinates of the located ones among `location_ids` (m, 2)."""
+        ids = np.asarray([i for i in location_ids if 0 <= i < len(self.location_coords)], dtype=np.int64)
+        coords = self.location_coords[ids]
+        return coords[~np.isnan(coords).any(axis=1)]
+
+    def locations_near(self, location_ids, radius_km):
+        """Location IDs within `radius_km` of any of `location_ids` (the located ones)."""
+        return self.locations.within(self.coords(location_ids), radius_km)
+
+    def pois_near(self, location_ids, radius_km):
+        """POI indices within `radius_km` of any of `location_ids`, e.g. an accident or a user's route."""
+        return self.pois.within(self.coords(location_ids), radius_km)
+
+    def coverage(self):
+        return {
+            'locations': int(len(self.locations.indexed)),
+            'total_locations': int(len(self.location_coords)),
+            'pois': int(len(self.pois.indexed)),
+            'total_pois': int(self.model.n_pois),
+        }
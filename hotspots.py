@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+
+from ETL.location_catalog import parse_location_ids
+
+
+class _BucketRing:
+    """Per-row ring buffers of `n_buckets` slots (index bucket % n_buckets) with running window totals.
+
+    A row is rolled forward only when it is read or written: the buckets that
+    left each window since its last update are subtracted from the totals and
+    their slots cleared, one vectorized step for any number of rows.
+    """
+
+    def __init__(self, windows, n_buckets, capacity=256):
+        self.windows = windows
+        self.n_buckets = n_buckets
+        self.counts = np.zeros((capacity, n_buckets), dtype=np.int32)
+        self.severity = np.zeros((capacity, n_buckets), dtype=np.float64)
+        self.window_counts = {w: np.zeros(capacity, dtype=np.int64) for w in windows}
+        self.window_severity = {w: np.zeros(capacity, dtype=np.float64) for w in windows}
+        self.row_bucket = np.zeros(capacity, dtype=np.int64)  # último bucket al que se llevó cada fila
+
+    def _ensure_capacity(self, row):
+        capacity = len(self.counts)
+        if row < capacity:
+            return
+        grow = max(capacity * 2, row + 1) - capacity
+        self.counts = np.vstack([self.counts, np.zeros((grow, self.n_buckets), dtype=np.int32)])
+        self.severity = np.vstack([self.severity, np.zeros((grow, self.n_buckets))])
+        self.row_bucket = np.concatenate([self.row_bucket, np.zeros(grow, dtype=np.int64)])
+        for w in self.windows:
+            self.window_counts[w] = np.concatenate([self.window_counts[w], np.zeros(grow, dtype=np.int64)])
+            self.window_severity[w] = np.concatenate([self.window_severity[w], np.zeros(grow)])
+
+    def roll(self, rows, current_bucket):
+        """Expire, for each row, the buckets between its last update and `current_bucket`."""
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = rows[rows < len(self.counts)]
+        elapsed = current_bucket - self.row_bucket[rows]
+        rows, elapsed = rows[elapsed > 0], elapsed[elapsed > 0]
+        if not len(rows):
+            return
+        last = self.row_bucket[rows][:, None]
+        slots = np.arange(self.n_buckets)[None, :]
+        expired = elapsed >= self.n_buckets  # todo el buffer quedó fuera de la ventana más larga
+        span = np.minimum(elapsed, self.n_buckets)[:, None]
+        counts, severity = self.counts[rows], self.severity[rows]
+        for w, size in self.windows.items():
+            # Salen de esta ventana los buckets (last - size, min(last, current - size)]
+            leaving = (slots + size - last - 1) % self.n_buckets < np.minimum(span, size)
+            left_counts = np.where(expired, self.window_counts[w][rows], (counts * leaving).sum(axis=1))
+            left_severity = np.where(expired, self.window_severity[w][rows], (severity * leaving).sum(axis=1))
+            self.window_counts[w][rows] -= left_counts
+            remaining = self.window_severity[w][rows] - left_severity
+            self.window_severity[w][rows] = np.where(self.window_counts[w][rows] > 0, remaining, 0.0)
+        reused = (slots - last - 1) % self.n_buckets < span  # slots de los buckets (last, current]
+        self.counts[rows] = np.where(reused, 0, counts)
+        self.severity[rows] = np.where(reused, 0.0, severity)
+        self.row_bucket[rows] = current_bucket
+
+    def add(self, row, bucket, current_bucket, severity=0.0):
+        """Count one event `current_bucket - bucket` buckets old (must be < n_buckets)."""
+        self._ensure_capacity(row)
+        self.roll([row], current_bucket)
+        slot = bucket % self.n_buckets
+        self.counts[row, slot] += 1
+        self.severity[row, slot] += severity
+        age = current_bucket - bucket
+        for w, size in self.windows.items():
+            if age < size:
+                self.window_counts[w][row] += 1
+                self.window_severity[w][row] += severity
+
+
+class HotspotEngine:
+    """Sliding-window accident counts and severity sums per canonical location.
+
+    Every location keeps a ring buffer of per-bucket counts (one bucket per
+    `bucket_seconds`) plus a running total per window, so adding an event is
+    O(1) per location and moving the clock forward is O(1); a location's old
+    buckets are subtracted when it is next read or written.
+
+    An accident that names several locations must count once in `load`: a
+    second set of rings keeps one row per distinct location set, and `load`
+    sums the rows of the sets that touch the queried locations.
+    """
+
+    def __init__(self, windows_minutes=(15, 60), bucket_seconds=60, capacity=256):
+        self.bucket_seconds = bucket_seconds
+        self.windows = {w: max(1, int(w * 60 // bucket_seconds)) for w in windows_minutes}
+        self.n_buckets = max(self.windows.values())
+        self.locations = _BucketRing(self.windows, self.n_buckets, capacity)
+        self.groups = _BucketRing(self.windows, self.n_buckets, capacity)
+        self.group_index = {}  # tupla de location_ids -> fila en groups
+        self.groups_by_location = {}  # location_id -> filas de groups que la incluyen
+        self.active = set()  # ubicaciones con eventos en la ventana más larga
+        self.current_bucket = None
+        self.events = 0
+        self.dropped = 0
+
+    def _bucket(self, timestamp):
+        return int(pd.Timestamp(timestamp).timestamp() // self.bucket_seconds)
+
+    def advance(self, timestamp):
+        """Move the clock forward; each location expires its old buckets when next touched."""
+        bucket = self._bucket(timestamp)
+        if self.current_bucket is None or bucket > self.current_bucket:
+            self.current_bucket = bucket
+
+    def _group(self, location_ids):
+        group = self.group_index.get(location_ids)
+        if group is None:
+            group = self.group_index[location_ids] = len(self.group_index)
+            for location_id in location_ids:
+                self.groups_by_location.setdefault(location_id, []).append(group)
+        return group
+
+    def add(self, timestamp, location_ids, severity=0.0):
+        """Record one accident at one or more canonical locations."""
+        self.advance(timestamp)
+        bucket = self._bucket(timestamp)
+        if self.current_bucket - bucket >= self.n_buckets:
+            self.dropped += 1
+            return
+        location_ids = tuple(sorted({int(i) for i in location_ids if i >= 0}))
+        for location_id in location_ids:
+            self.locations.add(location_id, bucket, self.current_bucket, severity)
+            self.active.add(location_id)
+        if location_ids:
+            self.groups.add(self._group(location_ids), bucket, self.current_bucket, severity)
+        self.events += 1
+
+    def load(self, location_ids, window_minutes=60):
+        """Distinct accidents in a window at any of the given locations."""
+        if self.current_bucket is None:
+            return 0
+        groups = sorted({g for i in location_ids for g in self.groups_by_location.get(i, ())})
+        if not groups:
+            return 0
+        self.groups.roll(groups, self.current_bucket)
+        return int(self.groups.window_counts[window_minutes][groups].sum())
+
+    def top(self, window_minutes=15, n=10, by="count"):
+        """Top-n hottest locations in a window: list of (location_id, count, severity_sum)."""
+        if self.current_bucket is None or not self.active or n < 1:
+            return []
+        active = np.fromiter(self.active, dtype=np.int64, count=len(self.active))
+        self.locations.roll(active, self.current_bucket)
+        longest = max(self.windows, key=self.windows.get)
+        self.active = set(active[self.locations.window_counts[longest][active] > 0].tolist())
+
+        counts = self.locations.window_counts[window_minutes][active]
+        severity = self.locations.window_severity[window_minutes][active]
+        present = counts > 0
+        active, counts, severity = active[present], counts[present], severity[present]
+        if len(active) == 0:
+            return []
+        score = counts if by == "count" else severity
+        # Orden total (puntuación, luego location_id): los empates en el corte no dependen de argpartition
+        order = np.lexsort((active, -score))[:n]
+        return [(int(active[i]), int(counts[i]), float(severity[i])) for i in order]
+
+
+def feed_accidents(engine, accidents):
+    """Replay enriched accidents (timestamp, location_ids, severity_score) into the engine."""
+    if "location_ids" not in accidents.columns:
+        return engine
+    timestamps = pd.to_datetime(accidents["timestamp"], errors="coerce")
+    order = timestamps.sort_values(kind="stable").dropna().index
+    for idx in order:
+        location_ids = parse_location_ids(accidents.at[idx, "location_ids"])
+        if location_ids:
+            engine.add(timestamps[idx], location_ids, float(accidents.at[idx, "severity_score"]))
+    return engine
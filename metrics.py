@@ -0,0 +1,62 @@
+import threading
+from bisect import bisect_left
+
+# Límites superiores de los buckets en milisegundos (el último es +inf)
+DEFAULT_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram, cheap enough to update on every request."""
+
+    def __init__(self, buckets_ms=None):
+        self.buckets_ms = list(buckets_ms or DEFAULT_BUCKETS_MS)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        """Record one latency measured in seconds."""
+        ms = seconds * 1000.0
+        idx = bisect_left(self.buckets_ms, ms)
+        with self._lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.total_ms += ms
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def reset(self):
+        """Forget all observations."""
+        with self._lock:
+            self.counts = [0] * (len(self.buckets_ms) + 1)
+            self.count = 0
+            self.total_ms = 0.0
+            self.max_ms = 0.0
+
+    def quantile(self, q):
+        """Estimate a quantile (0-1) as the upper bound of the bucket that holds it."""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        acumulado = 0
+        for idx, n in enumerate(self.counts):
+            acumulado += n
+            if acumulado >= target:
+                return self.buckets_ms[idx] if idx < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self):
+        """Return a JSON-serializable view of the histogram."""
+        with self._lock:
+            labels = [f"<={b}ms" for b in self.buckets_ms] + [f">{self.buckets_ms[-1]}ms"]
+            return {
+                'count': self.count,
+                'avg_ms': self.total_ms / self.count if self.count else 0.0,
+                'max_ms': self.max_ms,
+                'p50_ms': self.quantile(0.50),
+                'p95_ms': self.quantile(0.95),
+                'p99_ms': self.quantile(0.99),
+                'buckets': dict(zip(labels, self.counts)),
+            }
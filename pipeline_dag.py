@@ -0,0 +1,273 @@
+"""
+Ejecutor no interactivo del pipeline como grafo de dependencias.
+
+    extract -> nlp -> synthetic -> recommendations / accident_recommendations
+                  \\-> eda
+
+Cada etapa declara sus archivos de entrada, de salida y el código del que
+depende. Tras una ejecución correcta se guarda en .pipeline_state.json el hash
+de entradas y código; si en la siguiente corrida no cambió nada y las salidas
+existen, la etapa se salta. La extracción lee de Instagram, no de archivos del
+repo, así que cuando se incluye (--extract) nunca se considera al día. Una
+etapa falla si lanza una excepción o si su función devuelve False. Las etapas
+independientes (p. ej. EDA y datos sintéticos) corren a la vez en procesos
+separados.
+
+Pensado para cron:
+
+    python pipeline_dag.py                 # todo lo que esté desactualizado
+    python pipeline_dag.py eda --force     # una etapa (y sus dependencias)
+
+Códigos de salida: 0 todo correcto o al día, 1 alguna etapa falló (sus
+dependientes no se ejecutan), 2 argumentos inválidos.
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(ROOT, '.pipeline_state.json')
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+@dataclass
+class Stage:
+    name: str
+    target: str  # "modulo:funcion" llamada sin argumentos
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    code: List[str] = field(default_factory=list)
+    deps: List[str] = field(default_factory=list)
+    cwd: str = '.'
+    source: bool = False  # lee de fuera del repo (Instagram): nunca está "al día"
+
+
+NLP_CODE = ['ETL/analizer_npl.py', 'ETL/text_pipeline.py', 'ETL/dedup.py', 'ETL/location_catalog.py',
+            'ETL/report_partials.py', 'ETL/feature_store.py', 'ETL/incident_classifier.py', 'ETL/accident_store.py',
+            'ETL/ner_memo.py', 'ETL/windowed_ner.py']
+MODEL_CODE = ['compact_model.py', 'ETL/location_catalog.py', 'ETL/feature_store.py']
+SYNTHETIC_DATA = ['ETL/users.csv', 'ETL/accidents.csv', 'ETL/points_of_interest.csv']
+
+STAGES = [
+    Stage('extract', 'ETL.extract_instagram_posts:main',
+          outputs=['ETL/instagram_posts.csv'],
+          code=['ETL/extract_instagram_posts.py', 'ETL/profile_cache.py'], cwd='ETL', source=True),
+    Stage('nlp', 'ETL.analizer_npl:main',
+          inputs=['ETL/instagram_posts.csv'], outputs=['ETL/accidents.csv', 'ETL/accidents.db'],
+          code=NLP_CODE, deps=['extract']),
+    Stage('synthetic', 'ETL.generate_synthetic_data:run',
+          inputs=['ETL/accidents.csv'], outputs=['ETL/users.csv', 'ETL/points_of_interest.csv'],
+          code=['ETL/generate_synthetic_data.py'], deps=['nlp']),
+    Stage('eda', 'EDA_accidents:run',
+          inputs=['ETL/accidents.csv', 'ETL/locations.csv'], outputs=['accidents_eda_report.txt'],
+          code=['EDA_accidents.py', 'accident_cube.py', 'ETL/stream_stats.py', 'ETL/location_catalog.py'],
+          deps=['nlp']),
+    Stage('recommendations', 'recomendation:run',
+          inputs=SYNTHETIC_DATA, code=['recomendation.py', 'semantic_index.py'] + MODEL_CODE,
+          deps=['synthetic']),
+    Stage('accident_recommendations', 'recomendation_by_accidente:run',
+          inputs=SYNTHETIC_DATA,
+          code=['recomendation_by_accidente.py', 'hotspots.py', 'route_graph.py', 'ETL/accident_store.py',
+                'geo_index.py', 'ETL/gazetteer.csv', 'alert_dispatch.py'] + MODEL_CODE,
+          deps=['synthetic']),
+]
+
+# La extracción necesita credenciales de Instagram: sólo corre si se pide explícitamente
+OPT_IN = {'extract'}
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents, or None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stage_fingerprint(stage: Stage, root=ROOT) -> Dict:
+    """Hashes of the stage's inputs and of its code (the code version)."""
+    code = hashlib.sha256()
+    for path in sorted(stage.code):
+        code.update(path.encode())
+        code.update((file_digest(os.path.join(root, path)) or '-').encode())
+    return {
+        'inputs': {path: file_digest(os.path.join(root, path)) for path in stage.inputs},
+        'code': code.hexdigest(),
+    }
+
+
+def load_state(path=STATE_PATH) -> Dict:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, path=STATE_PATH):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def is_up_to_date(stage: Stage, state: Dict, root=ROOT) -> bool:
+    recorded = state.get(stage.name)
+    if recorded is None or stage.source:
+        return False
+    if any(not os.path.exists(os.path.join(root, out)) for out in stage.outputs):
+        return False
+    current = stage_fingerprint(stage, root)
+    return recorded.get('inputs') == current['inputs'] and recorded.get('code') == current['code']
+
+
+def _run_stage(target, cwd):
+    """Worker entry point: import "module:function" and call it from `cwd`.
+
+    Stage functions signal failure by raising or by returning False.
+    """
+    os.chdir(cwd)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    module_name, func_name = target.split(':')
+    return getattr(importlib.import_module(module_name), func_name)()
+
+
+class PipelineRunner:
+    """Run the stages needed for `targets` in dependency order, skipping up-to-date ones."""
+
+    def __init__(self, stages=STAGES, root=ROOT, state_path=STATE_PATH, jobs=2, force=False):
+        self.stages = {s.name: s for s in stages}
+        self.root = root
+        self.state_path = state_path
+        self.jobs = jobs
+        self.force = force
+        self.state = load_state(state_path)
+
+    def plan(self, targets: Optional[List[str]] = None, include=()) -> List[str]:
+        """Stage names needed for `targets` (with their dependencies), in topological order."""
+        targets = list(targets or [n for n in self.stages if n not in OPT_IN])
+        wanted = set(targets) | set(include)
+        order, visiting = [], set()
+
+        def visit(name):
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Ciclo en el grafo de etapas: {name}")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                # Las dependencias opt-in sólo entran si se pidieron
+                if dep not in OPT_IN or dep in wanted:
+                    visit(dep)
+            visiting.discard(name)
+            order.append(name)
+
+        for name in targets + list(include):
+            if name not in self.stages:
+                raise KeyError(name)
+            visit(name)
+        return order
+
+    def run(self, targets=None, include=(), dry_run=False) -> Tuple[int, Dict[str, str]]:
+        """Execute the plan; returns (exit code, stage -> status)."""
+        order = self.plan(targets, include)
+        status: Dict[str, str] = {}
+        rerun = set()  # etapas ejecutadas en esta corrida: sus dependientes se reevalúan al terminar
+        pending = list(order)
+        running = {}
+
+        with ProcessPoolExecutor(max_workers=max(1, self.jobs)) as executor:
+            while pending or running:
+                for name in list(pending):
+                    stage = self.stages[name]
+                    deps = [d for d in stage.deps if d in order]
+                    if any(status.get(d) in ('failed', 'blocked') for d in deps):
+                        status[name] = 'blocked'
+                        pending.remove(name)
+                        print(f"⛔ {name}: bloqueada por una dependencia fallida")
+                        continue
+                    if any(d not in status for d in deps):
+                        continue
+                    pending.remove(name)
+                    if not self.force and not rerun.intersection(deps) and is_up_to_date(stage, self.state, self.root):
+                        status[name] = 'up-to-date'
+                        print(f"⏩ {name}: al día")
+                    elif dry_run:
+                        status[name] = 'would-run'
+                        rerun.add(name)
+                        print(f"📝 {name}: se ejecutaría")
+                    else:
+                        print(f"▶️ {name}: ejecutando...")
+                        future = executor.submit(_run_stage, stage.target, os.path.join(self.root, stage.cwd))
+                        running[future] = (name, time.time())
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, started = running.pop(future)
+                    status[name] = self._finish(self.stages[name], future, time.time() - started)
+                    if status[name] == 'done':
+                        rerun.add(name)
+
+        if not dry_run:
+            save_state(self.state, self.state_path)
+        failed = [n for n, s in status.items() if s in ('failed', 'blocked')]
+        return (EXIT_FAILED if failed else EXIT_OK), status
+
+    def _finish(self, stage: Stage, future, elapsed) -> str:
+        try:
+            result = future.result()
+        except BaseException as e:  # SystemExit incluido: la etapa no debe tumbar el runner
+            print(f"❌ {stage.name}: falló tras {elapsed:.1f}s: {e!r}")
+            return 'failed'
+        if result is False:
+            print(f"❌ {stage.name}: terminó con error tras {elapsed:.1f}s")
+            return 'failed'
+        missing = [out for out in stage.outputs if not os.path.exists(os.path.join(self.root, out))]
+        if missing:
+            print(f"❌ {stage.name}: terminó sin generar {', '.join(missing)}")
+            return 'failed'
+        self.state[stage.name] = dict(stage_fingerprint(stage, self.root), finished_at=time.time())
+        print(f"✅ {stage.name}: completada en {elapsed:.1f}s")
+        return 'done'
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Ejecuta las etapas desactualizadas del pipeline (sin menú)")
+    parser.add_argument("targets", nargs="*", help=f"etapas a ejecutar (por defecto todas salvo {', '.join(sorted(OPT_IN))})")
+    parser.add_argument("--extract", action="store_true", help="incluir la extracción de Instagram (requiere sesión)")
+    parser.add_argument("--force", action="store_true", help="ejecutar aunque entradas y código no hayan cambiado")
+    parser.add_argument("--jobs", type=int, default=2, help="etapas en paralelo (procesos)")
+    parser.add_argument("--dry-run", action="store_true", help="mostrar qué se ejecutaría sin ejecutarlo")
+    args = parser.parse_args(argv)
+
+    runner = PipelineRunner(jobs=args.jobs, force=args.force)
+    try:
+        code, status = runner.run(args.targets or None, include=['extract'] if args.extract else (),
+                                  dry_run=args.dry_run)
+    except KeyError as e:
+        print(f"❌ Etapa desconocida: {e.args[0]} (disponibles: {', '.join(runner.stages)})")
+        return EXIT_USAGE
+
+    print("\n📋 Resumen: " + ", ".join(f"{name}={s}" for name, s in status.items()))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,72 +1,76 @@
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import ast
+import numpy as np
 import random
-import os
+import argparse
+
+from artifact_catalog import load_datasets
+from compact_model import CompactModel
+from semantic_index import SemanticIndex, SentenceEncoder
+from ETL.feature_store import FeatureStore
+from ETL.location_catalog import load_catalog
 
 # === FUNCIONES AUXILIARES ===
-def parse_list(x):
+def cargar_datos(data_dir="ETL"):
+    """Load users, accidents and points of interest with list columns parsed."""
+    return load_datasets(data_dir)
+
+def cargar_indice_semantico(model, store=None):
+    """SemanticIndex for the embedding mode, or None if transformers is not installed."""
     try:
-        return ast.literal_eval(x)
-    except:
-        return []
+        return SemanticIndex(model, SentenceEncoder(), store)
+    except ImportError as e:
+        print(f"⚠️ Modo semántico no disponible ({e}). Usando TF-IDF")
+        return None
 
-def recomendar_para_usuario(user_id, users, points):
-    # Encontrar usuario
-    user = users[users["user_id"] == user_id]
-    if user.empty:
-        return f"❌ Usuario {user_id} no encontrado."
-    
-    user = user.iloc[0]
-    intereses_usuario = user["interests"]
-    zonas_usuario = user["frequent_routes"]
-    
-    # Crear corpus de texto para TF-IDF
-    user_text = " ".join(intereses_usuario)
-    poi_texts = []
-    
-    for _, poi in points.iterrows():
-        poi_text = " ".join(poi["related_interests"]) + " " + poi["type"].lower()
-        poi_texts.append(poi_text)
+def rankear_pois(model, user_idx, k=3, index=None, abiertos=None):
+    """Return the top-k (poi_idx, similarity) pairs for a user of the compact model.
+
+    With a SemanticIndex the similarity is the embedding cosine instead of TF-IDF.
+    `abiertos` (model.open_mask()) keeps only POIs open at that time.
+    """
+    if index is not None:
+        similarities = index.scores(user_idx)
+    else:
+        # Calcular similitudes (TF-IDF sobre códigos de intereses, ajustado una sola vez)
+        similarities = (model.poi_matrix @ model.user_vector(user_idx).T).toarray().ravel()
     
-    # Aplicar TF-IDF
-    vectorizer = TfidfVectorizer(stop_words=None)
+    # Ordenar POIs por similitud
+    orden = np.argsort(-similarities, kind="stable")
     
-    # Crear matriz con texto del usuario + textos de POIs
-    all_texts = [user_text] + poi_texts
-    tfidf_matrix = vectorizer.fit_transform(all_texts)
+    # Descartar POIs cerrados (si todos están cerrados, no se filtra)
+    if abiertos is not None and abiertos.any():
+        orden = orden[abiertos[orden]]
     
-    # Calcular similitudes
-    similarities = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:]).flatten()
+    # Filtrar por zonas: intersección de códigos de rutas del usuario y del POI
+    zonas_usuario = model.location_mask(model.user_routes.row(user_idx))
+    en_zona = model.poi_routes.rows_with_any(zonas_usuario)
+    filtered_pois = orden[en_zona[orden]]
     
-    # Ordenar POIs por similitud
-    poi_similarities = list(zip(points.index, similarities))
-    poi_similarities.sort(key=lambda x: x[1], reverse=True)
+    # Si no hay POIs en las zonas del usuario, usar todos
+    if len(filtered_pois) == 0:
+        filtered_pois = orden
     
-    # Filtrar por zonas si es posible
-    filtered_pois = []
-    for poi_idx, similarity in poi_similarities:
-        poi = points.iloc[poi_idx]
-        poi_routes = poi["nearby_routes"]
-        
-        # Verificar si hay intersección entre rutas del usuario y del POI
-        if any(route in zonas_usuario for route in poi_routes):
-            filtered_pois.append((poi_idx, similarity))
+    return [(int(i), float(similarities[i])) for i in filtered_pois[:k]]
+
+def recomendar_para_usuario(user_id, model, index=None, momento=None):
+    """Recommendation message for a user, with POIs open at `momento` (default: now)."""
+    # Encontrar usuario
+    user_idx = model.user_index.get(user_id)
+    if user_idx is None:
+        return f"❌ Usuario {user_id} no encontrado."
     
-    # Si no hay POIs en las zonas del usuario, usar todos
-    if not filtered_pois:
-        filtered_pois = poi_similarities
+    user = model.user(user_idx)
+    intereses_usuario = user["interests"]
+    zonas_usuario = user["frequent_routes"]
     
     # Tomar los top 3
-    top_pois = filtered_pois[:3]
+    top_pois = rankear_pois(model, user_idx, k=3, index=index, abiertos=model.open_mask(momento))
     
     mensaje = f"\n🎯 RECOMENDACIONES PARA {user['name']} (ID: {user_id})\n"
     mensaje += f"📍 Zonas frecuentes: {zonas_usuario}\n"
     mensaje += f"🎨 Intereses: {intereses_usuario}\n\n"
     
     for i, (poi_idx, similarity) in enumerate(top_pois, 1):
-        poi = points.iloc[poi_idx]
+        poi = model.poi(poi_idx)
         mensaje += f"{i}. 🏪 **{poi['name']}** ({poi['type']})\n"
         mensaje += f"   📍 Ubicación: {poi['zone']}\n"
         mensaje += f"   🎯 Similitud: {similarity:.3f}\n"
@@ -76,28 +80,20 @@ def recomendar_para_usuario(user_id, users, points):
     
     return mensaje
 
-def run():
-    """Main function to run the recommendation system."""
+def run(mode="tfidf", data=None):
+    """Main function to run the recommendation system (mode: 'tfidf' or 'embedding').
+
+    `data` is an already loaded (users, accidents, points) tuple, e.g. from an ArtifactCatalog.
+    """
     print("\n" + "=" * 80)
     print("🚀 SISTEMA DE RECOMENDACIONES PERSONALIZADO")
     print("=" * 80)
     
     # === CARGAR DATOS ===
-    users_path = os.path.join("ETL", "users.csv")
-    accidents_path = os.path.join("ETL", "accidents.csv")
-    points_path = os.path.join("ETL", "points_of_interest.csv")
-    
-    users = pd.read_csv(users_path)
-    accidents = pd.read_csv(accidents_path)
-    points = pd.read_csv(points_path)
-
-    # === LIMPIEZA Y PARSEO DE LISTAS ===
-    for df, cols in [
-        (users, ["interests", "frequent_routes"]),
-        (points, ["related_interests", "nearby_routes"]),
-    ]:
-        for c in cols:
-            df[c] = df[c].apply(parse_list)
+    users, accidents, points = data if data is not None else cargar_datos()
+    store = FeatureStore()
+    model = CompactModel(users, points, load_catalog(), store)
+    index = cargar_indice_semantico(model, store) if mode == "embedding" else None
 
     # === EJEMPLO DE USO CON USUARIOS ALEATORIOS ===
     # Seleccionar 3 usuarios aleatorios
@@ -108,7 +104,7 @@ def run():
     
     for uid in ejemplo_usuarios:
         print("\n" + "="*60)
-        resultado = recomendar_para_usuario(uid, users, points)
+        resultado = recomendar_para_usuario(uid, model, index)
         print(resultado)
     
     print("\n" + "=" * 80)
@@ -120,4 +116,7 @@ def main():
     run()
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Sistema de recomendaciones personalizado")
+    parser.add_argument("--mode", choices=["tfidf", "embedding"], default="tfidf",
+                        help="Puntuación por TF-IDF de intereses o por embeddings de oraciones")
+    run(parser.parse_args().mode)
\ No newline at end of file
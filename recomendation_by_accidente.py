@@ -1,27 +1,165 @@
 import pandas as pd
-import ast
+import numpy as np
 import random
 import os
 
+from alert_dispatch import dispatch_alerts
+from artifact_catalog import load_datasets
+from compact_model import CompactModel
+from geo_index import GAZETTEER_PATH, GeoIndex
+from hotspots import HotspotEngine, feed_accidents
+from route_graph import build_route_graph
+from ETL.accident_store import STORE_PATH, AccidentStore
+from ETL.feature_store import FeatureStore
+from ETL.location_catalog import load_catalog, parse_location_ids, split_locations
+
 # === FUNCIONES AUXILIARES ===
-def parse_list(x):
-    try:
-        return ast.literal_eval(x)
-    except:
-        return []
+def clasificar_severidad(severidad):
+    """Map a severity score to the label used in alert messages."""
+    return "incidente grave" if severidad > 0.7 else "incidente moderado" if severidad > 0.3 else "incidente leve"
+
+def ids_de_accidente(accidente, catalog):
+    """Canonical location IDs of an accident record (dict or row)."""
+    location_ids = parse_location_ids(accidente.get("location_ids"))
+    if location_ids:
+        return location_ids
+    return catalog.ids_for(split_locations(accidente.get("extracted_locations")), create=False)
+
+def buscar_usuarios_afectados(model, location_ids):
+    """Return the indices of users whose frequent routes include an accident location ID."""
+    # Cruce exacto por ID canónico: una máscara sobre el catálogo y una reducción CSR
+    rutas_en_accidente = model.location_mask(location_ids)
+    return np.flatnonzero(model.user_routes.rows_with_any(rutas_en_accidente))
+
+def buscar_usuarios_cercanos(model, geo, location_ids, radio_km):
+    """Users whose frequent routes pass within `radio_km` of the accident (KD-tree over the gazetteer)."""
+    cercanas = np.union1d(geo.locations_near(location_ids, radio_km), np.asarray(location_ids, dtype=np.int64))
+    return np.flatnonzero(model.user_routes.rows_with_any(model.location_mask(cercanas))), cercanas
+
+def seleccionar_poi_alternativo(model, user_idx, verbose=True, geo=None, radio_km=2.0, abiertos=None):
+    """Pick an alternative POI index in the user's zones, preferring shared interests.
+
+    With a GeoIndex the candidates are the POIs within `radio_km` of the user's
+    zones instead of those whose zone name matches exactly. `abiertos`
+    (model.open_mask()) leaves out closed POIs unless every POI is closed.
+    """
+    zonas = [model.residential_zone[user_idx], model.work_zone[user_idx]]
+    
+    if verbose:
+        user = model.user(user_idx)
+        print(f"🔍 Buscando POI para zonas: {user['residential_zone']}, {user['work_zone']}")
+        print(f"🎯 Intereses del usuario: {user['interests']}")
+    
+    # Buscar POI en zonas del usuario (o a menos de radio_km de ellas) con intereses similares
+    en_zona = np.isin(model.poi_zone, zonas)
+    if geo is not None:
+        en_zona[geo.pois_near(zonas, radio_km)] = True
+    disponibles = abiertos if abiertos is not None and abiertos.any() else np.ones(model.n_pois, dtype=bool)
+    en_zona &= disponibles
+    intereses = model.interest_mask(model.user_interests.row(user_idx))
+    poi_candidates = np.flatnonzero(en_zona & model.poi_interests.rows_with_any(intereses))
+    
+    if verbose:
+        print(f"📍 POIs con intereses similares encontrados: {len(poi_candidates)}")
+    
+    if len(poi_candidates) == 0:
+        # Si no hay POI con intereses similares, buscar cualquier POI en las zonas
+        poi_candidates = np.flatnonzero(en_zona)
+        if verbose:
+            print(f"📍 POIs en zonas del usuario (sin filtro de intereses): {len(poi_candidates)}")
+        
+    if len(poi_candidates) == 0:
+        # Como último recurso, seleccionar cualquier POI (abierto)
+        poi_idx = int(random.choice(np.flatnonzero(disponibles)))
+        if verbose:
+            print("⚠️ Usando POI aleatorio (último recurso)")
+    else:
+        poi_idx = int(random.choice(poi_candidates))
+        if verbose:
+            poi = model.poi(poi_idx)
+            print(f"✅ POI seleccionado: {poi['name']} - Intereses: {poi['related_interests']}")
+    
+    return poi_idx
+
+def sugerir_desvio(model, detours, user_idx):
+    """Detour from the user's residential zone to the work zone around the incident (names)."""
+    path = detours.path(int(model.residential_zone[user_idx]), int(model.work_zone[user_idx]))
+    return model.location_names(path) if len(path) > 1 else []
+
+def construir_alerta(accidente, model, user_idx, verbose=True, carga=0, vecinos=(), desvio=(), geo=None, radio_km=2.0,
+                     abiertos=None):
+    """Build the alert message for one affected user; returns (mensaje, poi).
+
+    `carga` is the number of recent reports at the accident's locations (hotspot load),
+    `vecinos` the neighboring segments likely to congest and `desvio` an alternative route;
+    `geo`/`radio_km` switch POI candidates to proximity and `abiertos` drops closed POIs
+    (see seleccionar_poi_alternativo).
+    """
+    ubicacion_accidente = accidente["extracted_locations"]
+    tipo_severidad = clasificar_severidad(accidente["severity_score"])
+    mensaje = f"🚧 ALERTA: Se reporta un {tipo_severidad} en {ubicacion_accidente}. "
+    mensaje += "Se recomienda evitar esta ruta.\n"
+    if carga > 1:
+        mensaje += f"🔥 Zona caliente: {carga} reportes en la última hora.\n"
+    if vecinos:
+        mensaje += f"⚠️ Posible congestión en: {', '.join(vecinos)}.\n"
+    if desvio:
+        mensaje += f"🛣️ Ruta alternativa: {' → '.join(desvio)}.\n"
+    
+    # Buscar POI alternativo basado en intereses y zonas del usuario
+    poi = model.poi(seleccionar_poi_alternativo(model, user_idx, verbose=verbose, geo=geo, radio_km=radio_km,
+                                                abiertos=abiertos))
+    
+    mensaje += f"🧭 Te sugerimos visitar **{poi['name']}** ({poi['type']}) en {poi['zone']}. "
+    mensaje += f"💡 Oferta actual: {poi['current_offer']}."
+    
+    return mensaje, poi
+
+def mostrar_hotspots(hotspots, catalog, n=5):
+    """Print the hottest locations in every hotspot window."""
+    for window in sorted(hotspots.windows):
+        top = hotspots.top(window_minutes=window, n=n)
+        print(f"🔥 Zonas calientes (últimos {window} min):")
+        if not top:
+            print("   Sin reportes recientes")
+        for location_id, count, severity_sum in top:
+            print(f"   - {catalog.name(location_id)}: {count} reportes (severidad acumulada {severity_sum:.2f})")
+    print("\n" + "="*80)
 
 # === FUNCIÓN PARA RECOMENDAR POR ACCIDENTE ===
-def recomendar_por_accidente(users, accidents, points):
-    # 1️⃣ Seleccionar un accidente aleatorio con ubicación válida
-    accidentes_validos = accidents[
-        accidents["extracted_locations"].notna() & 
-        accidents["extracted_locations"].apply(lambda x: isinstance(x, str) and len(x.strip()) > 0)
-    ]
+def recomendar_por_accidente(model, accidents, hotspots=None, graph=None, store=None, geo=None, radio_km=2.0,
+                             alertas=None):
+    """Alert the users affected by one accident.
+
+    By default users are matched by exact location ID on their frequent routes;
+    with a GeoIndex (`geo`) candidates are every user whose routes, and every
+    POI, lie within `radio_km` of the accident. With an `alertas` list each
+    alert is also appended to it as a dict, for alert_dispatch to deliver.
+    The accident is chosen from `accidents`; pass accidents=None to choose from
+    `store` instead. Otherwise the store only answers the previous-hour count.
+    """
+    # 1️⃣ Seleccionar un accidente con ubicación válida (el de mayor carga actual si hay hotspots)
+    if accidents is None:
+        accidentes_validos = store.query(with_locations=True)
+    else:
+        accidentes_validos = accidents[
+            accidents["extracted_locations"].notna() & 
+            accidents["extracted_locations"].apply(lambda x: isinstance(x, str) and len(x.strip()) > 0)
+        ]
     
     if accidentes_validos.empty:
         return "No hay accidentes con ubicaciones válidas disponibles."
     
-    accidente_seleccionado = accidentes_validos.sample(1).iloc[0]
+    if hotspots is not None:
+        mostrar_hotspots(hotspots, model.catalog)
+        cargas = accidentes_validos.apply(
+            lambda a: hotspots.load(ids_de_accidente(a, model.catalog), window_minutes=60), axis=1
+        )
+        accidente_seleccionado = accidentes_validos.loc[cargas.idxmax()]
+        carga = int(cargas.max())
+    else:
+        accidente_seleccionado = accidentes_validos.sample(1).iloc[0]
+        carga = 0
     ubicacion_accidente = accidente_seleccionado["extracted_locations"]
     
     print(f"🚨 ACCIDENTE SELECCIONADO:")
@@ -31,102 +169,99 @@ def recomendar_por_accidente(users, accidents, points):
     print("\n" + "="*80)
     
     # 2️⃣ Encontrar usuarios afectados por sus rutas frecuentes
-    usuarios_afectados = []
-    
-    for _, user in users.iterrows():
-        rutas_usuario = user["frequent_routes"]
-        if isinstance(rutas_usuario, list):
-            # Verificar si alguna ruta del usuario está relacionada con la ubicación del accidente
-            for ruta in rutas_usuario:
-                if isinstance(ruta, str) and ruta.lower() in ubicacion_accidente.lower():
-                    usuarios_afectados.append(user)
-                    break
-    
-    if not usuarios_afectados:
+    location_ids = ids_de_accidente(accidente_seleccionado, model.catalog)
+    if store is not None and pd.notna(accidente_seleccionado.get("timestamp")):
+        momento = pd.Timestamp(accidente_seleccionado["timestamp"])
+        recientes = store.count(location_ids, since=momento - pd.Timedelta(hours=1), until=momento)
+        print(f"🗂️ Reportes en la misma ubicación en la hora previa: {recientes}")
+    if geo is not None and len(geo.coords(location_ids)):
+        usuarios_afectados, cercanas = buscar_usuarios_cercanos(model, geo, location_ids, radio_km)
+        print(f"📡 Modo proximidad: {len(cercanas)} ubicaciones a menos de {radio_km:g} km del accidente")
+    else:
+        if geo is not None:
+            print("📡 Ubicación del accidente fuera del gazetteer: se usa la coincidencia por zona")
+            geo = None
+        usuarios_afectados = buscar_usuarios_afectados(model, location_ids)
+    vecinos, detours = [], None
+    if graph is not None:
+        vecinos = model.location_names(graph.affected(location_ids, limit=5))
+        detours = graph.detours(location_ids)
+        if vecinos:
+            print(f"🕸️ Segmentos vecinos afectados: {', '.join(vecinos)}")
+    
+    if len(usuarios_afectados) == 0:
         print("❌ No se encontraron usuarios afectados por este accidente.")
         return
     
     print(f"👥 USUARIOS AFECTADOS: {len(usuarios_afectados)}")
+    momento = accidente_seleccionado.get("timestamp")
+    abiertos = model.open_mask(momento if pd.notna(momento) else None)
+    print(f"🕒 POIs abiertos a la hora del accidente: {int(abiertos.sum())}/{model.n_pois}")
     print("\n" + "="*80)
     
     # 3️⃣ Generar recomendaciones para cada usuario afectado
-    for user in usuarios_afectados:
+    for user_idx in usuarios_afectados:
+        user = model.user(user_idx)
         print(f"\n🔔 Recomendación para usuario: {user['user_id']}")
         print(f"Nombre: {user['name']}")
         print(f"Zona Residencial: {user['residential_zone']}")
         print(f"Zona de Trabajo: {user['work_zone']}")
         print(f"Interes: {user['interests']} - Rutas: {user['frequent_routes']} \n\n")
 
-        severidad = accidente_seleccionado['severity_score']
-        tipo_severidad = "incidente grave" if severidad > 0.7 else "incidente moderado" if severidad > 0.3 else "incidente leve"
-        mensaje = f"🚧 ALERTA: Se reporta un {tipo_severidad} en {ubicacion_accidente}. "
-        mensaje += "Se recomienda evitar esta ruta.\n"
-        
-        # Buscar POI alternativo basado en intereses y zonas del usuario
-        zona_residencia = user["residential_zone"]
-        zona_trabajo = user["work_zone"]
-        intereses = user["interests"]
-        
-        print(f"🔍 Buscando POI para zonas: {zona_residencia}, {zona_trabajo}")
-        print(f"🎯 Intereses del usuario: {intereses}")
-        
-        # Buscar POI en zonas del usuario con intereses similares
-        def has_matching_interests(poi_interests):
-            if not isinstance(poi_interests, list) or not isinstance(intereses, list):
-                return False
-            return any(i in poi_interests for i in intereses)
-        
-        poi_candidates = points[
-            (points["zone"].isin([zona_trabajo, zona_residencia])) &
-            (points["related_interests"].apply(has_matching_interests))
-        ]
-        
-        print(f"📍 POIs con intereses similares encontrados: {len(poi_candidates)}")
-        
-        if poi_candidates.empty:
-            # Si no hay POI con intereses similares, buscar cualquier POI en las zonas
-            poi_candidates = points[points["zone"].isin([zona_trabajo, zona_residencia])]
-            print(f"📍 POIs en zonas del usuario (sin filtro de intereses): {len(poi_candidates)}")
-            
-        if poi_candidates.empty:
-            # Como último recurso, seleccionar cualquier POI
-            poi = points.sample(1).iloc[0]
-            print("⚠️ Usando POI aleatorio (último recurso)")
-        else:
-            poi = poi_candidates.sample(1).iloc[0]
-            print(f"✅ POI seleccionado: {poi['name']} - Intereses: {poi['related_interests']}")
-        
-        mensaje += f"🧭 Te sugerimos visitar **{poi['name']}** ({poi['type']}) en {poi['zone']}. "
-        mensaje += f"💡 Oferta actual: {poi['current_offer']}."
+        desvio = sugerir_desvio(model, detours, user_idx) if detours is not None else []
+        mensaje, poi = construir_alerta(accidente_seleccionado, model, user_idx, carga=carga,
+                                        vecinos=vecinos, desvio=desvio, geo=geo, radio_km=radio_km,
+                                        abiertos=abiertos)
+        if alertas is not None:
+            alertas.append({
+                'accident_id': accidente_seleccionado.get("id"),
+                'user_id': user['user_id'],
+                'name': user['name'],
+                'poi_id': poi['poi_id'],
+                'carga': carga,
+                'desvio': desvio,
+                'mensaje': mensaje,
+            })
         
         print(mensaje)
         print("-" * 60)
 
-def run():
-    """Main function to run the accident-based recommendation system."""
+def run(data=None, store=None, radio_km=None, sink=None, dispatch_options=None):
+    """Main function to run the accident-based recommendation system.
+
+    `data` is an already loaded (users, accidents, points) tuple, e.g. from an ArtifactCatalog;
+    `store` an AccidentStore for the previous-hour count (by default ETL/accidents.db when the analyzer created it);
+    `radio_km` enables the proximity mode (offline gazetteer in ETL/gazetteer.csv);
+    `sink` delivers the alerts through alert_dispatch (`dispatch_options` go to AlertDispatcher).
+    """
     print("\n" + "=" * 80)
     print("🚨 SISTEMA DE RECOMENDACIONES BASADO EN ACCIDENTES")
     print("=" * 80)
     
-    # === CARGAR DATOS ===
-    users_path = os.path.join("ETL", "users.csv")
-    accidents_path = os.path.join("ETL", "accidents.csv")
-    points_path = os.path.join("ETL", "points_of_interest.csv")
-    
-    users = pd.read_csv(users_path)
-    accidents = pd.read_csv(accidents_path)
-    points = pd.read_csv(points_path)
-
-    # === LIMPIEZA Y PARSEO DE LISTAS ===
-    for df, cols in [
-        (users, ["interests", "frequent_routes"]),
-        (points, ["related_interests", "nearby_routes"]),
-    ]:
-        for c in cols:
-            df[c] = df[c].apply(parse_list)
+    # === CARGAR DATOS (listas ya parseadas) ===
+    users, accidents, points = data if data is not None else load_datasets()
 
     # === EJECUTAR RECOMENDACIÓN ===
-    recomendar_por_accidente(users, accidents, points)
+    model = CompactModel(users, points, load_catalog(), FeatureStore())
+    hotspots = feed_accidents(HotspotEngine(), accidents)
+    graph = build_route_graph(accidents, model.catalog)
+    if store is None and os.path.exists(STORE_PATH):
+        store = AccidentStore()
+    geo = None
+    if radio_km is not None and os.path.exists(GAZETTEER_PATH):
+        geo = GeoIndex(model)
+        cobertura = geo.coverage()
+        print(f"🗺️ Gazetteer: {cobertura['locations']}/{cobertura['total_locations']} ubicaciones y "
+              f"{cobertura['pois']}/{cobertura['total_pois']} POIs con coordenadas")
+    alertas = [] if sink is not None else None
+    recomendar_por_accidente(model, accidents, hotspots, graph, store, geo=geo,
+                             radio_km=radio_km if radio_km is not None else 2.0, alertas=alertas)
+    if alertas:
+        metricas = dispatch_alerts(alertas, sink, **(dispatch_options or {}))
+        latencia = metricas['delivery_latency']
+        print(f"📨 Alertas entregadas: {metricas['delivered']}/{metricas['submitted']} en {metricas['batches']} lotes "
+              f"({metricas['retries']} reintentos, {metricas['failed']} fallidas), "
+              f"latencia p50 {latencia['p50_ms']}ms / p95 {latencia['p95_ms']}ms")
 
 def main():
     """Alias for run() function."""
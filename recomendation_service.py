@@ -0,0 +1,310 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+
+from metrics import LatencyHistogram
+from compact_model import CompactModel
+from hotspots import HotspotEngine, feed_accidents
+from route_graph import build_route_graph
+from ETL.feature_store import FeatureStore
+from ETL.location_catalog import load_catalog
+from recomendation import cargar_datos, cargar_indice_semantico, rankear_pois
+from recomendation_by_accidente import (buscar_usuarios_afectados, construir_alerta, ids_de_accidente,
+                                        sugerir_desvio)
+
+
+class LRUCache:
+    """Bounded LRU map; clear() is used to invalidate it on data reload."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RecommendationService:
+    """Long-lived recommendation API: loads the CSVs once and answers queries in memory."""
+
+    def __init__(self, data_dir="ETL", cache_size=256, mode="tfidf"):
+        self.data_dir = data_dir
+        self.mode = mode
+        self.cache = LRUCache(cache_size)
+        self.latency = {
+            'recommend': LatencyHistogram(),
+            'alerts_for': LatencyHistogram(),
+        }
+        self._lock = threading.RLock()
+        self.generation = 0  # sube en cada reload(); forma parte de la clave de la caché
+        self.reload()
+
+    def reload(self):
+        """(Re)load users, accidents and POIs and invalidate the cache."""
+        users, accidents, points = cargar_datos(self.data_dir)
+        store = FeatureStore(os.path.join(self.data_dir, ".features"))
+        model = CompactModel(users, points, load_catalog(os.path.join(self.data_dir, "locations.csv")), store)
+        index = cargar_indice_semantico(model, store) if self.mode == "embedding" else None
+        hotspots = feed_accidents(HotspotEngine(), accidents)
+        graph = build_route_graph(accidents, model.catalog)
+        with self._lock:
+            self.model = model
+            self.index = index
+            self.accidents = accidents
+            self.hotspots = hotspots
+            self.graph = graph
+            self.loaded_at = time.time()
+            self.generation += 1
+            self.cache.clear()
+        print(f"✅ Servicio cargado: {model.n_users} usuarios, {model.n_pois} POIs, {len(accidents)} accidentes")
+
+    def recommend(self, user_id, k=3):
+        """Return the top-k POIs for a user as a list of dicts (None if the user doesn't exist)."""
+        inicio = time.perf_counter()
+        try:
+            # El tramo horario entra en la clave: la lista cambia cuando abre o cierra algún POI.
+            # La generación evita que un cálculo en curso durante reload() guarde datos viejos.
+            key = (self.generation, user_id, k, self.model.schedule_phase())
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+            with self._lock:
+                key = (self.generation, user_id, k, self.model.schedule_phase())
+                user_idx = self.model.user_index.get(user_id)
+                if user_idx is None:
+                    return None
+                top_pois = rankear_pois(self.model, user_idx, k=k, index=self.index,
+                                        abiertos=self.model.open_mask())
+                resultado = []
+                for poi_idx, similarity in top_pois:
+                    poi = self.model.poi(poi_idx)
+                    resultado.append({
+                        'poi_id': poi['poi_id'],
+                        'name': poi['name'],
+                        'type': poi['type'],
+                        'zone': poi['zone'],
+                        'similarity': float(similarity),
+                        'current_offer': poi['current_offer'],
+                        'schedule': poi['schedule'],
+                    })
+            self.cache.put(key, resultado)
+            return resultado
+        finally:
+            self.latency['recommend'].observe(time.perf_counter() - inicio)
+
+    def alerts_for(self, accident):
+        """Build alerts for the users affected by an accident (dict-like record or post id)."""
+        inicio = time.perf_counter()
+        try:
+            with self._lock:
+                if accident is None:
+                    return None
+                if isinstance(accident, str):
+                    match = self.accidents[self.accidents["id"] == accident]
+                    if match.empty:
+                        return None
+                    accident = match.iloc[0]
+                elif isinstance(accident, dict):
+                    accident = {'severity_score': 0.0, **accident}
+                    # Un accidente nuevo con timestamp alimenta las ventanas de hotspots
+                    if accident.get("timestamp"):
+                        self.hotspots.add(accident["timestamp"],
+                                          ids_de_accidente(accident, self.model.catalog),
+                                          float(accident["severity_score"]))
+
+                ubicacion = accident.get("extracted_locations")
+                if not isinstance(ubicacion, str) or not ubicacion.strip():
+                    return []
+
+                alertas = []
+                location_ids = ids_de_accidente(accident, self.model.catalog)
+                carga = self.hotspots.load(location_ids, window_minutes=60)
+                vecinos = self.model.location_names(self.graph.affected(location_ids, limit=5))
+                detours = self.graph.detours(location_ids)
+                momento = accident.get("timestamp")
+                abiertos = self.model.open_mask(momento if isinstance(momento, str) and momento else None)
+                for user_idx in buscar_usuarios_afectados(self.model, location_ids):
+                    user = self.model.user(user_idx)
+                    desvio = sugerir_desvio(self.model, detours, user_idx)
+                    mensaje, poi = construir_alerta(accident, self.model, user_idx, verbose=False,
+                                                    carga=carga, vecinos=vecinos, desvio=desvio,
+                                                    abiertos=abiertos)
+                    alertas.append({
+                        'user_id': user['user_id'],
+                        'name': user['name'],
+                        'poi_id': poi['poi_id'],
+                        'carga': carga,
+                        'desvio': desvio,
+                        'mensaje': mensaje,
+                    })
+                return alertas
+        finally:
+            self.latency['alerts_for'].observe(time.perf_counter() - inicio)
+
+    def hotspots_top(self, window_minutes=15, n=10):
+        """Hottest canonical locations in a window, with names."""
+        with self._lock:
+            return [
+                {'location_id': location_id, 'name': self.model.catalog.name(location_id),
+                 'count': count, 'severity_sum': severity_sum}
+                for location_id, count, severity_sum in self.hotspots.top(window_minutes, n)
+            ]
+
+    def stats(self):
+        """Cache and latency metrics for sizing the service."""
+        return {
+            'loaded_at': self.loaded_at,
+            'cache': {
+                'size': len(self.cache),
+                'maxsize': self.cache.maxsize,
+                'hits': self.cache.hits,
+                'misses': self.cache.misses,
+            },
+            'latency': {name: h.snapshot() for name, h in self.latency.items()},
+        }
+
+
+def validate_accident(accident):
+    """Error message for an accident posted to /alerts, or None if its fields are usable."""
+    if not isinstance(accident, dict):
+        return "El cuerpo debe ser un objeto JSON con el accidente"
+    timestamp = accident.get("timestamp")
+    if timestamp not in (None, ""):
+        try:
+            valid = isinstance(timestamp, str) and not pd.isna(pd.Timestamp(timestamp))
+        except (ValueError, TypeError, OverflowError):
+            valid = False
+        if not valid:
+            return "timestamp debe ser una fecha ISO 8601 (p. ej. 2025-01-31T08:15:00)"
+    severity = accident.get("severity_score")
+    if severity is not None and (isinstance(severity, bool) or not isinstance(severity, (int, float))
+                                 or not math.isfinite(severity)):
+        return "severity_score debe ser un número"
+    return None
+
+
+def make_handler(service):
+    """Create a request handler bound to a RecommendationService instance."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            if url.path == "/recommend":
+                user_id = params.get("user_id", [None])[0]
+                try:
+                    k = int(params.get("k", ["3"])[0])
+                except ValueError:
+                    return self._send_json(400, {'error': "k debe ser un entero"})
+                if k < 1:
+                    return self._send_json(400, {'error': "k debe ser mayor que 0"})
+                resultado = service.recommend(user_id, k)
+                if resultado is None:
+                    return self._send_json(404, {'error': f"Usuario {user_id} no encontrado"})
+                return self._send_json(200, {'user_id': user_id, 'recommendations': resultado})
+            if url.path == "/alerts":
+                accident_id = params.get("id", [None])[0]
+                alertas = service.alerts_for(accident_id)
+                if alertas is None:
+                    return self._send_json(404, {'error': f"Accidente {accident_id} no encontrado"})
+                return self._send_json(200, {'alerts': alertas})
+            if url.path == "/hotspots":
+                try:
+                    window = int(params.get("window", ["15"])[0])
+                    n = int(params.get("n", ["10"])[0])
+                except ValueError:
+                    return self._send_json(400, {'error': "window y n deben ser enteros"})
+                if n < 1:
+                    return self._send_json(400, {'error': "n debe ser mayor que 0"})
+                if window not in service.hotspots.windows:
+                    return self._send_json(400, {'error': "Ventana no soportada (usa 15 o 60)"})
+                return self._send_json(200, {'hotspots': service.hotspots_top(window, n)})
+            if url.path == "/metrics":
+                return self._send_json(200, service.stats())
+            return self._send_json(404, {'error': "Ruta no encontrada"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path == "/alerts":
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    accident = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    return self._send_json(400, {'error': "JSON inválido"})
+                error = validate_accident(accident)
+                if error:
+                    return self._send_json(400, {'error': error})
+                return self._send_json(200, {'alerts': service.alerts_for(accident)})
+            if url.path == "/reload":
+                service.reload()
+                return self._send_json(200, {'reloaded': True})
+            return self._send_json(404, {'error': "Ruta no encontrada"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=8000, data_dir="ETL", cache_size=256, mode="tfidf"):
+    """Start the localhost HTTP API until interrupted."""
+    service = RecommendationService(data_dir=data_dir, cache_size=cache_size, mode=mode)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"🌐 Servicio de recomendaciones escuchando en http://{host}:{port}")
+    print("   GET /recommend?user_id=U001&k=3 | GET /alerts?id=<post_id> | POST /alerts | GET /hotspots?window=15")
+    print("   GET /metrics | POST /reload")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Servicio detenido")
+    finally:
+        server.server_close()
+
+
+def run():
+    """Main function to run the recommendation service."""
+    port = int(os.environ.get("RECOMMENDATION_PORT", "8000"))
+    serve(port=port, mode=os.environ.get("RECOMMENDATION_MODE", "tfidf"))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,163 @@
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra, shortest_path
+
+from ETL.location_catalog import km_marker, parse_location_ids, split_locations
+
+
+class RouteGraph:
+    """Undirected road graph over canonical location IDs.
+
+    Two locations are linked when they are reported together in one accident,
+    and consecutive Km markers of the same road are chained. The adjacency is a
+    symmetric CSR matrix whose weight is 1 / co-occurrences, so frequently
+    paired segments are "closer". Hop distances are precomputed once (float32,
+    4 MB at the 1000-node limit) for small graphs; larger ones run a
+    radius-limited Dijkstra per incident. Detours only run Dijkstra from the
+    distinct origins of the users an incident affects.
+    """
+
+    def __init__(self, n_nodes, edges, max_precompute=1000):
+        self.n_nodes = n_nodes
+        rows, cols = (np.asarray(v, dtype=np.int32) for v in zip(*edges)) if edges else (
+            np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32))
+        data = np.ones(len(rows))
+        counts = coo_matrix((data, (rows, cols)), shape=(n_nodes, n_nodes)).tocsr()
+        self.counts = counts + counts.T  # duplicados se suman al convertir a CSR
+        self.adjacency = self.counts.copy()
+        self.adjacency.data = 1.0 / self.adjacency.data
+        self.indptr = self.adjacency.indptr
+        self.indices = self.adjacency.indices
+        self.hops = None
+        if n_nodes <= max_precompute:
+            self.hops = shortest_path(self.adjacency, unweighted=True, directed=False).astype(np.float32)
+
+    @classmethod
+    def from_location_lists(cls, catalog, location_lists, **kwargs):
+        """Build from lists of co-occurring location IDs plus the catalog's Km markers."""
+        edges = []
+        for ids in location_lists:
+            ids = sorted(set(i for i in ids if i >= 0))
+            edges.extend((a, b) for k, a in enumerate(ids) for b in ids[k + 1:])
+
+        # Encadenar marcadores Km de la misma vía y unirlos a la vía base si existe
+        roads = {}
+        for location_id, name in enumerate(catalog.names):
+            marker = km_marker(name)
+            if marker:
+                roads.setdefault(marker[0], []).append((marker[1], location_id))
+        for road, markers in roads.items():
+            markers.sort()
+            edges.extend((a, b) for (_, a), (_, b) in zip(markers, markers[1:]))
+            base = catalog.canonical_id(road, create=False) if road else -1
+            if base >= 0:
+                edges.extend((base, location_id) for _, location_id in markers)
+
+        return cls(len(catalog), edges, **kwargs)
+
+    def neighbors(self, location_id):
+        if not 0 <= location_id < self.n_nodes:
+            return self.indices[:0]
+        return self.indices[self.indptr[location_id]:self.indptr[location_id + 1]]
+
+    def affected(self, location_ids, radius=1, limit=None):
+        """Locations within `radius` hops of an incident (the incident itself excluded).
+
+        Ordered by hop distance, then by how often they co-occur with the incident.
+        """
+        location_ids = [i for i in location_ids if 0 <= i < self.n_nodes]
+        if not location_ids:
+            return np.empty(0, dtype=np.int32)
+        if self.hops is not None:
+            hops = self.hops[location_ids].min(axis=0)
+        else:
+            hops = dijkstra(self.adjacency, indices=location_ids, unweighted=True,
+                            limit=radius).reshape(len(location_ids), -1).min(axis=0)
+        hops[location_ids] = np.inf
+        nodes = np.flatnonzero(hops <= radius)
+        strength = np.asarray(self.counts[location_ids][:, nodes].sum(axis=0)).ravel()
+        nodes = nodes[np.lexsort((nodes, -strength, hops[nodes]))]
+        return nodes[:limit].astype(np.int32)
+
+    def hop_distance(self, source, target):
+        if self.hops is not None:
+            return self.hops[source, target]
+        return dijkstra(self.adjacency, indices=source, unweighted=True)[target]
+
+    def detours(self, blocked):
+        """Detour planner for one incident, with the blocked locations removed."""
+        return IncidentDetours(self, blocked)
+
+
+class IncidentDetours:
+    """Shortest paths around one incident.
+
+    Dijkstra runs at most once per distinct origin and the result is cached,
+    so the cost per incident is bounded by the number of distinct residential
+    zones, not by the number of affected users.
+    """
+
+    def __init__(self, graph, blocked):
+        self.graph = graph
+        self.blocked = np.zeros(graph.n_nodes, dtype=bool)
+        blocked = np.asarray([i for i in blocked if 0 <= i < graph.n_nodes], dtype=np.int32)
+        self.blocked[blocked] = True
+        # Quitar las aristas que tocan nodos bloqueados
+        self.adjacency = graph.adjacency
+        if blocked.size:
+            self.adjacency = graph.adjacency.copy()
+            row_of_entry = np.repeat(np.arange(graph.n_nodes), np.diff(graph.indptr))
+            self.adjacency.data[self.blocked[row_of_entry] | self.blocked[graph.indices]] = 0.0
+            self.adjacency.eliminate_zeros()
+        self._trees = {}
+
+    def _tree(self, source):
+        tree = self._trees.get(source)
+        if tree is None:
+            tree = dijkstra(self.adjacency, directed=False, indices=source, return_predecessors=True)
+            self._trees[source] = tree
+        return tree
+
+    def _entry(self, node):
+        """The node itself, or its most co-reported open neighbor if the incident blocks it."""
+        if not self.blocked[node]:
+            return node
+        graph = self.graph
+        start, end = graph.indptr[node], graph.indptr[node + 1]
+        neighbors = graph.indices[start:end]
+        strength = graph.counts.data[start:end]
+        open_ = ~self.blocked[neighbors]
+        if not open_.any():
+            return -1
+        return int(neighbors[open_][np.argmax(strength[open_])])
+
+    def path(self, source, target):
+        """Location IDs from source to target avoiding the incident, or [] if none.
+
+        A blocked endpoint (e.g. the user lives on the affected avenue) is replaced
+        by its most co-reported open neighbor, i.e. the alternative access.
+        """
+        n = self.graph.n_nodes
+        if not (0 <= source < n and 0 <= target < n):
+            return []
+        source, target = self._entry(source), self._entry(target)
+        if source < 0 or target < 0:
+            return []
+        if source == target:
+            return [source]
+        distances, predecessors = self._tree(source)
+        if not np.isfinite(distances[target]):
+            return []
+        path = [target]
+        while path[-1] != source:
+            path.append(int(predecessors[path[-1]]))
+        return path[::-1]
+
+
+def build_route_graph(accidents, catalog):
+    """Route graph from the locations co-reported in enriched accidents, plus the Km marker chains."""
+    if "location_ids" in accidents.columns:
+        lists = [parse_location_ids(v) for v in accidents["location_ids"]]
+    else:
+        lists = [catalog.ids_for(split_locations(v), create=False) for v in accidents["extracted_locations"]]
+    return RouteGraph.from_location_lists(catalog, lists)
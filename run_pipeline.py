@@ -3,6 +3,12 @@ from ETL.generate_synthetic_data import run as run_generator
 from recomendation import run as run_recommendations
 from recomendation_by_accidente import run as run_accident_recommendations
 from EDA_accidents import run as run_eda
+from recomendation_service import run as run_service
+from artifact_catalog import ArtifactCatalog
+import os
+
+# Datasets parseados una vez por sesión del menú; se recargan si una etapa reescribe el CSV
+catalog = ArtifactCatalog()
 
 def run_npl():
     print("\nEjecutando analizador NPL...")
@@ -27,7 +33,7 @@ def run_synthetic():
 def run_recommendation_system():
     print("\nEjecutando sistema de recomendaciones...")
     try:
-        run_recommendations()
+        run_recommendations(data=catalog.datasets())
         print("Sistema de recomendaciones completado exitosamente")
         return True
     except Exception as e:
@@ -37,7 +43,7 @@ def run_recommendation_system():
 def run_accident_recommendation_system():
     print("\nEjecutando sistema de recomendaciones basado en accidentes...")
     try:
-        run_accident_recommendations()
+        run_accident_recommendations(data=catalog.datasets())
         print("Sistema de recomendaciones por accidente completado exitosamente")
         return True
     except Exception as e:
@@ -47,13 +53,23 @@ def run_accident_recommendation_system():
 def run_eda_analysis():
     print("\nEjecutando análisis exploratorio de datos (EDA)...")
     try:
-        run_eda()
+        accidents = catalog.get('accidents') if os.path.exists(catalog.path('accidents')) else None
+        run_eda(df=accidents)
         print("Análisis EDA completado exitosamente")
         return True
     except Exception as e:
         print(f"Error en análisis EDA: {e}")
         return False
 
+def run_recommendation_service():
+    print("\nIniciando servicio de recomendaciones (Ctrl+C para detener)...")
+    try:
+        run_service()
+        return True
+    except Exception as e:
+        print(f"Error en servicio de recomendaciones: {e}")
+        return False
+
 
 def main():
     """Método principal con menú interactivo."""
@@ -68,6 +84,7 @@ def main():
         print("3. Sistema de Recomendaciones Personalizado")
         print("4. Sistema de Recomendaciones por Accidentes")
         print("5. Análisis Exploratorio de Datos (EDA)")
+        print("6. Servicio de Recomendaciones (API HTTP local)")
         print("0. Salir")
 
         choice = input("\nSelecciona una opción: ")
@@ -82,6 +99,8 @@ def main():
             run_accident_recommendation_system()
         elif choice == "5":
             run_eda_analysis()
+        elif choice == "6":
+            run_recommendation_service()
         elif choice == "0":
             print("\n¡Hasta luego!")
             break
@@ -0,0 +1,84 @@
+import numpy as np
+
+from ETL.feature_store import content_key
+
+try:
+    from transformers import AutoTokenizer, AutoModel
+    import torch
+    TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    TRANSFORMERS_AVAILABLE = False
+
+DEFAULT_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+
+class SentenceEncoder:
+    """Small local sentence model (mean-pooled transformer), L2-normalized float32 output."""
+
+    def __init__(self, model_name=DEFAULT_MODEL, batch_size=32):
+        if not TRANSFORMERS_AVAILABLE:
+            raise ImportError("transformers/torch no disponibles para el modo semántico")
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModel.from_pretrained(model_name).eval()
+
+    def encode(self, texts):
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = self.tokenizer(texts[start:start + self.batch_size], padding=True,
+                                   truncation=True, max_length=64, return_tensors="pt")
+            with torch.no_grad():
+                hidden = self.model(**batch).last_hidden_state
+            mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            batches.append(pooled.numpy())
+        vectors = np.vstack(batches).astype(np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def poi_text(poi):
+    return f"{poi['type']}. {poi['name']}. {', '.join(poi['related_interests'])}"
+
+
+def user_text(user):
+    return f"Intereses: {', '.join(user['interests'])}"
+
+
+class SemanticIndex:
+    """Embedding scores between users and POIs of a CompactModel.
+
+    POI embeddings are computed once and cached as a float16 matrix in the
+    FeatureStore (memory-mapped on later runs); users are embedded in batches.
+    Scoring one user or a batch of users is a single matrix multiply.
+    """
+
+    def __init__(self, model, encoder, store=None):
+        self.model = model
+        self.encoder = encoder
+        self.poi_vectors = self._cached("poi_embeddings", [poi_text(model.poi(i)) for i in range(model.n_pois)], store)
+        self.user_vectors = self._cached("user_embeddings", [user_text(model.user(i)) for i in range(model.n_users)], store)
+        # Se guarda en float16; se puntúa en float32 (BLAS no opera en float16)
+        self._poi_scoring = np.asarray(self.poi_vectors, dtype=np.float32)
+
+    def _cached(self, name, texts, store):
+        key = content_key(getattr(self.encoder, "model_name", type(self.encoder).__name__), texts)
+        vectors = store.load_dense(name, key) if store is not None else None
+        if vectors is None:
+            vectors = self.encoder.encode(texts).astype(np.float16)
+            if store is not None:
+                store.save_dense(name, vectors, key=key)
+        return vectors
+
+    def scores(self, user_idx):
+        """Cosine similarity of one user against every POI."""
+        return self._poi_scoring @ np.asarray(self.user_vectors[user_idx], dtype=np.float32)
+
+    def scores_batch(self, user_idxs):
+        """users x POIs cosine similarities in one multiply."""
+        return np.asarray(self.user_vectors[user_idxs], dtype=np.float32) @ self._poi_scoring.T
+
+    @property
+    def nbytes(self):
+        """Bytes of the cached float16 embeddings (POIs + users)."""
+        return self.poi_vectors.nbytes + self.user_vectors.nbytes
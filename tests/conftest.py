@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Los módulos se importan como en el pipeline: desde la raíz del repo (ETL.x, hotspots, ...)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,51 @@
+from collections import Counter
+
+from alert_dispatch import QueueSink, dispatch_alerts
+
+
+def _drain(sink):
+    delivered = []
+    while not sink.delivered.empty():
+        delivered.extend(sink.delivered.get_nowait())
+    return delivered
+
+
+def test_every_alert_is_delivered_exactly_once_despite_sink_failures():
+    alerts = [{'user_id': f'U{i:03d}', 'mensaje': f'alerta {i}'} for i in range(200)]
+    sink = QueueSink(latency=0.005, fail_every=3)
+
+    metrics = dispatch_alerts(alerts, sink, batch_size=5, max_delay=0.01, max_in_flight=2,
+                              queue_size=5, backoff_base=0.001)
+
+    delivered = Counter(alert['user_id'] for alert in _drain(sink))
+    assert sink.failures > 0
+    assert metrics['retries'] == sink.failures
+    assert metrics['failed'] == 0
+    assert metrics['delivered'] == metrics['submitted'] == len(alerts)
+    assert set(delivered) == {alert['user_id'] for alert in alerts}
+    assert max(delivered.values()) == 1
+
+
+def test_in_flight_sends_are_bounded_and_producers_feel_backpressure():
+    alerts = [{'user_id': f'U{i:03d}'} for i in range(100)]
+    sink = QueueSink(latency=0.01)
+
+    metrics = dispatch_alerts(alerts, sink, batch_size=4, max_delay=0.01, max_in_flight=3, queue_size=4)
+
+    assert sink.max_concurrent <= 3
+    assert metrics['max_in_flight'] <= 3
+    assert metrics['producer_waits'] > 0
+    assert metrics['max_queue_depth'] <= 4
+    assert len(_drain(sink)) == len(alerts)
+
+
+def test_batches_exhausting_retries_go_to_dead_letter():
+    sink = QueueSink(latency=0.001, fail_every=1)  # el sink falla siempre
+
+    metrics = dispatch_alerts([{'user_id': 'U001'}, {'user_id': 'U002'}], sink, batch_size=10,
+                              max_retries=2, backoff_base=0.001)
+
+    assert metrics['failed'] == 2
+    assert metrics['delivered'] == 0
+    assert sink.calls == 3
+    assert _drain(sink) == []
@@ -0,0 +1,98 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from ETL.async_extractor import AsyncExtractor, Checkpoint, FakeLoader, extraer
+from ETL.profile_cache import ProfileCache
+
+FAST = dict(rate=1000.0, burst=1000, backoff_base=0.0, page_size=5)
+
+
+class FlakyLoader(FakeLoader):
+    """FakeLoader whose connection drops for good once `fail_after` pages were served."""
+
+    def __init__(self, fail_after=None, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_after = fail_after
+        self.pages = 0
+        self.cursors = []
+
+    def fetch_page(self, target, cursor, page_size, owner):
+        self.cursors.append(cursor)
+        if self.fail_after is not None and self.pages >= self.fail_after:
+            raise ValueError("conexión perdida (simulado)")
+        self.pages += 1
+        return super().fetch_page(target, cursor, page_size, owner)
+
+
+def _extract(loader, targets, checkpoint_dir, **kwargs):
+    extractor = AsyncExtractor(loader, targets, checkpoint_dir=str(checkpoint_dir),
+                               profile_cache=ProfileCache(path=None), **{**FAST, **kwargs})
+    return extractor, asyncio.run(extractor.run())
+
+
+def test_throttled_requests_are_retried(tmp_path):
+    loader = FakeLoader(posts_per_target=20, latency=0, throttle_every=3)
+    extractor, df = _extract(loader, ['cuenta_a', 'cuenta_b'], tmp_path)
+
+    assert loader.throttled > 0
+    assert extractor.stats['retries'] == loader.throttled
+    assert extractor.stats['failed_targets'] == []
+    assert len(df) == 40
+    assert loader.profile_calls == 2  # un perfil por cuenta, no por post
+
+
+def test_existing_and_repeated_posts_are_not_duplicated(tmp_path):
+    output = tmp_path / 'posts.csv'
+    loader = FakeLoader(posts_per_target=10, latency=0, throttle_every=0)
+    first = extraer(loader, ['cuenta_a', 'cuenta_a'], output_file=str(output),
+                    checkpoint_dir=str(tmp_path / 'ck'), profile_cache=ProfileCache(path=None), **FAST)
+    assert len(first) == 10
+
+    second = extraer(FakeLoader(posts_per_target=12, latency=0, throttle_every=0), ['cuenta_a'],
+                     output_file=str(output), checkpoint_dir=str(tmp_path / 'ck'),
+                     profile_cache=ProfileCache(path=None), **FAST)
+    saved = pd.read_csv(output)
+    assert len(second) == 2  # sólo los posts que no estaban en el CSV
+    assert len(saved) == 12
+    assert saved['id'].is_unique
+
+
+def test_interrupted_target_resumes_from_checkpoint(tmp_path):
+    broken = FlakyLoader(fail_after=2, posts_per_target=23, latency=0, throttle_every=0)
+    extractor, df = _extract(broken, ['cuenta_a'], tmp_path)
+    assert extractor.stats['failed_targets'] == ['cuenta_a']
+    assert df.empty
+
+    checkpoint = Checkpoint(str(tmp_path), 'cuenta_a')
+    assert not checkpoint.done
+    assert len(checkpoint.rows) == 10
+    assert checkpoint.cursor == {'offset': 10}
+
+    resumed = FlakyLoader(posts_per_target=23, latency=0, throttle_every=0)
+    extractor, df = _extract(resumed, ['cuenta_a'], tmp_path)
+    assert extractor.stats['failed_targets'] == []
+    assert resumed.cursors[0] == {'offset': 10}  # no vuelve a pedir las páginas ya guardadas
+    assert len(df) == 23
+    assert df['id'].is_unique
+    assert Checkpoint(str(tmp_path), 'cuenta_a').done
+
+
+def test_instaloader_connection_errors_are_retryable():
+    instaloader = pytest.importorskip('instaloader')
+    from ETL.async_extractor import InstaloaderBackend, ThrottledError
+
+    backend = InstaloaderBackend(loader=None)
+
+    def fail(exc):
+        def fn():
+            raise exc
+        return fn
+
+    with pytest.raises(ThrottledError):
+        backend._call(fail(instaloader.exceptions.TooManyRequestsException("429")))
+    with pytest.raises(ConnectionError):
+        backend._call(fail(instaloader.exceptions.ConnectionException("502 Bad Gateway")))
+    with pytest.raises(instaloader.exceptions.QueryReturnedNotFoundException):
+        backend._call(fail(instaloader.exceptions.QueryReturnedNotFoundException("404")))
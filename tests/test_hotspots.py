@@ -0,0 +1,62 @@
+import pandas as pd
+
+from hotspots import HotspotEngine
+
+T0 = pd.Timestamp('2026-03-02 08:00')
+
+
+def at(minutes):
+    return T0 + pd.Timedelta(minutes=minutes)
+
+
+def test_events_expire_when_their_bucket_leaves_the_window():
+    engine = HotspotEngine(windows_minutes=(15, 60))
+    engine.add(at(0), [1], severity=0.8)
+    engine.add(at(10), [1], severity=0.2)
+
+    assert engine.load([1], window_minutes=15) == 2
+    engine.advance(at(16))
+    assert engine.load([1], window_minutes=15) == 1  # el de las 08:00 salió de la ventana de 15
+    assert engine.load([1], window_minutes=60) == 2
+    assert engine.top(window_minutes=60) == [(1, 2, 1.0)]
+
+    engine.advance(at(70))
+    assert engine.load([1], window_minutes=60) == 0
+    assert engine.top(window_minutes=60) == []
+
+
+def test_out_of_order_events_inside_the_buffer_count_and_older_ones_are_dropped():
+    engine = HotspotEngine(windows_minutes=(15, 60))
+    engine.add(at(30), [1])
+    engine.add(at(20), [1])  # llega tarde pero sigue dentro de las dos ventanas
+    engine.add(at(5), [1])  # sólo dentro de la ventana de 60
+    engine.add(at(-40), [1])  # más viejo que la ventana más larga
+
+    assert engine.dropped == 1
+    assert engine.events == 3
+    assert engine.load([1], window_minutes=15) == 2
+    assert engine.load([1], window_minutes=60) == 3
+
+
+def test_accident_at_several_locations_is_one_event_in_load():
+    engine = HotspotEngine()
+    engine.add(at(0), [1, 2], severity=0.5)
+    engine.add(at(1), [2, 2], severity=0.5)  # ubicación repetida en el mismo reporte
+
+    assert engine.load([1, 2]) == 2
+    assert engine.load([1]) == 1
+    assert engine.load([2]) == 2
+    assert engine.load([3]) == 0
+    # Por ubicación, el accidente compartido cuenta en ambas
+    assert engine.top(window_minutes=60) == [(2, 2, 1.0), (1, 1, 0.5)]
+
+
+def test_top_orders_by_score_then_location_id():
+    engine = HotspotEngine()
+    for location_id, reports, severity in [(7, 1, 0.9), (3, 3, 0.1), (5, 1, 0.2), (4, 3, 0.25)]:
+        for _ in range(reports):
+            engine.add(at(0), [location_id], severity=severity)
+
+    assert [row[0] for row in engine.top(window_minutes=15, n=3)] == [3, 4, 5]
+    assert [row[0] for row in engine.top(window_minutes=15, n=2, by='severity')] == [7, 4]
+    assert engine.top(window_minutes=15, n=0) == []
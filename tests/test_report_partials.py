@@ -0,0 +1,71 @@
+from itertools import permutations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ETL.report_partials import ReportPartial, merge_partials
+
+
+def enriched(n=30, seed=7):
+    rng = np.random.default_rng(seed)
+    ids = [f'p{i:03d}' for i in range(n)]
+    incident = [ids[i - i % 3] for i in range(n)]  # grupos de tres republicaciones
+    incident[4] = incident[11] = None  # sin clave de incidente: cada fila cuenta como uno
+    # Como en el analizador: las republicaciones heredan las ubicaciones del representante
+    locations = [', '.join(rng.choice(['Duarte', 'Churchill', 'Lincoln', 'Ovando'], size=1 + i % 2, replace=False))
+                 for i in range(n)]
+    return pd.DataFrame({
+        'id': ids,
+        'incident_id': incident,
+        'extracted_locations': [locations[i - i % 3] for i in range(n)],
+        'severity_score': rng.random(n).round(2),
+        'entities_found': rng.integers(0, 5, n),
+        'word_count': rng.integers(5, 40, n),
+    })
+
+
+def flat(report, prefix=''):
+    items = {}
+    for key, value in report.items():
+        if isinstance(value, dict):
+            items.update(flat(value, f'{prefix}{key}.'))
+        else:
+            items[prefix + key] = value
+    return items
+
+
+def assert_same_report(actual, expected):
+    actual, expected = flat(actual), flat(expected)
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        assert actual[key] == pytest.approx(value), key
+
+
+def test_merge_in_any_order_matches_a_single_update():
+    df = enriched()
+    expected = ReportPartial().update(df).report()
+    # Los bloques parten grupos de incidentes entre partials
+    chunks = [df.iloc[:10], df.iloc[10:17], df.iloc[17:]]
+
+    for order in permutations(chunks):
+        assert_same_report(merge_partials(ReportPartial().update(c) for c in order).report(), expected)
+    a, b, c = (ReportPartial().update(chunk) for chunk in chunks)
+    assert_same_report(a.merge(b.merge(c)).report(), expected)
+
+
+def test_missing_incident_ids_are_not_one_incident():
+    df = enriched()
+    df['incident_id'] = np.nan
+
+    report = ReportPartial().update(df).report()
+    assert report['unique_incidents'] == len(df)
+    assert report['dedup_ratio'] == 0.0
+
+
+def test_duplicate_index_labels_keep_rows_paired():
+    df = enriched()
+    # pd.concat sin ignore_index: etiquetas 0..14 repetidas
+    repeated = pd.concat([df.iloc[:15], df.iloc[15:].reset_index(drop=True)])
+
+    assert_same_report(ReportPartial().update(repeated).report(), ReportPartial().update(df).report())